@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import UserViewLog, OffPlatformLog, UserWordFrequency
+from .models import UserViewLog, UserVideoProgress, UserDailyTotals, UserPeriodTotals, IngestedSegment, OffPlatformLog, UserWordFrequency
 
 @admin.register(UserViewLog)
 class UserViewLogAdmin(admin.ModelAdmin):
@@ -8,6 +8,29 @@ class UserViewLogAdmin(admin.ModelAdmin):
     list_filter = ("watch_date",)
     search_fields = ("user__email", "video__title", "video__on_platform_id")
 
+@admin.register(UserVideoProgress)
+class UserVideoProgressAdmin(admin.ModelAdmin):
+    list_display = ("id", "user", "video", "first_watched_at", "last_watched_at", "last_position", "coverage", "completed")
+    list_filter = ("completed",)
+    search_fields = ("user__email", "video__title", "video__on_platform_id")
+
+@admin.register(UserDailyTotals)
+class UserDailyTotalsAdmin(admin.ModelAdmin):
+    list_display = ("id", "user", "day", "on_seconds", "off_seconds")
+    list_filter = ("day",)
+    search_fields = ("user__email",)
+
+@admin.register(UserPeriodTotals)
+class UserPeriodTotalsAdmin(admin.ModelAdmin):
+    list_display = ("id", "user", "granularity", "start", "on_seconds", "off_seconds")
+    list_filter = ("granularity", "start")
+    search_fields = ("user__email",)
+
+@admin.register(IngestedSegment)
+class IngestedSegmentAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "ingested_at")
+    search_fields = ("name",)
+
 @admin.register(OffPlatformLog)
 class OffPlatformLogAdmin(admin.ModelAdmin):
     list_display = ("id", "user", "date_start", "date_end", "time_duration", "comment")
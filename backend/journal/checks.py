@@ -0,0 +1,41 @@
+"""System check (``journal.E001``) that the watch-time spool directory is usable."""
+
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.core import checks
+from django.core.exceptions import ImproperlyConfigured
+
+
+def _spool_dir_problem():
+    """Why ``WATCHTIME_SPOOL_DIR`` cannot take heartbeats, or ``None``."""
+    if not settings.WATCHTIME_WRITE_BEHIND:
+        return None
+    directory = Path(settings.WATCHTIME_SPOOL_DIR)
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+    except OSError as e:
+        return f"cannot create the watch-time spool directory {directory}: {e}"
+    if not os.access(directory, os.W_OK | os.X_OK):
+        return f"the watch-time spool directory {directory} is not writable by uid {os.getuid()}"
+    return None
+
+
+@checks.register()
+def spool_dir_writable(app_configs, **kwargs):
+    problem = _spool_dir_problem()
+    if problem is None:
+        return []
+    return [checks.Error(
+        problem,
+        hint="Set WATCHTIME_SPOOL_DIR to a local directory the app user can write, or WATCHTIME_WRITE_BEHIND = False.",
+        id="journal.E001",
+    )]
+
+
+def raise_for_spool_dir():
+    """Fail fast at startup (``ImproperlyConfigured``) when heartbeats could not be spooled."""
+    problem = _spool_dir_problem()
+    if problem is not None:
+        raise ImproperlyConfigured(problem)
@@ -0,0 +1,128 @@
+"""
+Compaction of old watch-time log rows.
+
+Past the horizon (``WATCHTIME_COMPACT_AFTER_DAYS``, counted in local days)
+nothing needs a log row's interval any more, only how long each video was
+watched on each day and how far. ``compact`` replaces the rows of each
+(user, video, local day) older than the horizon with one row: the earliest
+``watch_date``, ``SUM(watch_time)``, the lowest start and the highest end
+(the furthest position reached).
+
+Watch time stays on the same local day, so the daily totals, the period
+rollups and a ``rebuild`` of them do not change. ``UserVideoProgress`` keeps
+its own ranges and is not touched.
+
+Work goes one batch of users and one local month at a time, each in its
+own transaction, so a month lines up with a log partition and an
+interrupted run loses only the batch in flight. Runs are idempotent: groups
+that are already one row are left alone, so a rerun (or ``from_user``)
+resumes where the last one stopped. With ``verify`` each batch compares
+per-(user, video, day) sums and positions before and after and rolls back
+on any difference.
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from .totals import _stacks
+
+COMPACT_SQL = """
+    WITH groups AS (
+        SELECT user_id, video_id, (watch_date AT TIME ZONE %(tz)s)::date AS day
+        FROM {view_log}
+        WHERE user_id BETWEEN %(lo)s AND %(hi)s AND watch_date >= %(start)s AND watch_date < %(end)s
+        GROUP BY 1, 2, 3
+        HAVING COUNT(*) > 1
+    ), removed AS (
+        DELETE FROM {view_log} AS log
+        USING groups
+        WHERE log.user_id BETWEEN %(lo)s AND %(hi)s AND log.watch_date >= %(start)s AND log.watch_date < %(end)s
+          AND log.user_id = groups.user_id AND log.video_id IS NOT DISTINCT FROM groups.video_id
+          AND (log.watch_date AT TIME ZONE %(tz)s)::date = groups.day
+        RETURNING log.user_id, log.video_id, log.watch_date, log.watch_time, log.video_time_start, log.video_time_end
+    ), added AS (
+        INSERT INTO {view_log} (user_id, video_id, watch_date, watch_time, video_time_start, video_time_end)
+        SELECT user_id, video_id, MIN(watch_date), SUM(watch_time), MIN(video_time_start), MAX(video_time_end)
+        FROM removed
+        GROUP BY user_id, video_id, (watch_date AT TIME ZONE %(tz)s)::date
+        RETURNING 1
+    )
+    SELECT (SELECT COUNT(*) FROM removed), (SELECT COUNT(*) FROM added)
+"""
+
+AGGREGATES_SQL = """
+    SELECT user_id, video_id, (watch_date AT TIME ZONE %(tz)s)::date AS day,
+           SUM(watch_time), MIN(video_time_start), MAX(video_time_end)
+    FROM {view_log}
+    WHERE user_id BETWEEN %(lo)s AND %(hi)s AND watch_date >= %(start)s AND watch_date < %(end)s
+    GROUP BY 1, 2, 3
+    ORDER BY 1, 2 NULLS FIRST, 3
+"""
+
+
+class CompactionMismatch(Exception):
+    """A batch's aggregates changed; the batch was rolled back."""
+
+
+def compaction_horizon(days=None):
+    """Local midnight ``days`` (default ``WATCHTIME_COMPACT_AFTER_DAYS``) days ago."""
+    days = settings.WATCHTIME_COMPACT_AFTER_DAYS if days is None else days
+    if days < 1:
+        raise ValueError("the compaction horizon must be at least one day back")
+    day = timezone.localdate() - timedelta(days=days)
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _months(first, horizon):
+    """``(start, end)`` local-month windows from ``first``'s month up to ``horizon``."""
+    local = timezone.localtime(first)
+    start = timezone.make_aware(datetime(local.year, local.month, 1))
+    while start < horizon:
+        following = timezone.make_aware(datetime(start.year + start.month // 12, start.month % 12 + 1, 1))
+        yield start, min(following, horizon)
+        start = following
+
+
+def compact(stack="journal", horizon=None, batch_size=1000, from_user=None, verify=False):
+    """
+    Compact ``stack``'s watch log before ``horizon`` (default
+    ``compaction_horizon()``), ``batch_size`` users at a time, from user
+    ``from_user`` on. Yields ``(last user id, rows removed, rows added)`` as
+    each batch of users is committed.
+    """
+    from backend.users.models import User
+
+    view_log = _stacks()[stack][1]
+    horizon = compaction_horizon() if horizon is None else horizon
+    sql = COMPACT_SQL.format(view_log=view_log._meta.db_table)
+    users = User.objects.order_by("pk").values_list("pk", flat=True)
+    if from_user is not None:
+        users = users.filter(pk__gte=from_user)
+    users = list(users)
+    for i in range(0, len(users), batch_size):
+        lo, hi = users[i], users[min(i + batch_size, len(users)) - 1]
+        first = (
+            view_log.objects.filter(user_id__gte=lo, user_id__lte=hi, watch_date__lt=horizon)
+            .aggregate(first=Min("watch_date"))["first"]
+        )
+        removed = added = 0
+        for start, end in _months(first, horizon) if first else ():
+            params = {"tz": settings.TIME_ZONE, "lo": lo, "hi": hi, "start": start, "end": end}
+            with transaction.atomic(), connection.cursor() as cursor:
+                before = _aggregates(cursor, view_log, params) if verify else None
+                cursor.execute(sql, params)
+                batch_removed, batch_added = cursor.fetchone()
+                if verify and _aggregates(cursor, view_log, params) != before:
+                    raise CompactionMismatch(f"users {lo}-{hi}, {start:%Y-%m}: aggregates changed")
+            removed += batch_removed
+            added += batch_added
+        yield hi, removed, added
+
+
+def _aggregates(cursor, view_log, params):
+    cursor.execute(AGGREGATES_SQL.format(view_log=view_log._meta.db_table), params)
+    return cursor.fetchall()
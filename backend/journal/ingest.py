@@ -0,0 +1,446 @@
+"""
+Write-behind ingestion of watch-time heartbeats.
+
+The request path only appends heartbeats to a local spool file (one
+``os.write`` of JSON lines, no database round trip) and acknowledges. A
+flusher thread in each process rotates its open segment every
+``WATCHTIME_FLUSH_INTERVAL`` seconds, or sooner once
+``WATCHTIME_FLUSH_SIZE`` heartbeats are pending. It then writes every
+finished segment in one transaction: the log rows go in with ``COPY`` and
+the per-(user, video) progress rows with one upsert.
+
+Heartbeats are coalesced into watch intervals on the way in. A tick that
+continues the user's open interval for the video (contiguous position, at
+most ``SESSION_GAP`` since the interval's estimated end) extends that
+``UserViewLog`` row in place: ``watch_time`` grows, ``video_time_end``
+moves. Only a seek, a session gap or local midnight starts a new row, whose
+``watch_date`` is the interval's first tick; an interval never crosses a
+day, so the daily totals can credit its seconds to ``watch_date``'s day. The
+open rows are read ``FOR UPDATE``, so concurrent flushes of one user's ticks
+do not lose increments. Two flushes that both start a new interval may each
+create one; that costs a row but loses no time.
+
+Segments move through ``<id>.jsonl`` (open), ``.ready`` (rotated) and
+``.flushing`` (claimed). The process appending to a segment, or writing it
+to the database, holds an exclusive ``flock`` on it; a claim takes the lock
+before renaming, so only one process writes a given segment. Crash safety:
+
+- the kernel drops a dead process's locks, so segments it left behind are
+  replayed by whichever process flushes next (no pid checks, which a
+  restarted container can reuse);
+- each segment's id is recorded in ``IngestedSegment`` in the same
+  transaction as its rows, so replaying a segment that was committed but not
+  yet deleted is a no-op;
+- a torn last line (crash mid-append) is skipped;
+- a segment whose write fails ``MAX_SEGMENT_FAILURES`` times (bad data,
+  not a lost connection; the count travels in its name as
+  ``<id>.<failures>.ready``) is renamed to ``<id>.dead`` and left for an
+  operator, so one poisoned segment does not hold back the others.
+
+``os.write`` survives a process crash but not power loss; set
+``WATCHTIME_SPOOL_FSYNC`` to fsync every append at the cost of latency.
+With ``WATCHTIME_WRITE_BEHIND = False`` heartbeats are written synchronously.
+"""
+
+import atexit
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, close_old_connections, connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import IngestedSegment, UserDailyTotals, UserViewLog
+from .progress import record_watches
+from .totals import add_watch_time, local_day
+
+logger = logging.getLogger(__name__)
+
+OPEN, READY, FLUSHING, CREATING, DEAD = ".jsonl", ".ready", ".flushing", ".creating", ".dead"
+NULL = r"\N"
+# ledger rows only need to outlive any segment that could still be replayed
+LEDGER_RETENTION = timedelta(days=7)
+
+# a tick continues an interval when it starts at most SESSION_GAP after the
+# interval's estimated end and its start position is within SEEK_TOLERANCE of
+# the interval's end (or up to its own length ahead: faster playback rates)
+SESSION_GAP = timedelta(minutes=5)
+SEEK_TOLERANCE = 5.0
+# longest interval one row may cover; also bounds the open-row lookup
+MAX_INTERVAL = timedelta(hours=6)
+
+
+def heartbeat(user_id, video, watched_at, watch_time, start, end, target="journal"):
+    """
+    Spool record for one tick. ``video`` is a ``videos.Video`` id, or for the
+    legacy ``platform`` target a pk or on-platform id (resolved at flush).
+    """
+    return {
+        "t": target, "u": user_id, "v": video, "at": watched_at.isoformat(),
+        "w": int(watch_time), "s": float(start), "e": float(end),
+    }
+
+
+# ---- database side ----
+
+def _legacy_video_ids(keys):
+    from backend.platform import models as legacy
+
+    numeric = {int(k) for k in keys if str(k).isdigit()}
+    found = dict(legacy.Video.objects.filter(pk__in=numeric).values_list("pk", "pk"))
+    by_key = dict(
+        legacy.Video.objects.filter(on_platform_id__in={str(k) for k in keys}).values_list("on_platform_id", "pk")
+    )
+    return {k: found.get(int(k)) if str(k).isdigit() and int(k) in found else by_key.get(str(k)) for k in keys}
+
+
+def _copy(model, rows):
+    """``COPY`` ``(user, video, watch_date, watch_time, start, end)`` rows into ``model``'s table."""
+    if not rows:
+        return
+    lines = "".join(
+        f"{u}\t{NULL if v is None else v}\t{at}\t{w}\t{s!r}\t{e!r}\n" for u, v, at, w, s, e in rows
+    )
+    with connection.cursor() as cursor:
+        with cursor.cursor.copy(
+            f"COPY {model._meta.db_table} "
+            "(user_id, video_id, watch_date, watch_time, video_time_start, video_time_end) FROM STDIN"
+        ) as copy:
+            copy.write(lines)
+
+
+@dataclass
+class _Interval:
+    pk: int  # None for a row not written yet
+    user_id: int
+    video_id: int
+    started_at: datetime
+    watch_time: int
+    start: float
+    end: float
+
+    def continued_by(self, at, watch_time, start):
+        ended_at = self.started_at + timedelta(seconds=self.watch_time)
+        jump = start - self.end
+        return (
+            self.started_at <= at <= self.started_at + MAX_INTERVAL
+            and local_day(at) == local_day(self.started_at)
+            and at - timedelta(seconds=watch_time) - ended_at <= SESSION_GAP
+            and -SEEK_TOLERANCE <= jump <= SEEK_TOLERANCE + watch_time
+        )
+
+
+def _open_intervals(model, rows):
+    """``{(user, video): _Interval}`` of the latest rows ``rows`` could extend, locked."""
+    keys = {(u, v) for u, v, *_ in rows if v is not None}
+    if not keys:
+        return {}
+    since = min(r[2] for r in rows) - MAX_INTERVAL
+    found = (
+        model.objects.select_for_update()
+        .filter(user_id__in={u for u, _ in keys}, video_id__in={v for _, v in keys}, watch_date__gte=since)
+        .order_by("watch_date", "id")
+        .values_list("pk", "user_id", "video_id", "watch_date", "watch_time", "video_time_start", "video_time_end")
+    )
+    # ascending, so each key ends up with its latest row
+    return {(row[1], row[2]): _Interval(*row) for row in found if (row[1], row[2]) in keys}
+
+
+def _coalesce(model, rows):
+    """
+    Write ``(user, video, watched_at, watch_time, start, end)`` ticks to
+    ``model`` as intervals: extend open rows in place, ``COPY`` the new ones.
+    Returns ``(user, watch_date, seconds)`` per tick, ``watch_date`` being
+    that of the row the tick's seconds went to.
+    """
+    rows = sorted(rows, key=lambda r: (r[0], -1 if r[1] is None else r[1], r[2]))
+    intervals = _open_intervals(model, rows)
+    extended, new, credited = {}, [], []
+    for u, v, at, w, s, e in rows:
+        interval = intervals.get((u, v))
+        if interval is not None and interval.continued_by(at, w, s):
+            interval.watch_time += w
+            interval.end = e
+            if interval.pk is not None:
+                extended[interval.pk] = interval
+        else:
+            interval = intervals[u, v] = _Interval(None, u, v, at, w, s, e)
+            new.append(interval)
+        credited.append((u, interval.started_at, w))
+    if extended:
+        # bounded by watch_date so the partitioned log only touches the recent months
+        since = min(i.started_at for i in extended.values())
+        model.objects.filter(watch_date__gte=since).bulk_update(
+            [model(pk=i.pk, watch_time=i.watch_time, video_time_end=i.end) for i in extended.values()],
+            ["watch_time", "video_time_end"],
+        )
+    _copy(model, [(i.user_id, i.video_id, i.started_at.isoformat(), i.watch_time, i.start, i.end) for i in new])
+    return credited
+
+
+def write_heartbeats(beats):
+    """
+    Write spool records: coalesced log rows (``_coalesce``), one progress
+    upsert per user and the daily totals. Heartbeats of unknown users are
+    dropped, and so are journal heartbeats of unknown videos: neither
+    watch-time endpoint looks the video up. Legacy heartbeats keep the old
+    behaviour of logging an unknown video as NULL. Call inside a
+    transaction.
+    """
+    from backend.platform import models as legacy
+    from backend.users.models import User
+    from backend.videos.models import Video
+
+    users = set(User.objects.filter(pk__in={b["u"] for b in beats}).values_list("pk", flat=True))
+    beats = [b for b in beats if b["u"] in users]
+    journal = [b for b in beats if b["t"] == "journal"]
+    platform = [b for b in beats if b["t"] == "platform"]
+
+    videos = set(Video.objects.filter(pk__in={b["v"] for b in journal}).values_list("pk", flat=True))
+    rows, ticks = [], {}
+    for b in journal:
+        if b["v"] not in videos:
+            continue
+        at = parse_datetime(b["at"])
+        rows.append((b["u"], b["v"], at, b["w"], b["s"], b["e"]))
+        ticks.setdefault(b["u"], []).append((b["v"], at, b["w"], b["s"], b["e"]))
+    add_watch_time(UserDailyTotals, _coalesce(UserViewLog, rows))
+    for user_id, user_ticks in ticks.items():
+        record_watches(user_id, user_ticks)
+
+    if platform:
+        resolved = _legacy_video_ids({b["v"] for b in platform})
+        add_watch_time(legacy.UserDailyTotals, _coalesce(legacy.UserViewLog, [
+            (b["u"], resolved[b["v"]], parse_datetime(b["at"]), b["w"], b["s"], b["e"]) for b in platform
+        ]))
+
+
+def _read_segment(path):
+    beats = []
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                beats.append(json.loads(line))
+            except ValueError:
+                logger.warning("skipping torn heartbeat line in %s", path)
+    return beats
+
+
+def ingest_segment(path):
+    """Write one claimed segment exactly once, then delete it."""
+    name = Path(path).name.split(".", 1)[0]
+    with transaction.atomic():
+        _, created = IngestedSegment.objects.get_or_create(name=name)
+        if created:
+            write_heartbeats(_read_segment(path))
+    os.unlink(path)
+
+
+# ---- spool ----
+
+# an unlocked .creating file this old was left by a crash between create and lock
+STALE_CREATING = 60
+# failed writes after which a segment is set aside as .dead
+MAX_SEGMENT_FAILURES = 5
+
+
+def _failures(path):
+    """Failed writes recorded in a segment's name (``<id>.<failures>.ready``)."""
+    parts = Path(path).name.split(".")
+    return int(parts[1]) if len(parts) == 3 and parts[1].isdigit() else 0
+
+
+def _renamed(path, failures, suffix):
+    return path.with_name(f"{path.name.split('.', 1)[0]}.{failures}{suffix}")
+
+
+def _dead_letter(path, failures):
+    target = path.with_name(path.name.split(".", 1)[0] + DEAD)
+    os.replace(path, target)
+    logger.error("watch-time segment failed %d times; moved to %s", failures, target)
+
+
+def _lock(path):
+    """A descriptor of ``path`` holding its exclusive lock; ``None`` if it is gone or a live process holds it."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except FileNotFoundError:
+        return None
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
+
+
+class Spool:
+    def __init__(self, directory, flush_interval=2.0, flush_size=1000, fsync=False):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.flush_interval, self.flush_size, self.fsync = flush_interval, flush_size, fsync
+        self._lock = threading.Lock()
+        self._fd, self._path, self._pending = None, None, 0
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._pruned_at = 0.0
+
+    # request path
+    def append(self, beats):
+        data = "".join(json.dumps(b, separators=(",", ":")) + "\n" for b in beats).encode()
+        with self._lock:
+            if self._fd is None:
+                # locked before it gets a name claim() looks at
+                path = self.directory / f"{uuid.uuid4().hex}{CREATING}"
+                self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_APPEND, 0o600)
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+                self._path = path.with_suffix(OPEN)
+                os.rename(path, self._path)
+            os.write(self._fd, data)
+            if self.fsync:
+                os.fsync(self._fd)
+            self._pending += len(beats)
+            full = self._pending >= self.flush_size
+        if full:
+            self._wake.set()
+
+    def rotate(self):
+        with self._lock:
+            if self._fd is None:
+                return
+            # renamed while still locked, so no flusher takes it for an orphan
+            os.replace(self._path, self._path.with_suffix(READY))
+            os.close(self._fd)
+            self._fd, self._path, self._pending = None, None, 0
+
+    # flusher side
+    def claim(self):
+        """
+        Lock and rename to ``.flushing`` the ready segments and any segment no
+        live process holds. Returns ``(path, locked descriptor)`` pairs.
+        """
+        claimed = []
+        for path in sorted(self.directory.iterdir()):
+            if path.suffix not in (READY, OPEN, FLUSHING, CREATING) or path == self._path:
+                continue
+            fd = _lock(path)
+            if fd is None:
+                continue
+            try:
+                if path.suffix == CREATING:
+                    # empty; a young one may be about to be locked by its creator
+                    if time.time() - os.fstat(fd).st_mtime > STALE_CREATING:
+                        os.unlink(path)
+                    os.close(fd)
+                    continue
+                # an unlocked .flushing segment: its writer died, maybe of it
+                failures = _failures(path) + (path.suffix == FLUSHING)
+                if failures >= MAX_SEGMENT_FAILURES:
+                    _dead_letter(path, failures)
+                    os.close(fd)
+                    continue
+                target = _renamed(path, failures, FLUSHING)
+                os.rename(path, target)
+            except FileNotFoundError:
+                os.close(fd)  # written and deleted by whoever held it before us
+                continue
+            claimed.append((target, fd))
+        return claimed
+
+    def flush(self):
+        """
+        Rotate and write everything claimable. Failed segments are retried on
+        the next flush, up to ``MAX_SEGMENT_FAILURES`` times unless the
+        database was unreachable.
+        """
+        self.rotate()
+        written = 0
+        for path, fd in self.claim():
+            try:
+                ingest_segment(path)
+                written += 1
+            except Exception as e:
+                failures = _failures(path) + (not isinstance(e, (OperationalError, InterfaceError)))
+                if failures >= MAX_SEGMENT_FAILURES:
+                    logger.exception("watch-time flush failed for %s", path)
+                    _dead_letter(path, failures)
+                else:
+                    logger.exception("watch-time flush failed for %s; will retry", path)
+                    os.replace(path, _renamed(path, failures, READY))
+            finally:
+                os.close(fd)
+        if time.monotonic() - self._pruned_at > 3600:
+            IngestedSegment.objects.filter(ingested_at__lt=timezone.now() - LEDGER_RETENTION).delete()
+            self._pruned_at = time.monotonic()
+        return written
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                # e.g. the database is away; segments stay on disk for the next round
+                logger.exception("watch-time flush failed; retrying in %ss", self.flush_interval)
+            finally:
+                close_old_connections()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="watchtime-flusher", daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=10)
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("final watch-time flush failed; segments stay in %s for replay", self.directory)
+
+
+_spool = None
+_spool_lock = threading.Lock()
+
+
+def get_spool():
+    """This process's spool, with its flusher thread started."""
+    global _spool
+    if _spool is None:
+        with _spool_lock:
+            if _spool is None:
+                spool = Spool(
+                    settings.WATCHTIME_SPOOL_DIR,
+                    flush_interval=settings.WATCHTIME_FLUSH_INTERVAL,
+                    flush_size=settings.WATCHTIME_FLUSH_SIZE,
+                    fsync=settings.WATCHTIME_SPOOL_FSYNC,
+                )
+                spool.start()
+                _spool = spool
+    return _spool
+
+
+def submit(beats):
+    """Queue heartbeats (``heartbeat()`` records), or write them now when write-behind is off."""
+    if not beats:
+        return
+    if settings.WATCHTIME_WRITE_BEHIND:
+        get_spool().append(beats)
+    else:
+        with transaction.atomic():
+            write_heartbeats(beats)
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.journal.compaction import CompactionMismatch, compact, compaction_horizon
+from backend.journal.totals import STACKS
+
+
+class Command(BaseCommand):
+    help = (
+        "Roll watch-time log rows older than the horizon into one row per (user, video, day), "
+        "keeping every day's watch time. Safe to interrupt and rerun; --from-user resumes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, help="horizon in days (default WATCHTIME_COMPACT_AFTER_DAYS)")
+        parser.add_argument("--stack", choices=STACKS, action="append", dest="stacks", help="default: all")
+        parser.add_argument("--batch-size", type=int, default=1000, help="users per transaction (default 1000)")
+        parser.add_argument("--from-user", type=int, help="start at this user id (resume)")
+        parser.add_argument(
+            "--verify", action="store_true",
+            help="compare per-(user, video, day) aggregates before and after each batch; roll back on a difference",
+        )
+
+    def handle(self, *args, days=None, stacks=None, batch_size=1000, from_user=None, verify=False, **options):
+        try:
+            horizon = compaction_horizon(days)
+        except ValueError as e:
+            raise CommandError(str(e))
+        for stack in stacks or STACKS:
+            total_removed = total_added = 0
+            try:
+                for last_user, removed, added in compact(
+                    stack, horizon=horizon, batch_size=batch_size, from_user=from_user, verify=verify,
+                ):
+                    total_removed += removed
+                    total_added += added
+                    if removed:
+                        self.stdout.write(f"{stack}: users up to {last_user}: {removed} row(s) -> {added}")
+            except CompactionMismatch as e:
+                raise CommandError(f"{stack}: {e}")
+            self.stdout.write(self.style.SUCCESS(
+                f"{stack}: compacted {total_removed} row(s) into {total_added} before {horizon:%Y-%m-%d}"
+            ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from backend.journal.totals import STACKS, rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the per-user daily totals (and journal week/month rollups) from the watch-time, off-platform and word logs "
+        "(after a backfill or a manual data fix). Totals are kept current on write otherwise. "
+        "The watch time of months detached from the journal view log is kept, not recomputed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, action="append", dest="users", help="only this user id (repeatable)")
+        parser.add_argument("--stack", choices=STACKS, action="append", dest="stacks", help="default: all")
+        parser.add_argument("--batch-size", type=int, default=1000, help="users per transaction (default 1000)")
+
+    def handle(self, *args, users=None, stacks=None, batch_size=1000, **options):
+        for stack in stacks or STACKS:
+            rows = rebuild(stack, batch_size=batch_size, user_ids=users)
+            self.stdout.write(self.style.SUCCESS(f"{stack}: wrote {rows} daily total row(s)"))
@@ -0,0 +1,37 @@
+import argparse
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from backend.journal.partitions import PARTITIONS_AHEAD, detach_partitions, ensure_partitions
+
+
+def _month(value):
+    try:
+        return date.fromisoformat(f"{value}-01")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM, got {value!r}")
+
+
+class Command(BaseCommand):
+    help = (
+        "Create the coming months' partitions of the journal view log and, with --detach-before, "
+        "detach (and archive or drop) the months before a cutoff. Run daily; rows of months "
+        "without a partition go to the default partition."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--ahead", type=int, default=PARTITIONS_AHEAD,
+            help=f"months to create past the current one (default {PARTITIONS_AHEAD})",
+        )
+        parser.add_argument("--detach-before", type=_month, metavar="YYYY-MM", help="detach the months before this one")
+        parser.add_argument("--archive-dir", help="write detached months to <dir>/<partition>.csv.gz and drop them")
+        parser.add_argument("--drop", action="store_true", help="drop detached months instead of keeping them as tables")
+
+    def handle(self, *args, ahead=PARTITIONS_AHEAD, detach_before=None, archive_dir=None, drop=False, **options):
+        for month in ensure_partitions(ahead):
+            self.stdout.write(self.style.SUCCESS(f"created {month:%Y-%m}"))
+        if detach_before is not None:
+            for name in detach_partitions(detach_before, archive_dir=archive_dir, drop=drop):
+                self.stdout.write(self.style.SUCCESS(f"detached {name}"))
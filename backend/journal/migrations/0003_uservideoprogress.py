@@ -0,0 +1,42 @@
+# Generated by Django 4.2.23 on 2026-10-17 23:18
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0004_trigram_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('journal', '0002_alter_userviewlog_video'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserVideoProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_watched_at', models.DateTimeField()),
+                ('last_watched_at', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='video_progress', to=settings.AUTH_USER_MODEL)),
+                ('video', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_progress', to='videos.video')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='uservideoprogress',
+            constraint=models.UniqueConstraint(fields=('user', 'video'), name='journal_uservideoprogress_user_video'),
+        ),
+        # backfill from the existing heartbeat history
+        migrations.RunSQL(
+            sql="""
+                INSERT INTO journal_uservideoprogress (user_id, video_id, first_watched_at, last_watched_at)
+                SELECT user_id, video_id, MIN(watch_date), MAX(watch_date)
+                FROM journal_userviewlog
+                WHERE video_id IS NOT NULL
+                GROUP BY user_id, video_id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.23 on 2026-10-17 23:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0003_uservideoprogress'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestedSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, unique=True)),
+                ('ingested_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 4.2.23 on 2026-10-18 00:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0004_ingestedsegment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uservideoprogress',
+            name='completed',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='uservideoprogress',
+            name='coverage',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='uservideoprogress',
+            name='last_position',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='uservideoprogress',
+            name='watched_ranges',
+            field=models.JSONField(default=list),
+        ),
+        migrations.AddField(
+            model_name='uservideoprogress',
+            name='watched_seconds',
+            field=models.IntegerField(default=0),
+        ),
+        # backfill from the heartbeat history; the watched ranges are the union
+        # (gaps and islands, with progress.RANGE_SLACK) of the logged positions
+        migrations.RunSQL(
+            sql="""
+                WITH spans AS (
+                    SELECT user_id, video_id,
+                           LEAST(video_time_start, video_time_end) AS lo,
+                           GREATEST(video_time_start, video_time_end) AS hi
+                    FROM journal_userviewlog
+                    WHERE video_id IS NOT NULL
+                ), ordered AS (
+                    SELECT *, MAX(hi) OVER (
+                        PARTITION BY user_id, video_id ORDER BY lo, hi
+                        ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+                    ) AS reach
+                    FROM spans
+                ), grouped AS (
+                    SELECT *, COUNT(*) FILTER (WHERE reach IS NULL OR lo > reach + 1.0) OVER (
+                        PARTITION BY user_id, video_id ORDER BY lo, hi
+                    ) AS island
+                    FROM ordered
+                ), islands AS (
+                    SELECT user_id, video_id, MIN(lo) AS lo, MAX(hi) AS hi
+                    FROM grouped GROUP BY user_id, video_id, island
+                ), ranges AS (
+                    SELECT i.user_id, i.video_id,
+                           jsonb_agg(jsonb_build_array(i.lo, i.hi) ORDER BY i.lo) AS watched_ranges,
+                           CASE WHEN v.duration > 0 THEN LEAST(1.0, SUM(
+                               GREATEST(0, LEAST(i.hi, v.duration) - GREATEST(i.lo, 0))
+                           ) / v.duration) ELSE 0 END AS coverage
+                    FROM islands i JOIN videos_video v ON v.id = i.video_id
+                    GROUP BY i.user_id, i.video_id, v.duration
+                ), totals AS (
+                    SELECT DISTINCT ON (user_id, video_id)
+                           user_id, video_id, video_time_end AS last_position,
+                           SUM(watch_time) OVER (PARTITION BY user_id, video_id) AS watched_seconds
+                    FROM journal_userviewlog
+                    WHERE video_id IS NOT NULL
+                    ORDER BY user_id, video_id, watch_date DESC, id DESC
+                )
+                UPDATE journal_uservideoprogress p
+                SET last_position = t.last_position,
+                    watched_seconds = t.watched_seconds,
+                    watched_ranges = r.watched_ranges,
+                    coverage = r.coverage,
+                    completed = r.coverage >= 0.9
+                FROM totals t JOIN ranges r USING (user_id, video_id)
+                WHERE p.user_id = t.user_id AND p.video_id = t.video_id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
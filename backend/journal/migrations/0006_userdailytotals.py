@@ -0,0 +1,68 @@
+# Generated by Django 4.2.23 on 2026-10-18 00:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# snapshot of journal.totals.REBUILD_SQL, all users at once
+BACKFILL_SQL = """
+    INSERT INTO {totals} (user_id, day, on_seconds, off_seconds, words)
+    SELECT user_id, day, SUM(on_seconds), SUM(off_seconds), SUM(words)
+    FROM (
+        SELECT user_id, (watch_date AT TIME ZONE %(tz)s)::date AS day,
+               SUM(watch_time) AS on_seconds, 0::float8 AS off_seconds, 0 AS words
+        FROM {view_log}
+        GROUP BY 1, 2
+      UNION ALL
+        SELECT user_id, day::date, 0, time_duration::float8 / (GREATEST(last_day, first_day) - first_day + 1), 0
+        FROM (
+            SELECT user_id, time_duration,
+                   (date_start AT TIME ZONE %(tz)s)::date AS first_day,
+                   (date_end AT TIME ZONE %(tz)s)::date AS last_day
+            FROM {off_log}
+        ) AS logs,
+        generate_series(first_day::timestamp, GREATEST(last_day, first_day)::timestamp, interval '1 day') AS day
+      UNION ALL
+        SELECT user_id, (now() AT TIME ZONE %(tz)s)::date, 0, 0, SUM(count)
+        FROM {words}
+        GROUP BY user_id
+    ) AS parts
+    GROUP BY user_id, day
+"""
+
+
+def backfill(apps, schema_editor):
+    models = [apps.get_model("journal", name) for name in ("UserDailyTotals", "UserViewLog", "OffPlatformLog", "UserWordFrequency")]
+    totals, view_log, off_log, words = (m._meta.db_table for m in models)
+    schema_editor.execute(
+        BACKFILL_SQL.format(totals=totals, view_log=view_log, off_log=off_log, words=words),
+        {"tz": settings.TIME_ZONE},
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('journal', '0005_uservideoprogress_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserDailyTotals',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('on_seconds', models.BigIntegerField(default=0)),
+                ('off_seconds', models.FloatField(default=0.0)),
+                ('words', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_totals', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='userdailytotals',
+            constraint=models.UniqueConstraint(fields=('user', 'day'), name='journal_userdailytotals_user_day'),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
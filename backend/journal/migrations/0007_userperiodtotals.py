@@ -0,0 +1,42 @@
+# Generated by Django 4.2.23 on 2026-10-18 00:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# snapshot of journal.totals.PERIOD_REBUILD_SQL, all users at once
+BACKFILL_SQL = """
+    INSERT INTO journal_userperiodtotals (user_id, granularity, start, on_seconds, off_seconds, words)
+    SELECT user_id, g.granularity, date_trunc(g.granularity, day::timestamp)::date,
+           SUM(on_seconds), SUM(off_seconds), SUM(words)
+    FROM journal_userdailytotals CROSS JOIN (VALUES ('week'), ('month')) AS g (granularity)
+    GROUP BY 1, 2, 3
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('journal', '0006_userdailytotals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserPeriodTotals',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('week', 'Week'), ('month', 'Month')], max_length=8)),
+                ('start', models.DateField()),
+                ('on_seconds', models.BigIntegerField(default=0)),
+                ('off_seconds', models.FloatField(default=0.0)),
+                ('words', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='period_totals', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='userperiodtotals',
+            constraint=models.UniqueConstraint(fields=('user', 'granularity', 'start'), name='journal_userperiodtotals_user_granularity_start'),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,94 @@
+from datetime import date, datetime, timezone
+
+from django.db import migrations
+
+TABLE = "journal_userviewlog"
+# months created past the current one, as journal.partitions.PARTITIONS_AHEAD
+AHEAD = 3
+
+
+def _next_month(month):
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def _recreate(cursor, partitioned):
+    """
+    Copy ``TABLE`` into a new table of the same name, range-partitioned by
+    month of ``watch_date`` or plain, keeping index and constraint names.
+    """
+    cursor.execute(
+        "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s AND indexname <> %s",
+        [TABLE, f"{TABLE}_pkey"],
+    )
+    indexes = cursor.fetchall()
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'",
+        [TABLE],
+    )
+    foreign_keys = cursor.fetchall()
+    for name, _ in indexes:
+        cursor.execute(f"DROP INDEX {name}")
+    for name, _ in foreign_keys:
+        cursor.execute(f"ALTER TABLE {TABLE} DROP CONSTRAINT {name}")
+    cursor.execute(f"ALTER TABLE {TABLE} DROP CONSTRAINT {TABLE}_pkey")
+    cursor.execute(f"ALTER TABLE {TABLE} RENAME TO {TABLE}_old")
+
+    like = f"LIKE {TABLE}_old INCLUDING DEFAULTS INCLUDING IDENTITY"
+    if partitioned:
+        cursor.execute(f"CREATE TABLE {TABLE} ({like}) PARTITION BY RANGE (watch_date)")
+        cursor.execute(f"CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT")
+        cursor.execute(f"SELECT MIN(watch_date) FROM {TABLE}_old")
+        first = cursor.fetchone()[0] or datetime.now(timezone.utc)
+        month = date(first.year, first.month, 1)
+        now = datetime.now(timezone.utc)
+        last = date(now.year, now.month, 1)
+        for _ in range(AHEAD):
+            last = _next_month(last)
+        while month <= last:
+            cursor.execute(
+                f"CREATE TABLE {TABLE}_p{month:%Y%m} PARTITION OF {TABLE} "
+                f"FOR VALUES FROM ('{month:%Y-%m-%d} 00:00+00') TO ('{_next_month(month):%Y-%m-%d} 00:00+00')"
+            )
+            month = _next_month(month)
+    else:
+        cursor.execute(f"CREATE TABLE {TABLE} ({like})")
+    cursor.execute(f"INSERT INTO {TABLE} OVERRIDING SYSTEM VALUE SELECT * FROM {TABLE}_old")
+    cursor.execute(
+        f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {TABLE}"
+    )
+    cursor.execute(f"DROP TABLE {TABLE}_old")
+    # the copied identity got a suffixed sequence name while the old one existed
+    cursor.execute(f"SELECT pg_get_serial_sequence('{TABLE}', 'id')")
+    sequence = cursor.fetchone()[0]
+    if sequence.rsplit(".", 1)[-1] != f"{TABLE}_id_seq":
+        cursor.execute(f"ALTER SEQUENCE {sequence} RENAME TO {TABLE}_id_seq")
+
+    # partitioned: the partition key has to be part of the primary key
+    key = "id, watch_date" if partitioned else "id"
+    cursor.execute(f"ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey PRIMARY KEY ({key})")
+    for _, definition in indexes:
+        # a partitioned table's index reads "ON ONLY"; the new one should cover the partitions
+        cursor.execute(definition.replace(" ON ONLY ", " ON ", 1))
+    for name, definition in foreign_keys:
+        cursor.execute(f"ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}")
+
+
+def partition(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        _recreate(cursor, partitioned=True)
+
+
+def unpartition(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        _recreate(cursor, partitioned=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0007_userperiodtotals'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition, unpartition),
+    ]
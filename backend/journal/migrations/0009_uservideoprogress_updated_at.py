@@ -0,0 +1,22 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0008_partition_userviewlog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uservideoprogress',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        # the write time of existing rows is unknown; the last watch is the
+        # closest, and keeps the next incremental co-watch run incremental
+        migrations.RunSQL(
+            "UPDATE journal_uservideoprogress SET updated_at = last_watched_at",
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0009_uservideoprogress_updated_at'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='userdailytotals',
+            name='words',
+        ),
+        migrations.RemoveField(
+            model_name='userperiodtotals',
+            name='words',
+        ),
+    ]
@@ -7,6 +7,12 @@ from django.contrib.postgres.fields import ArrayField
 class UserViewLog(models.Model):
     """Watch time entries per user/video.
 
+    Each row is one contiguous watch interval: heartbeats extend the open row
+    in place (``journal.ingest``), ``watch_date`` is when the interval began.
+    The table is range-partitioned by month of ``watch_date`` (``journal.partitions``).
+    Past the compaction horizon there is one row per (user, video, day)
+    (``journal.compaction``).
+
     NOTE: Originally pointed at platform.Video; now targets videos.Video.
     Data migration not preserved (user confirmed it's fine to lose old rows).
     """
@@ -21,6 +27,80 @@ class UserViewLog(models.Model):
         indexes = [models.Index(fields=["user", "watch_date"])]
 
 
+class UserVideoProgress(models.Model):
+    """One row per (user, video) the user has watched.
+
+    Maintained at watch-time write (see ``journal.progress.record_watches``)
+    so "has the user watched this", "how much" and "where did they stop"
+    never have to scan ``UserViewLog``.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="video_progress")
+    video = models.ForeignKey("videos.Video", on_delete=models.CASCADE, related_name="user_progress")
+    first_watched_at = models.DateTimeField()
+    last_watched_at = models.DateTimeField()
+    last_position = models.FloatField(default=0.0)     # seconds into the video
+    watched_seconds = models.IntegerField(default=0)   # rewatches included
+    watched_ranges = models.JSONField(default=list)    # sorted, disjoint [start, end] pairs
+    coverage = models.FloatField(default=0.0)          # share of the video in watched_ranges
+    completed = models.BooleanField(default=False)
+    # when the row was last written (not watched: late heartbeats carry old
+    # watch times); incremental jobs pick up changes from here
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "video"], name="journal_uservideoprogress_user_video"),
+        ]
+
+
+class UserDailyTotals(models.Model):
+    """Per-user, per-day sums of on-platform and off-platform seconds.
+
+    Updated in the same transaction as every write to the logs they sum (see
+    ``journal.totals``), so totals and calendars read O(days) rows; rebuilt
+    from the logs by ``manage.py rebuild_daily_totals``.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="daily_totals")
+    day = models.DateField()
+    on_seconds = models.BigIntegerField(default=0)
+    off_seconds = models.FloatField(default=0.0)       # multi-day logs are spread evenly over their days
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "day"], name="journal_userdailytotals_user_day"),
+        ]
+
+
+class UserPeriodTotals(models.Model):
+    """``UserDailyTotals`` rolled up per ISO week (from Monday) and per month.
+
+    Kept current by the same upserts as the daily rows; years are summed from
+    the month rows. Backs the multi-granularity progress API.
+    """
+    class Granularity(models.TextChoices):
+        WEEK = "week", "Week"
+        MONTH = "month", "Month"
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="period_totals")
+    granularity = models.CharField(max_length=8, choices=Granularity.choices)
+    start = models.DateField()                         # first day of the week / month
+    on_seconds = models.BigIntegerField(default=0)
+    off_seconds = models.FloatField(default=0.0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "granularity", "start"], name="journal_userperiodtotals_user_granularity_start",
+            ),
+        ]
+
+
+class IngestedSegment(models.Model):
+    """Heartbeat spool segments already written (see ``journal.ingest``), so a replay is a no-op."""
+    name = models.CharField(max_length=64, unique=True)
+    ingested_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+
 class OffPlatformLog(models.Model):
     """
     Manual logs added in 'My journal' and used for totals.
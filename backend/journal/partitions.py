@@ -0,0 +1,141 @@
+"""
+Monthly range partitions of ``UserViewLog`` by ``watch_date``.
+
+Since migration 0008 ``journal_userviewlog`` is a partitioned table: one
+partition per UTC month (``journal_userviewlog_p202401``) plus a default
+partition that takes rows outside every month, so a write never fails for
+want of a partition. Filters on ``watch_date`` ranges only scan the months
+they touch; vacuum, reindex and backups work a month at a time.
+
+Postgres wants the partition key in every unique constraint, so the
+database primary key is ``(id, watch_date)``. Django still addresses rows by
+``id``, which the identity sequence keeps unique.
+
+``ensure_partitions`` creates the coming months; ``detach_partitions``
+detaches old months, leaving them as plain tables, or archives them to a
+CSV file and drops them. The ``viewlog_partitions`` command runs both.
+Detached rows are gone from ``rebuild_daily_totals``' point of view, so a
+rebuild keeps the totals of the days before ``rebuild_floor()`` as they
+are and recomputes only the later ones.
+"""
+
+import gzip
+import os
+import re
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import UserViewLog
+
+TABLE = UserViewLog._meta.db_table
+DEFAULT_PARTITION = f"{TABLE}_default"
+# months created past the current one
+PARTITIONS_AHEAD = 3
+
+_PARTITION = re.compile(rf"^{TABLE}_p(\d{{4}})(\d{{2}})$")
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def next_month(month):
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"{TABLE}_p{month:%Y%m}"
+
+
+def _bound(month):
+    return f"'{month:%Y-%m-%d} 00:00+00'"
+
+
+def partitions():
+    """Months of the attached partitions, ascending."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = %s::regclass",
+            [TABLE],
+        )
+        matches = [_PARTITION.match(name) for name, in cursor.fetchall()]
+    return sorted(date(int(m[1]), int(m[2]), 1) for m in matches if m)
+
+
+def rebuild_floor():
+    """
+    First local day all of whose rows are in attached partitions (earlier
+    months may have been detached); ``None`` if there are no partitions.
+    """
+    months = partitions()
+    if not months:
+        return None
+    start = datetime(months[0].year, months[0].month, 1, tzinfo=dt_timezone.utc)
+    return timezone.localdate(start - timedelta(microseconds=1)) + timedelta(days=1)
+
+
+def create_partition(month):
+    """
+    Attach ``month``'s partition, moving its rows out of the default
+    partition first. Returns False if a table of that name already exists.
+    """
+    name = partition_name(month)
+    lo, hi = _bound(month), _bound(next_month(month))
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s)", [name])
+        if cursor.fetchone()[0] is not None:
+            return False
+        cursor.execute(f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+        cursor.execute(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE watch_date >= {lo} AND watch_date < {hi} RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        )
+        # the partition's indexes, primary key and foreign keys come from the parent
+        cursor.execute(f"ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES FROM ({lo}) TO ({hi})")
+    return True
+
+
+def ensure_partitions(ahead=PARTITIONS_AHEAD):
+    """Create the partitions of the current month and ``ahead`` more. Returns the months created."""
+    month, created = month_start(timezone.now()), []
+    for _ in range(ahead + 1):
+        if create_partition(month):
+            created.append(month)
+        month = next_month(month)
+    return created
+
+
+def _archive(cursor, name, archive_dir):
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    path = archive_dir / f"{name}.csv.gz"
+    partial = path.with_name(path.name + ".partial")
+    with gzip.open(partial, "wb") as out:
+        with cursor.cursor.copy(f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER)") as copy:
+            for block in copy:
+                out.write(block)
+    os.replace(partial, path)
+
+
+def detach_partitions(before, archive_dir=None, drop=False):
+    """
+    Detach the months before ``before``'s month, one transaction each.
+    With ``archive_dir`` each is written to ``<archive_dir>/<name>.csv.gz``
+    and dropped; with ``drop`` it is dropped. Returns the detached names.
+    """
+    cutoff, detached = month_start(before), []
+    for month in partitions():
+        if month >= cutoff:
+            break
+        name = partition_name(month)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {TABLE} DETACH PARTITION {name}")
+            if archive_dir is not None:
+                _archive(cursor, name, Path(archive_dir))
+            if archive_dir is not None or drop:
+                cursor.execute(f"DROP TABLE {name}")
+        detached.append(name)
+    return detached
@@ -0,0 +1,143 @@
+"""
+Per-user watched-video set and per-video progress.
+
+``UserVideoProgress`` holds one row per (user, video) and is updated on every
+watch-time write, so hide-watched filtering, watched badges and resume
+positions read O(videos watched) rows from the (user, video) unique index
+instead of scanning the user's whole ``UserViewLog`` heartbeat history.
+
+Besides first/last watch times each row keeps the last position, the total
+seconds watched (rewatches included) and the union of watched ranges of the
+video. A tick reports wall-clock seconds and its end position; when it
+continues from the previous tick's end its range starts there, so playback
+faster than 1x leaves no gaps. Coverage is the union's share of the video,
+so watching the same minute twice does not count twice; ``completed`` is set from
+``COMPLETED_COVERAGE`` on, or by mark-as-watched.
+
+Each write also bumps a per-user version (``watched_version``) so responses
+that show watched badges can be revalidated without reading the set.
+"""
+
+from functools import partial
+
+from django.db import transaction
+from django.utils import timezone
+
+from backend.videos.catalog import bump_catalog_version, catalog_version
+from backend.videos.models import Video
+from .models import UserVideoProgress
+
+COMPLETED_COVERAGE = 0.9
+# ranges this close are one range (heartbeat rounding, not skipped content)
+RANGE_SLACK = 1.0
+
+
+def watched_version_key(user_id):
+    return f"journal:watched-version:{user_id}"
+
+
+def watched_version(user) -> int:
+    """Counter that moves whenever the user's watched set may have changed."""
+    return catalog_version(watched_version_key(user.pk))
+
+
+def merge_range(ranges, start, end):
+    """``ranges`` (sorted, disjoint ``[start, end]`` pairs) with ``[start, end]`` added."""
+    start, end = min(start, end), max(start, end)
+    merged = []
+    for lo, hi in ranges:
+        if hi + RANGE_SLACK < start or end + RANGE_SLACK < lo:
+            merged.append([lo, hi])
+        else:
+            start, end = min(start, lo), max(end, hi)
+    merged.append([start, end])
+    return sorted(merged)
+
+
+def coverage(ranges, duration):
+    """Share of ``[0, duration]`` covered by ``ranges``."""
+    if not duration:
+        return 0.0
+    covered = sum(max(0.0, min(hi, duration) - max(lo, 0.0)) for lo, hi in ranges)
+    return min(1.0, covered / duration)
+
+
+def record_watch(user, video, watched_at, watch_time, start, end, completed=False):
+    """Add one watch of ``video`` (position ``start``..``end``) to the user's progress."""
+    record_watches(user.pk, [(video.pk, watched_at, watch_time, start, end)], completed={video.pk} if completed else ())
+
+
+def _locked_rows(user_id, video_ids):
+    return {
+        row.video_id: row
+        for row in UserVideoProgress.objects.select_for_update().filter(user_id=user_id, video_id__in=video_ids)
+    }
+
+
+def record_watches(user_id, ticks, completed=()):
+    """
+    Fold ``(video_id, watched_at, watch_time, start, end)`` ticks into
+    ``user_id``'s progress rows: one locked read, then one UPDATE. Rows of
+    first watches are inserted empty first (``ON CONFLICT DO NOTHING``) and
+    read locked like the others, so a concurrent first watch of the same
+    video is merged, not overwritten. Videos in ``completed`` are marked
+    completed whatever their coverage.
+    """
+    if not ticks:
+        return
+    video_ids = {t[0] for t in ticks}
+    durations = dict(Video.objects.filter(pk__in=video_ids).values_list("pk", "duration"))
+    rows = _locked_rows(user_id, video_ids)
+    missing = video_ids - rows.keys()
+    if missing:
+        first = {}
+        for video_id, at, *_ in ticks:
+            first[video_id] = min(first.get(video_id, at), at)
+        UserVideoProgress.objects.bulk_create(
+            [
+                UserVideoProgress(
+                    user_id=user_id, video_id=video_id, first_watched_at=first[video_id],
+                    last_watched_at=first[video_id], watched_ranges=[],
+                )
+                for video_id in missing
+            ],
+            ignore_conflicts=True,
+        )
+        rows.update(_locked_rows(user_id, missing))
+    for video_id, at, watch_time, start, end in sorted(ticks, key=lambda t: t[1]):
+        row = rows[video_id]
+        row.first_watched_at = min(row.first_watched_at, at)
+        if at >= row.last_watched_at:
+            # continuing from the last position (up to 2x speed): the range starts there
+            if row.watched_ranges and 0 <= start - row.last_position <= watch_time + RANGE_SLACK:
+                start = row.last_position
+            row.last_watched_at, row.last_position = at, end
+        row.watched_seconds += int(watch_time)
+        row.watched_ranges = merge_range(row.watched_ranges, start, end)
+    now = timezone.now()
+    for video_id, row in rows.items():
+        row.updated_at = now
+        row.coverage = coverage(row.watched_ranges, durations.get(video_id))
+        row.completed = row.completed or row.coverage >= COMPLETED_COVERAGE or video_id in completed
+    fields = [
+        "first_watched_at", "last_watched_at", "last_position", "watched_seconds",
+        "watched_ranges", "coverage", "completed", "updated_at",
+    ]
+    UserVideoProgress.objects.bulk_update(rows.values(), fields)
+    transaction.on_commit(partial(bump_catalog_version, watched_version_key(user_id)))
+
+
+def watched_videos(user):
+    """``video_id`` values queryset of the user's watched videos (usable as a subquery)."""
+    return UserVideoProgress.objects.filter(user=user).values_list("video_id", flat=True)
+
+
+def video_progress(user, video_ids):
+    """``{video_id: UserVideoProgress}`` of ``user`` for ``video_ids``."""
+    if user is None or not user.is_authenticated:
+        return {}
+    return {
+        row.video_id: row
+        for row in UserVideoProgress.objects.filter(user=user, video_id__in=video_ids)
+        .only("video_id", "last_position", "coverage", "completed", "watched_seconds")
+    }
@@ -1,4 +1,9 @@
+import math
+from datetime import timedelta
+
+from django.utils import timezone
 from rest_framework import serializers
+from .ingest import MAX_INTERVAL
 from .models import OffPlatformLog
 
 class JournalNoteSerializer(serializers.ModelSerializer):
@@ -59,3 +64,38 @@ class JournalNoteSerializer(serializers.ModelSerializer):
                 setattr(instance, f, validated[f])
         instance.save()
         return instance
+
+
+MAX_HEARTBEATS = 500
+# how far back a buffered tick may be dated; older ones count as this old
+MAX_HEARTBEAT_AGE = timedelta(days=1)
+
+def _finite(value):
+    if not math.isfinite(value):
+        raise serializers.ValidationError("Must be a finite number.")
+
+
+class HeartbeatSerializer(serializers.Serializer):
+    """One player tick, same fields as ``/api/videos/watchtime/`` plus when it happened."""
+    videoId = serializers.IntegerField(min_value=1, max_value=2 ** 63 - 1)
+    # bounded so a bad client cannot spool a tick the log's columns cannot hold
+    elapsedTime = serializers.FloatField(min_value=0, max_value=MAX_INTERVAL.total_seconds(), validators=[_finite])
+    lastVideoTime = serializers.FloatField(min_value=0, validators=[_finite])
+    watchedAt = serializers.DateTimeField(required=False)
+
+    def to_internal_value(self, data):
+        attrs = super().to_internal_value(data)
+        now = timezone.now()
+        # clients flush buffered ticks late, never early, and not days late:
+        # a tick is not allowed to rewrite old days' totals
+        watched_at = min(max(attrs.get("watchedAt") or now, now - MAX_HEARTBEAT_AGE), now)
+        return {
+            "video_id": attrs["videoId"],
+            "watched_at": watched_at,
+            "watch_time": int(attrs["elapsedTime"]),
+            "video_time_start": attrs["lastVideoTime"] - attrs["elapsedTime"],
+            "video_time_end": attrs["lastVideoTime"],
+        }
+
+class HeartbeatBatchSerializer(serializers.Serializer):
+    heartbeats = HeartbeatSerializer(many=True, allow_empty=False, max_length=MAX_HEARTBEATS)
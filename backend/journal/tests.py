@@ -1,3 +1,502 @@
-from django.test import TestCase
+import gzip
+import importlib
+import json
+import tempfile
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from backend.users.models import User
+from backend.videos.models import Channel, Video
+from . import ingest, partitions, progress
+from .ingest import Spool, heartbeat, submit
+from .models import IngestedSegment, UserDailyTotals, UserPeriodTotals, UserVideoProgress, UserViewLog, UserWordFrequency
+from .progress import record_watches
+from .serializers import MAX_HEARTBEAT_AGE, MAX_HEARTBEATS, HeartbeatBatchSerializer
+from .compaction import compact
+from .totals import add_watch_time, rebuild
+
+
+class ViewerFixture:
+    """A viewer and one video of ``duration`` seconds."""
+    duration = 600
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="viewer", password="x")
+        channel = Channel.objects.create(name="Channel")
+        cls.video = Video.objects.create(on_platform_id="vid", channel=channel, title="Video", duration=cls.duration)
+
+
+class WatchTimeSpoolTests(ViewerFixture, TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.spool = Spool(self.dir)
+
+    def beat(self, video_id, seconds_ago=0, start=0.0):
+        at = timezone.now() - timedelta(seconds=seconds_ago)
+        return heartbeat(self.user.pk, video_id, at, 10, start, start + 10)
+
+    def test_append_is_written_on_flush(self):
+        self.spool.append([self.beat(self.video.pk, 20), self.beat(self.video.pk, 10, start=10)])
+        self.assertEqual(UserViewLog.objects.count(), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.spool.flush(), 1)
+
+        self.assertEqual(UserViewLog.objects.filter(user=self.user, video=self.video).count(), 1)
+        progress = UserVideoProgress.objects.get(user=self.user, video=self.video)
+        self.assertLess(progress.first_watched_at, progress.last_watched_at)
+        self.assertEqual(list(self.dir.iterdir()), [])
+
+    def intervals(self):
+        return list(
+            UserViewLog.objects.order_by("id").values_list("watch_time", "video_time_start", "video_time_end")
+        )
+
+    def test_contiguous_ticks_extend_the_open_interval(self):
+        self.spool.append([self.beat(self.video.pk, 30, start=0), self.beat(self.video.pk, 20, start=10)])
+        self.spool.flush()
+        self.spool.append([self.beat(self.video.pk, 10, start=20)])
+        self.spool.flush()
+        self.assertEqual(self.intervals(), [(30, 0.0, 30.0)])
+
+    def test_seek_and_session_gap_start_new_intervals(self):
+        self.spool.append([
+            self.beat(self.video.pk, 3600, start=0),
+            self.beat(self.video.pk, 3590, start=10),
+            self.beat(self.video.pk, 3580, start=300),  # seek forward
+            self.beat(self.video.pk, 3570, start=100),  # seek back
+            self.beat(self.video.pk, 60, start=110),  # an hour later, same position
+        ])
+        self.spool.flush()
+        self.assertEqual(
+            self.intervals(), [(20, 0.0, 20.0), (10, 300.0, 310.0), (10, 100.0, 110.0), (10, 110.0, 120.0)],
+        )
+
+    def test_midnight_starts_a_new_interval(self):
+        midnight = timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+        self.spool.append([
+            heartbeat(self.user.pk, self.video.pk, midnight - timedelta(seconds=s), 10, start, start + 10)
+            for s, start in ((15, 0), (5, 10), (-5, 20))
+        ])
+        self.spool.flush()
+        self.assertEqual(self.intervals(), [(20, 0.0, 20.0), (10, 20.0, 30.0)])
+        today = midnight.date()
+        self.assertEqual(
+            list(UserDailyTotals.objects.order_by("day").values_list("day", "on_seconds")),
+            [(today - timedelta(days=1), 20), (today, 10)],
+        )
+
+    def test_unknown_videos_are_dropped(self):
+        self.spool.append([self.beat(self.video.pk), self.beat(self.video.pk + 1000)])
+        self.spool.flush()
+        self.assertEqual(list(UserViewLog.objects.values_list("video_id", flat=True)), [self.video.pk])
+
+    def test_orphan_segment_of_dead_process_is_replayed(self):
+        # a segment a crashed worker never rotated (nobody holds its lock), ending in a torn line
+        orphan = self.dir / f"{'0' * 32}.jsonl"
+        self.spool.append([self.beat(self.video.pk)])
+        self.spool.rotate()
+        (ready,) = self.dir.iterdir()
+        orphan.write_bytes(ready.read_bytes() + b'{"t": "jour')
+        ready.unlink()
+
+        self.spool.flush()
+
+        self.assertEqual(UserViewLog.objects.count(), 1)
+        self.assertTrue(IngestedSegment.objects.filter(name="0" * 32).exists())
+        self.assertFalse(orphan.exists())
+
+    def test_replay_of_ingested_segment_is_skipped(self):
+        self.spool.append([self.beat(self.video.pk)])
+        self.spool.rotate()
+        (ready,) = self.dir.iterdir()
+        copy = ready.read_bytes()
+        self.spool.flush()
+        # crash between commit and unlink: the same segment shows up again
+        ready.write_bytes(copy)
+
+        self.spool.flush()
+
+        self.assertEqual(UserViewLog.objects.count(), 1)
+        self.assertEqual(list(self.dir.iterdir()), [])
+
+    def test_locked_segments_are_left_alone(self):
+        # another process's spool: it holds the lock of its open segment
+        other = Spool(self.dir)
+        other.append([self.beat(self.video.pk)])
+        self.addCleanup(other.rotate)
+        self.spool.flush()
+        self.assertTrue(other._path.exists())
+        self.assertEqual(UserViewLog.objects.count(), 0)
+
+    @override_settings(WATCHTIME_WRITE_BEHIND=False)
+    def test_endpoints_write_inline_without_write_behind(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post(
+            "/api/videos/watchtime/", {"videoId": self.video.pk, "elapsedTime": 5, "lastVideoTime": 30}, format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        response = client.post(
+            "/api/videos/watchtime/batch/",
+            [{"videoId": self.video.pk, "elapsedTime": 5, "lastVideoTime": 35}], format="json",
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json(), {"accepted": 1})
+        # contiguous ticks: one interval
+        self.assertEqual(self.intervals(), [(10, 25.0, 35.0)])
+
+    def test_batch_validation(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        tick = {"videoId": self.video.pk, "elapsedTime": 5, "lastVideoTime": 5}
+        response = client.post("/api/videos/watchtime/batch/", [tick] * (MAX_HEARTBEATS + 1), format="json")
+        self.assertEqual(response.status_code, 400)
+        response = client.post("/api/videos/watchtime/batch/", [], format="json")
+        self.assertEqual(response.status_code, 400)
+
+        now = timezone.now()
+        serializer = HeartbeatBatchSerializer(data={"heartbeats": [
+            dict(tick, watchedAt=(now + timedelta(hours=1)).isoformat()),
+            dict(tick, videoId=self.video.pk + 1, watchedAt=(now - timedelta(days=30)).isoformat()),
+            dict(tick, watchedAt=(now - timedelta(minutes=5)).isoformat()),
+        ]})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        future, old, recent = (b["watched_at"] for b in serializer.validated_data["heartbeats"])
+        self.assertLess(future - now, timedelta(seconds=5))
+        self.assertLess(abs(now - MAX_HEARTBEAT_AGE - old), timedelta(seconds=5))
+        self.assertLess(abs(now - timedelta(minutes=5) - recent), timedelta(seconds=1))
+        self.assertEqual(serializer.validated_data["heartbeats"][1]["video_id"], self.video.pk + 1)
+
+    def test_poisoned_segment_is_set_aside(self):
+        poisoned = heartbeat(self.user.pk, self.video.pk, timezone.now(), 2 ** 40, 0, 10)  # overflows watch_time
+        (self.dir / f"{'0' * 32}.ready").write_text(json.dumps(poisoned) + "\n")
+        self.spool.append([self.beat(self.video.pk)])
+        with self.assertLogs(ingest.logger, "ERROR"):
+            for _ in range(ingest.MAX_SEGMENT_FAILURES):
+                self.spool.flush()
+        self.assertEqual([p.name for p in self.dir.iterdir()], [f"{'0' * 32}.dead"])
+        self.assertEqual(UserViewLog.objects.count(), 1)  # the good segment went through
+
+    def test_watchtime_bounds_the_tick(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        for payload in (
+            {"videoId": self.video.pk, "elapsedTime": 1e12, "lastVideoTime": 30},
+            {"videoId": self.video.pk, "elapsedTime": 5, "lastVideoTime": -1},
+            {"videoId": self.video.pk, "elapsedTime": "five", "lastVideoTime": 30},
+        ):
+            response = client.post("/api/videos/watchtime/", payload, format="json")
+            self.assertEqual(response.status_code, 400, payload)
+        # no lookup on the request path: an unknown video is spooled and dropped at flush
+        with self.assertNumQueries(0):
+            response = client.post(
+                "/api/videos/watchtime/", {"videoId": self.video.pk + 1000, "elapsedTime": 5, "lastVideoTime": 30},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 200)
+        response = client.post(
+            "/api/videos/watchtime/batch/", [{"videoId": self.video.pk, "elapsedTime": 1e12, "lastVideoTime": 30}],
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_flusher_survives_a_failed_flush(self):
+        self.spool.flush_interval = 0.01
+        calls = []
+
+        def flush():
+            calls.append(1)
+            if len(calls) == 1:
+                raise RuntimeError("database is away")
+            self.spool._stopped.set()
+
+        # the test's connection is the flusher's here; keep it open
+        with mock.patch.object(ingest, "close_old_connections"), mock.patch.object(self.spool, "flush", flush), \
+                self.assertLogs(ingest.logger, "ERROR"):
+            self.spool._run()
+        self.assertEqual(len(calls), 2)
+
+    @override_settings(WATCHTIME_WRITE_BEHIND=True)
+    def test_submit_appends_to_the_spool(self):
+        # the process spool, swapped for one without a flusher thread
+        with mock.patch.object(ingest, "_spool", self.spool):
+            submit([self.beat(self.video.pk)])
+        self.assertEqual(UserViewLog.objects.count(), 0)
+        self.assertEqual([p.suffix for p in self.dir.iterdir()], [".jsonl"])
+        self.spool.flush()
+        self.assertEqual(UserViewLog.objects.count(), 1)
+
+
+class VideoProgressTests(ViewerFixture, TestCase):
+    duration = 100
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def watch(self, *ranges):
+        now = timezone.now()
+        ticks = [(self.video.pk, now + timedelta(seconds=i), end - start, start, end) for i, (start, end) in enumerate(ranges)]
+        record_watches(self.user.pk, ticks)
+
+    def test_rewatching_does_not_double_count_coverage(self):
+        self.watch((0, 30), (10, 40))
+        self.watch((0, 40), (70, 80))
+        progress = UserVideoProgress.objects.get(user=self.user, video=self.video)
+        self.assertEqual(progress.watched_ranges, [[0, 40], [70, 80]])
+        self.assertAlmostEqual(progress.coverage, 0.5)
+        self.assertEqual(progress.watched_seconds, 110)
+        self.assertEqual(progress.last_position, 80)
+        self.assertFalse(progress.completed)
+
+        self.watch((40, 70), (80, 95))
+        progress.refresh_from_db()
+        self.assertEqual(progress.watched_ranges, [[0, 95]])
+        self.assertTrue(progress.completed)
+
+    def test_fast_playback_ranges_start_at_the_previous_tick(self):
+        now = timezone.now()
+        # 2x speed: each 10 s tick moves the position 20 s
+        record_watches(self.user.pk, [
+            (self.video.pk, now + timedelta(seconds=i), 10, end - 10, end) for i, end in enumerate((20, 40, 60))
+        ])
+        progress = UserVideoProgress.objects.get(user=self.user, video=self.video)
+        self.assertEqual(progress.watched_ranges, [[10, 60]])
+        self.assertEqual(progress.watched_seconds, 30)
+
+    def test_concurrent_first_watch_is_merged(self):
+        self.watch((0, 30))
+        locked_rows = progress._locked_rows
+        # the first read misses the other writer's row, the insert then conflicts with it
+        with mock.patch.object(progress, "_locked_rows", side_effect=[{}, locked_rows(self.user.pk, {self.video.pk})]):
+            self.watch((50, 60))
+        row = UserVideoProgress.objects.get(user=self.user, video=self.video)
+        self.assertEqual((row.watched_ranges, row.watched_seconds), ([[0, 30], [50, 60]], 40))
+
+    def test_migrations_backfill_progress_from_the_log(self):
+        now = timezone.now()
+        for minutes, watch_time, start, end in ((3, 30, 0, 30), (2, 30, 20, 50), (1, 10, 80, 90)):
+            UserViewLog.objects.create(
+                user=self.user, video=self.video, watch_date=now - timedelta(minutes=minutes),
+                watch_time=watch_time, video_time_start=start, video_time_end=end,
+            )
+        with connection.cursor() as cursor:
+            # columns added after 0003 have no database default
+            for column, default in (
+                ("last_position", "0"), ("watched_seconds", "0"), ("watched_ranges", "'[]'"),
+                ("coverage", "0"), ("completed", "false"), ("updated_at", "now()"),
+            ):
+                cursor.execute(f"ALTER TABLE journal_uservideoprogress ALTER {column} SET DEFAULT {default}")
+            for name in ("0003_uservideoprogress", "0005_uservideoprogress_rollup"):
+                migration = importlib.import_module(f"backend.journal.migrations.{name}").Migration
+                cursor.execute(migration.operations[-1].sql)
+
+        row = UserVideoProgress.objects.get(user=self.user, video=self.video)
+        self.assertEqual(
+            (row.first_watched_at, row.last_watched_at), (now - timedelta(minutes=3), now - timedelta(minutes=1)),
+        )
+        self.assertEqual((row.watched_ranges, row.watched_seconds, row.last_position), ([[0, 50], [80, 90]], 70, 90))
+        self.assertAlmostEqual(row.coverage, 0.6)
+        self.assertFalse(row.completed)
+
+    def test_api_reads_the_rollup(self):
+        self.watch((0, 25))
+        detail = self.client.get(f"/api/videos/{self.video.pk}/").json()
+        self.assertEqual((detail["lastWatchTime"], detail["coverage"], detail["completed"]), (25, 0.25, False))
+        resume = self.client.get(f"/api/videos/{self.video.pk}/progress/").json()
+        self.assertEqual((resume["lastWatchTime"], resume["watchedSeconds"]), (25, 25))
+
+        self.client.post(f"/api/videos/{self.video.pk}/mark-as-watched/")
+        self.assertTrue(self.client.get(f"/api/videos/{self.video.pk}/progress/").json()["completed"])
+
+
+class DailyTotalsTests(ViewerFixture, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def totals(self):
+        return list(
+            UserDailyTotals.objects.filter(user=self.user).order_by("day").values_list("day", "on_seconds", "off_seconds")
+        )
+
+    def test_writes_keep_totals_equal_to_a_rebuild(self):
+        now = timezone.now()
+        with self.settings(WATCHTIME_WRITE_BEHIND=False):
+            submit([heartbeat(self.user.pk, self.video.pk, now - timedelta(days=2), 30, 0, 30)])
+            submit([heartbeat(self.user.pk, self.video.pk, now - timedelta(days=2, seconds=-30), 30, 30, 60)])
+        self.client.post(f"/api/videos/{self.video.pk}/mark-as-watched/")
+        spread = self.client.post("/api/journal/", {
+            "startDate": "2024-03-01", "endDate": "2024-03-03", "minutes": 30, "comment": "",
+        }, format="json").json()
+        gone = self.client.post("/api/journal/", {"date": "2024-03-02", "minutes": 10}, format="json").json()
+        self.client.delete(f"/api/journal/{gone['id']}/")
+
+        incremental = self.totals()
+        self.assertIn((now.date() - timedelta(days=2), 60, 0.0), incremental)
+        self.assertEqual(
+            [row for row in incremental if row[0].year == 2024],
+            [(date(2024, 3, d), 0, 600.0) for d in (1, 2, 3)],
+        )
+        self.assertEqual(spread["totalInputMinutes"], 30)
+        rebuild("journal", user_ids=[self.user.pk])
+        self.assertEqual(self.totals(), incremental)
+
+    def test_endpoints_read_the_totals(self):
+        UserDailyTotals.objects.create(user=self.user, day=date(2024, 1, 1), on_seconds=3600, off_seconds=1800)
+        UserWordFrequency.objects.create(user=self.user, word="hola", count=4)
+        UserWordFrequency.objects.create(user=self.user, word="adios", count=3)
+
+        self.assertEqual(self.client.get("/api/journal/overall/").json(), {"hours": 1.5, "words": 7})
+        self.client.post("/api/journal/word-frequency/reset/")
+        self.assertEqual(self.client.get("/api/journal/overall/").json()["words"], 0)
+        self.assertEqual(self.client.get("/api/journal/overview/").json()["totalMinutes"], 30)
+
+    def test_calendar_reads_a_window_in_columns(self):
+        for day in (date(2023, 12, 31), date(2024, 1, 1), date(2024, 1, 20)):
+            UserDailyTotals.objects.create(user=self.user, day=day, on_seconds=day.day, off_seconds=0.4)
+        UserDailyTotals.objects.create(user=self.user, day=date(2024, 1, 2))  # nothing left that day
+
+        response = self.client.get("/api/journal/consistency/calendar/?from=2024-01-01&to=2024-01-31")
+        self.assertEqual(response.json(), {
+            "from": "2024-01-01", "to": "2024-01-31",
+            "dates": ["2024-01-01", "2024-01-20"], "on": [1, 20], "off": [0, 0],
+        })
+        default = self.client.get("/api/journal/consistency/calendar/").json()
+        self.assertEqual(date.fromisoformat(default["to"]) - date.fromisoformat(default["from"]), timedelta(days=364))
+        self.assertEqual(self.client.get("/api/journal/consistency/calendar/?from=2024-02-01&to=2024-01-01").status_code, 400)
+
+    def periods(self):
+        return list(
+            UserPeriodTotals.objects.filter(user=self.user).order_by("granularity", "start")
+            .values_list("granularity", "start", "on_seconds", "off_seconds")
+        )
+
+    def test_period_rollups_follow_the_daily_totals(self):
+        for day in ("2023-12-31", "2024-01-01", "2024-02-29"):
+            self.client.post("/api/journal/", {"date": day, "minutes": 10}, format="json")
+        incremental = self.periods()
+        self.assertEqual(incremental, [
+            ("month", date(2023, 12, 1), 0, 600.0),
+            ("month", date(2024, 1, 1), 0, 600.0),
+            ("month", date(2024, 2, 1), 0, 600.0),
+            ("week", date(2023, 12, 25), 0, 600.0),
+            ("week", date(2024, 1, 1), 0, 600.0),
+            ("week", date(2024, 2, 26), 0, 600.0),
+        ])
+        rebuild("journal", user_ids=[self.user.pk])
+        self.assertEqual(self.periods(), incremental)
+
+        def progress(query):
+            return self.client.get(f"/api/journal/progress/?{query}").json()
+
+        self.assertEqual(progress("granularity=week&from=2024-01-03&to=2024-03-31")["periods"], ["2024-01-01", "2024-02-26"])
+        self.assertEqual(progress("granularity=month&from=2024-01-15&to=2024-12-31")["off"], [600, 600])
+        self.assertEqual(progress("granularity=year&to=2024-12-31"), {
+            "granularity": "year", "from": None, "to": "2024-12-31",
+            "periods": ["2023-01-01", "2024-01-01"], "on": [0, 0], "off": [600, 1200],
+        })
+        self.assertEqual(progress("granularity=day&from=2024-01-01&to=2024-01-31")["periods"], ["2024-01-01"])
+        default = progress("granularity=month")
+        self.assertEqual(date.fromisoformat(default["from"]).day, 1)
+        self.assertEqual(self.client.get("/api/journal/progress/?granularity=hour").status_code, 400)
+
+
+class ViewLogPartitionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="viewer", password="x")
+
+    def log(self, when):
+        return UserViewLog.objects.create(user=self.user, watch_date=when, watch_time=10)
+
+    def partition_of(self, row):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT tableoid::regclass::text FROM {partitions.TABLE} WHERE id = %s", [row.pk])
+            return cursor.fetchone()[0]
+
+    def test_rows_go_to_their_month_and_ranges_are_pruned(self):
+        now = timezone.now()
+        month = partitions.month_start(now)
+        self.assertEqual(self.partition_of(self.log(now)), partitions.partition_name(month))
+
+        start = timezone.make_aware(datetime(month.year, month.month, 1))
+        plan = UserViewLog.objects.filter(watch_date__gte=start, watch_date__lt=start + timedelta(days=7)).explain()
+        self.assertIn(partitions.partition_name(month), plan)
+        self.assertNotIn(partitions.partition_name(partitions.next_month(month)), plan)
+        self.assertNotIn(partitions.DEFAULT_PARTITION, plan)
+
+    def test_old_months_move_out_of_default_and_are_archived(self):
+        row = self.log(timezone.make_aware(datetime(2001, 1, 15)))
+        self.assertEqual(self.partition_of(row), partitions.DEFAULT_PARTITION)
+
+        self.assertTrue(partitions.create_partition(date(2001, 1, 1)))
+        self.assertEqual(self.partition_of(row), "journal_userviewlog_p200101")
+        self.assertEqual(partitions.ensure_partitions(), [])
+
+        with tempfile.TemporaryDirectory() as archive:
+            detached = partitions.detach_partitions(date(2001, 2, 1), archive_dir=archive)
+            self.assertEqual(detached, ["journal_userviewlog_p200101"])
+            with gzip.open(Path(archive) / "journal_userviewlog_p200101.csv.gz", "rt") as dump:
+                lines = dump.read().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertFalse(UserViewLog.objects.filter(pk=row.pk).exists())
+        self.assertNotIn(date(2001, 1, 1), partitions.partitions())
+
+    def test_rebuild_keeps_the_totals_of_detached_months(self):
+        old = self.log(timezone.make_aware(datetime(2001, 1, 15)))
+        add_watch_time(UserDailyTotals, [(self.user.pk, old.watch_date, old.watch_time)])
+        partitions.create_partition(date(2001, 1, 1))
+        partitions.detach_partitions(date(2001, 2, 1), drop=True)
+        self.log(timezone.now())
+
+        rebuild("journal", user_ids=[self.user.pk])
+        self.assertEqual(
+            list(UserDailyTotals.objects.order_by("day").values_list("day", "on_seconds")),
+            [(date(2001, 1, 15), 10), (timezone.localdate(), 10)],
+        )
+
+
+class CompactionTests(ViewerFixture, TestCase):
+    def test_old_rows_become_one_per_video_and_day(self):
+        today = timezone.localdate()
+        old = timezone.make_aware(datetime.combine(today - timedelta(days=200), datetime.min.time())) + timedelta(hours=9)
+        recent = old + timedelta(days=199)
+        with self.settings(WATCHTIME_WRITE_BEHIND=False):
+            for at, start in [
+                (old, 0), (old + timedelta(hours=1), 300), (old + timedelta(hours=2), 100),
+                (recent, 0), (recent + timedelta(hours=1), 50),
+            ]:
+                submit([heartbeat(self.user.pk, self.video.pk, at, 30, start, start + 30)])
+        # rows of a deleted video
+        for minutes in (0, 30):
+            UserViewLog.objects.create(user=self.user, watch_date=old + timedelta(minutes=minutes), watch_time=7)
+        rebuild("journal", user_ids=[self.user.pk])
+        totals = list(UserDailyTotals.objects.filter(user=self.user).order_by("day").values_list("day", "on_seconds"))
+        self.assertEqual(UserViewLog.objects.count(), 7)
+
+        self.assertEqual(list(compact("journal", verify=True)), [(self.user.pk, 5, 2)])
+
+        compacted = UserViewLog.objects.get(video=self.video, watch_date__lt=recent)
+        self.assertEqual(
+            (compacted.watch_date, compacted.watch_time, compacted.video_time_start, compacted.video_time_end),
+            (old, 90, 0.0, 330.0),
+        )
+        self.assertEqual(UserViewLog.objects.get(video=None).watch_time, 14)
+        self.assertEqual(UserViewLog.objects.count(), 4)
+        rebuild("journal", user_ids=[self.user.pk])
+        self.assertEqual(
+            list(UserDailyTotals.objects.filter(user=self.user).order_by("day").values_list("day", "on_seconds")), totals,
+        )
+        # a rerun finds nothing left to do
+        self.assertEqual(list(compact("journal", verify=True)), [(self.user.pk, 0, 0)])
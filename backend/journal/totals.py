@@ -0,0 +1,344 @@
+"""
+Per-user daily totals (``UserDailyTotals``).
+
+Every write to a log the dashboard sums also adds its delta to the user's row
+for the day, in the same transaction:
+
+- watch time (``UserViewLog.watch_time``) goes to the local day of the log
+  row's ``watch_date``, the day ``watch_date__date`` grouping would give it;
+- off-platform time (``OffPlatformLog.time_duration``) is spread evenly over
+  the local days from ``date_start`` to ``date_end`` (at least the first).
+
+Word counts have no dates; ``user_totals`` sums them from the user's
+``UserWordFrequency`` rows.
+
+Deltas are applied with ``INSERT ... ON CONFLICT DO UPDATE SET x = x + delta``,
+one statement per batch of (user, day) keys in key order, so concurrent
+writers never lose an increment or deadlock on each other.
+
+The journal stack also rolls every delta up into ``UserPeriodTotals`` (ISO
+weeks and months) in the same statement batch, so ``progress_columns`` can
+answer any range at day, week, month or year granularity from a few index
+range reads; years are summed from at most twelve month rows each.
+
+Both stacks have their own tables: ``journal`` (the API) and ``platform``
+(the legacy views); see ``STACKS``.
+"""
+
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncYear
+from django.utils import timezone
+
+from .models import OffPlatformLog, UserDailyTotals, UserPeriodTotals, UserViewLog, UserWordFrequency
+
+UPSERT_BATCH = 1000
+# default consistency-calendar window, ending today
+CALENDAR_DAYS = 365
+# default progress window per granularity, in buckets ending today (years: all time)
+PROGRESS_BUCKETS = {"day": 365, "week": 52, "month": 24}
+
+
+def _stacks():
+    from backend.platform import models as legacy
+
+    return {
+        # totals, watch log, off-platform log, word frequencies
+        "journal": (UserDailyTotals, UserViewLog, OffPlatformLog, UserWordFrequency),
+        "platform": (legacy.UserDailyTotals, legacy.UserViewLog, legacy.OffPlatformLog, legacy.UserWordFrequency),
+    }
+
+
+STACKS = ("journal", "platform")
+# daily totals model -> its week/month rollup
+PERIOD_TOTALS = {UserDailyTotals: UserPeriodTotals}
+GRANULARITIES = ("day", "week", "month", "year")
+
+
+def local_day(value):
+    """The ``TIME_ZONE`` date of ``value`` (naive datetimes are taken as local already)."""
+    return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+
+
+def off_platform_days(start, end):
+    """Days an off-platform log from ``start`` to ``end`` is spread over."""
+    first, last = local_day(start), local_day(end)
+    return [first + timedelta(days=i) for i in range(max((last - first).days + 1, 1))]
+
+
+def period_start(day, granularity):
+    """First day of the ``granularity`` bucket holding ``day``."""
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    if granularity == "year":
+        return day.replace(month=1, day=1)
+    return day
+
+
+def _upsert(model, key_columns, deltas):
+    """Add ``{key: (on, off)}`` to ``model``'s rows (``key`` values of ``key_columns``)."""
+    table = model._meta.db_table
+    columns = (*key_columns, "on_seconds", "off_seconds")
+    row = f"({', '.join(['%s'] * len(columns))})"
+    keys = sorted(deltas)
+    for start in range(0, len(keys), UPSERT_BATCH):
+        batch = keys[start:start + UPSERT_BATCH]
+        params = [v for key in batch for v in (*key, *deltas[key])]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} AS t ({', '.join(columns)}) VALUES {', '.join([row] * len(batch))} "
+                f"ON CONFLICT ({', '.join(key_columns)}) DO UPDATE SET "
+                "on_seconds = t.on_seconds + EXCLUDED.on_seconds, "
+                "off_seconds = t.off_seconds + EXCLUDED.off_seconds",
+                params,
+            )
+
+
+def _apply(totals, deltas):
+    """Add ``{(user_id, day): (on, off)}`` to ``totals`` and its period rollup."""
+    _upsert(totals, ("user_id", "day"), deltas)
+    periods = PERIOD_TOTALS.get(totals)
+    if periods is None:
+        return
+    rolled = {}
+    for (user_id, day), (on, off) in deltas.items():
+        for granularity in periods.Granularity.values:
+            key = (user_id, granularity, period_start(day, granularity))
+            total = rolled.get(key, (0, 0.0))
+            rolled[key] = (total[0] + on, total[1] + off)
+    _upsert(periods, ("user_id", "granularity", "start"), rolled)
+
+
+def add_watch_time(totals, entries):
+    """Add ``(user_id, watch_date, seconds)`` entries (``watch_date`` of the log row credited)."""
+    deltas = {}
+    for user_id, watch_date, seconds in entries:
+        key = (user_id, local_day(watch_date))
+        deltas[key] = (deltas.get(key, (0, 0.0))[0] + int(seconds), 0.0)
+    _apply(totals, deltas)
+
+
+def add_off_platform(totals, logs, sign=1):
+    """Add (``sign=-1``: remove) off-platform logs."""
+    deltas = {}
+    for log in logs:
+        days = off_platform_days(log.date_start, log.date_end)
+        per_day = sign * (log.time_duration or 0) / len(days)
+        for day in days:
+            on, off = deltas.get((log.user_id, day), (0, 0.0))
+            deltas[log.user_id, day] = (on, off + per_day)
+    _apply(totals, deltas)
+
+
+def user_totals(totals, user_id, since=None):
+    """
+    ``{"on", "off", "words"}``: seconds summed over the user's days (from
+    ``since`` on) and the word count of the stack's ``UserWordFrequency``,
+    which has no dates.
+    """
+    qs = totals.objects.filter(user_id=user_id)
+    if since is not None:
+        qs = qs.filter(day__gte=since)
+    agg = qs.aggregate(on=Sum("on_seconds"), off=Sum("off_seconds"))
+    words = next(stack[3] for stack in _stacks().values() if stack[0] is totals)
+    count = words.objects.filter(user_id=user_id).aggregate(s=Sum("count"))["s"]
+    return {"on": agg["on"] or 0, "off": agg["off"] or 0.0, "words": count or 0}
+
+
+def daily_rows(totals, user_id):
+    """``(day, on_seconds, off_seconds)`` of the user's active days, oldest first."""
+    return (
+        totals.objects.filter(user_id=user_id).exclude(on_seconds=0, off_seconds=0)
+        .order_by("day").values_list("day", "on_seconds", "off_seconds")
+    )
+
+
+def _parse_day(value, name):
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"'{name}' must be a YYYY-MM-DD date") from None
+
+
+def calendar_window(params):
+    """``(from, to)`` dates of ``from``/``to`` query params; by default the last ``CALENDAR_DAYS`` days."""
+    end = _parse_day(params.get("to"), "to") or timezone.localdate()
+    start = _parse_day(params.get("from"), "from") or end - timedelta(days=CALENDAR_DAYS - 1)
+    if start > end:
+        raise ValueError("'from' is after 'to'")
+    return start, end
+
+
+def calendar_columns(totals, user_id, start, end):
+    """
+    Active days of ``[start, end]`` as parallel arrays: ``dates`` (ISO),
+    ``on`` and ``off`` (seconds). One range read on the (user, day) index,
+    however long the user's history.
+    """
+    dates, on, off = [], [], []
+    for day, on_seconds, off_seconds in daily_rows(totals, user_id).filter(day__range=(start, end)):
+        dates.append(day.isoformat())
+        on.append(on_seconds)
+        off.append(round(off_seconds))
+    return {"from": start.isoformat(), "to": end.isoformat(), "dates": dates, "on": on, "off": off}
+
+
+def _months_before(day, months):
+    index = day.year * 12 + day.month - 1 - months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def progress_window(params):
+    """
+    ``(granularity, from, to)`` of ``granularity``/``from``/``to`` query
+    params, ``from`` moved back to its bucket's first day (``None``: all time).
+    """
+    granularity = params.get("granularity") or "day"
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"'granularity' must be one of {', '.join(GRANULARITIES)}")
+    end = _parse_day(params.get("to"), "to") or timezone.localdate()
+    start = _parse_day(params.get("from"), "from")
+    if start is None and granularity in PROGRESS_BUCKETS:
+        buckets = PROGRESS_BUCKETS[granularity] - 1
+        if granularity == "day":
+            start = end - timedelta(days=buckets)
+        elif granularity == "week":
+            start = period_start(end, "week") - timedelta(weeks=buckets)
+        else:
+            start = _months_before(end, buckets)
+    if start is not None:
+        start = period_start(start, granularity)
+        if start > end:
+            raise ValueError("'from' is after 'to'")
+    return granularity, start, end
+
+
+def progress_columns(user_id, granularity, start, end):
+    """
+    On/off-platform seconds per ``granularity`` bucket starting within
+    ``[start, end]`` (``start`` ``None``: all time), as parallel arrays of
+    the active buckets. Buckets are whole: a week or month overlapping
+    ``end`` includes its later days.
+    """
+    if granularity == "day":
+        rows = daily_rows(UserDailyTotals, user_id).filter(day__range=(start, end))
+    else:
+        periods = UserPeriodTotals.objects.filter(
+            user_id=user_id, granularity="month" if granularity == "year" else granularity, start__lte=end,
+        )
+        if start is not None:
+            periods = periods.filter(start__gte=start)
+        if granularity == "year":
+            periods = (
+                periods.annotate(year=TruncYear("start")).values("year")
+                .annotate(on=Sum("on_seconds"), off=Sum("off_seconds"))
+                .order_by("year").values_list("year", "on", "off")
+            )
+            rows = [row for row in periods if row[1] or row[2]]
+        else:
+            rows = periods.exclude(on_seconds=0, off_seconds=0).order_by("start").values_list(
+                "start", "on_seconds", "off_seconds",
+            )
+    buckets, on, off = [], [], []
+    for bucket, on_seconds, off_seconds in rows:
+        buckets.append(bucket.isoformat())
+        on.append(on_seconds)
+        off.append(round(off_seconds))
+    return {
+        "granularity": granularity, "from": start and start.isoformat(), "to": end.isoformat(),
+        "periods": buckets, "on": on, "off": off,
+    }
+
+
+REBUILD_SQL = """
+    INSERT INTO {totals} (user_id, day, on_seconds, off_seconds)
+    SELECT user_id, day, SUM(on_seconds), SUM(off_seconds)
+    FROM (
+        SELECT user_id, (watch_date AT TIME ZONE %(tz)s)::date AS day,
+               SUM(watch_time) AS on_seconds, 0::float8 AS off_seconds
+        FROM {view_log}
+        WHERE user_id BETWEEN %(lo)s AND %(hi)s AND (%(since)s::timestamptz IS NULL OR watch_date >= %(since)s)
+        GROUP BY 1, 2
+      UNION ALL
+        SELECT user_id, day::date, 0, time_duration::float8 / (GREATEST(last_day, first_day) - first_day + 1)
+        FROM (
+            SELECT user_id, time_duration,
+                   (date_start AT TIME ZONE %(tz)s)::date AS first_day,
+                   (date_end AT TIME ZONE %(tz)s)::date AS last_day
+            FROM {off_log}
+            WHERE user_id BETWEEN %(lo)s AND %(hi)s
+        ) AS logs,
+        generate_series(first_day::timestamp, GREATEST(last_day, first_day)::timestamp, interval '1 day') AS day
+    ) AS parts
+    GROUP BY user_id, day
+"""
+
+
+PERIOD_REBUILD_SQL = """
+    INSERT INTO {periods} (user_id, granularity, start, on_seconds, off_seconds)
+    SELECT user_id, g.granularity, date_trunc(g.granularity, day::timestamp)::date,
+           SUM(on_seconds), SUM(off_seconds)
+    FROM {totals} CROSS JOIN (VALUES ('week'), ('month')) AS g (granularity)
+    WHERE user_id BETWEEN %(lo)s AND %(hi)s
+    GROUP BY 1, 2, 3
+"""
+
+
+def rebuild(stack="journal", batch_size=1000, user_ids=None):
+    """
+    Recompute ``stack``'s totals (and period rollups) from its logs,
+    ``batch_size`` users per transaction (or just ``user_ids``). Returns the
+    number of daily rows written.
+
+    The journal log's old months may have been detached
+    (``partitions.detach_partitions``): the on-platform seconds of the days
+    before ``partitions.rebuild_floor()`` are kept as they are, not
+    recomputed from what is left of the log.
+    """
+    from backend.users.models import User
+    from .partitions import rebuild_floor
+
+    totals, view_log, off_log, _ = _stacks()[stack]
+    sql = REBUILD_SQL.format(
+        totals=totals._meta.db_table, view_log=view_log._meta.db_table, off_log=off_log._meta.db_table,
+    )
+    users = User.objects.order_by("pk").values_list("pk", flat=True)
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    users = list(users)
+    floor = rebuild_floor() if stack == "journal" else None
+    since = floor and timezone.make_aware(datetime.combine(floor, time.min))
+    written = 0
+    for start in range(0, len(users), batch_size):
+        chunk = users[start:start + batch_size]
+        lo, hi = chunk[0], chunk[-1]
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                # waits for in-flight writers of these totals and holds off new
+                # ones, so the logs read below and the deltas after agree
+                cursor.execute(f"LOCK TABLE {totals._meta.db_table} IN SHARE ROW EXCLUSIVE MODE")
+                rows = totals.objects.filter(user_id__gte=lo, user_id__lte=hi)
+                kept = {} if floor is None else {
+                    (user_id, day): (on, 0.0)
+                    for user_id, day, on in rows.filter(day__lt=floor).exclude(on_seconds=0)
+                    .values_list("user_id", "day", "on_seconds")
+                }
+                rows.delete()
+                cursor.execute(sql, {"tz": settings.TIME_ZONE, "lo": lo, "hi": hi, "since": since})
+                _upsert(totals, ("user_id", "day"), kept)
+                written += rows.count()
+                periods = PERIOD_TOTALS.get(totals)
+                if periods is not None:
+                    periods.objects.filter(user_id__gte=lo, user_id__lte=hi).delete()
+                    cursor.execute(
+                        PERIOD_REBUILD_SQL.format(periods=periods._meta.db_table, totals=totals._meta.db_table),
+                        {"lo": lo, "hi": hi},
+                    )
+    return written
@@ -1,13 +1,19 @@
-from collections import defaultdict
-from datetime import timedelta
-
+from django.db import transaction
 from django.db.models import Sum
 from django.utils import timezone
 from rest_framework import viewsets, permissions, decorators, response
 from rest_framework.response import Response
 
-from .models import OffPlatformLog, UserViewLog, UserWordFrequency
+from .models import OffPlatformLog, UserDailyTotals, UserWordFrequency
 from .serializers import JournalNoteSerializer
+from .totals import (
+	add_off_platform, calendar_columns, calendar_window, progress_columns, progress_window, user_totals,
+)
+
+
+def _off_platform_seconds(user):
+	# from the daily totals (O(days)); off-platform days hold fractional shares of spread logs
+	return round(user_totals(UserDailyTotals, user.pk)['off'])
 
 
 class IsOwner(permissions.BasePermission):
@@ -29,21 +35,32 @@ class JournalViewSet(viewsets.ModelViewSet):
 			qs = qs.filter(date_start__date__lte=q_to)
 		return qs
 
+	# every write also moves the user's daily totals, in the same transaction
 	def perform_create(self, serializer):
 		user = self.request.user
-		existing_minutes = (OffPlatformLog.objects.filter(user=user).aggregate(total=Sum('time_duration'))['total'] or 0)//60
-		minutes_now = int(self.request.data.get('minutes', 0))
-		obj = serializer.save()
-		obj.total_input_minutes_snapshot = existing_minutes + minutes_now
-		obj.save()
+		with transaction.atomic():
+			existing_minutes = _off_platform_seconds(user)//60
+			minutes_now = int(self.request.data.get('minutes', 0))
+			obj = serializer.save()
+			obj.total_input_minutes_snapshot = existing_minutes + minutes_now
+			obj.save()
+			add_off_platform(UserDailyTotals, [obj])
 
 	def perform_update(self, serializer):
-		instance = self.get_object()
+		instance = serializer.instance
 		user = self.request.user
-		others_minutes = (OffPlatformLog.objects.filter(user=user).exclude(pk=instance.pk).aggregate(total=Sum('time_duration'))['total'] or 0)//60
-		obj = serializer.save()
-		obj.total_input_minutes_snapshot = others_minutes + (obj.time_duration // 60)
-		obj.save()
+		with transaction.atomic():
+			others_minutes = (_off_platform_seconds(user) - instance.time_duration)//60
+			add_off_platform(UserDailyTotals, [instance], sign=-1)
+			obj = serializer.save()
+			obj.total_input_minutes_snapshot = others_minutes + (obj.time_duration // 60)
+			obj.save()
+			add_off_platform(UserDailyTotals, [obj])
+
+	def perform_destroy(self, instance):
+		with transaction.atomic():
+			add_off_platform(UserDailyTotals, [instance], sign=-1)
+			instance.delete()
 
 	@decorators.action(detail=False, methods=['get'], url_path='options', permission_classes=[permissions.AllowAny])
 	def options_action(self, request):
@@ -74,24 +91,29 @@ class JournalViewSet(viewsets.ModelViewSet):
 		user = request.user
 		today = timezone.now().date()
 		qs = OffPlatformLog.objects.filter(user=user)
-		total_minutes = (qs.aggregate(total=Sum('time_duration'))['total'] or 0)//60
+		total_minutes = _off_platform_seconds(user)//60
 		today_minutes = (qs.filter(date_start__date__lte=today, date_end__date__gte=today).aggregate(total=Sum('time_duration'))['total'] or 0)//60
 		return response.Response({'todayMinutes': int(today_minutes), 'totalMinutes': int(total_minutes)})
 
 	@decorators.action(detail=False, methods=['get'], url_path='consistency/calendar')
 	def consistency_calendar(self, request):
-		user = request.user
-		date2on_off2seconds = defaultdict(lambda: {'on': 0, 'off': 0})
-		for row in (UserViewLog.objects.filter(user=user).values('watch_date__date').annotate(total=Sum('watch_time'))):
-			d = row['watch_date__date'].strftime('%Y-%m-%d')
-			date2on_off2seconds[d]['on'] += row['total'] or 0
-		for l in OffPlatformLog.objects.filter(user=user).only('date_start','date_end','time_duration'):
-			d1 = l.date_start.date(); d2 = l.date_end.date(); days = (d2-d1).days + 1
-			per_day = (l.time_duration or 0)/max(days,1)
-			for i in range(days):
-				d = (d1 + timedelta(days=i)).strftime('%Y-%m-%d')
-				date2on_off2seconds[d]['off'] += per_day
-		return Response(sorted(date2on_off2seconds.items()))
+		# ?from=&to= (YYYY-MM-DD, default: the last 365 days) ->
+		# {from, to, dates: [...], on: [...], off: [...]}, active days only
+		try:
+			start, end = calendar_window(request.query_params)
+		except ValueError as e:
+			return Response({'error': str(e)}, status=400)
+		return Response(calendar_columns(UserDailyTotals, request.user.pk, start, end))
+
+	@decorators.action(detail=False, methods=['get'], url_path='progress')
+	def progress(self, request):
+		# ?granularity=day|week|month|year&from=&to= -> {granularity, from, to, periods: [bucket start], on: [...], off: [...]}
+		# read from the daily / weekly / monthly rollups (journal/totals.py)
+		try:
+			granularity, start, end = progress_window(request.query_params)
+		except ValueError as e:
+			return Response({'error': str(e)}, status=400)
+		return Response(progress_columns(request.user.pk, granularity, start, end))
 
 	@decorators.action(detail=False, methods=['get'], url_path='word-frequency')
 	def word_frequency(self, request):
@@ -105,8 +127,5 @@ class JournalViewSet(viewsets.ModelViewSet):
 
 	@decorators.action(detail=False, methods=['get'], url_path='overall')
 	def overall(self, request):
-		user = request.user
-		seconds_on = UserViewLog.objects.filter(user=user).aggregate(s=Sum('watch_time'))['s'] or 0
-		seconds_off = OffPlatformLog.objects.filter(user=user).aggregate(s=Sum('time_duration'))['s'] or 0
-		words = UserWordFrequency.objects.filter(user=user).aggregate(s=Sum('count'))['s'] or 0
-		return Response({'hours': (seconds_on + seconds_off)/3600.0, 'words': words})
+		totals = user_totals(UserDailyTotals, request.user.pk)
+		return Response({'hours': (totals['on'] + totals['off'])/3600.0, 'words': totals['words']})
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from .models import (
     Channel, Speaker, Tag, Video,
-    UserViewLog, OffPlatformLog, UserWordFrequency,
+    UserViewLog, OffPlatformLog, UserWordFrequency, UserDailyTotals,
 )
 
 @admin.register(Channel)
@@ -57,3 +57,8 @@ class OffPlatformLogAdmin(admin.ModelAdmin):
 class UserWordFrequencyAdmin(admin.ModelAdmin):
     list_display = ("id", "user", "word", "count")
     search_fields = ("user__email", "word")
+
+@admin.register(UserDailyTotals)
+class UserDailyTotalsAdmin(admin.ModelAdmin):
+    list_display = ("id", "user", "day", "on_seconds", "off_seconds")
+    search_fields = ("user__email",)
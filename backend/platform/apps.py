@@ -4,3 +4,6 @@ class PlatformConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "backend.platform"
     verbose_name = "Platform"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,39 @@
+from django.db import migrations
+
+
+# recompute the tsvector only when the text changes, not on every UPDATE of
+# the row (view counts, updated_at bumps); Django's save() names every column,
+# hence the WHEN as well as the column list
+TRIGGERS = """
+DROP TRIGGER platform_video_search_vector_trigger ON platform_video;
+
+CREATE TRIGGER platform_video_search_vector_insert
+    BEFORE INSERT ON platform_video
+    FOR EACH ROW EXECUTE FUNCTION platform_video_search_vector_update();
+
+CREATE TRIGGER platform_video_search_vector_update
+    BEFORE UPDATE OF title, description ON platform_video
+    FOR EACH ROW
+    WHEN (OLD.title IS DISTINCT FROM NEW.title OR OLD.description IS DISTINCT FROM NEW.description)
+    EXECUTE FUNCTION platform_video_search_vector_update();
+"""
+
+ONE_TRIGGER = """
+DROP TRIGGER platform_video_search_vector_insert ON platform_video;
+DROP TRIGGER platform_video_search_vector_update ON platform_video;
+
+CREATE TRIGGER platform_video_search_vector_trigger
+    BEFORE INSERT OR UPDATE ON platform_video
+    FOR EACH ROW EXECUTE FUNCTION platform_video_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platform', '0007_userdailytotals'),
+    ]
+
+    operations = [
+        migrations.RunSQL(TRIGGERS, ONE_TRIGGER),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platform', '0008_search_vector_trigger_columns'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='userdailytotals',
+            name='words',
+        ),
+    ]
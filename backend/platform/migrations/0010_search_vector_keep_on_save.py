@@ -0,0 +1,61 @@
+from django.db import migrations
+
+
+# save() writes every column, search_vector included (NULL or whatever the
+# instance last read), so the 0008 trigger, which only fires when the text
+# changes, let a plain save() wipe the vector. Updates that touch the vector
+# without changing the text now keep the stored one; text changes recompute it.
+TRIGGERS = """
+CREATE FUNCTION platform_video_search_vector_refresh() RETURNS trigger AS $$
+BEGIN
+    IF OLD.title IS NOT DISTINCT FROM NEW.title AND OLD.description IS NOT DISTINCT FROM NEW.description THEN
+        NEW.search_vector := OLD.search_vector;
+    ELSE
+        NEW.search_vector :=
+            setweight(to_tsvector('pg_catalog.russian', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('pg_catalog.russian', coalesce(NEW.description, '')), 'B');
+    END IF;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+-- rows already wiped by a save(); the 0008 trigger ignores this update
+UPDATE platform_video SET search_vector =
+    setweight(to_tsvector('pg_catalog.russian', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('pg_catalog.russian', coalesce(description, '')), 'B')
+WHERE search_vector IS NULL;
+
+DROP TRIGGER platform_video_search_vector_update ON platform_video;
+
+CREATE TRIGGER platform_video_search_vector_update
+    BEFORE UPDATE OF title, description, search_vector ON platform_video
+    FOR EACH ROW
+    WHEN (
+        OLD.title IS DISTINCT FROM NEW.title OR OLD.description IS DISTINCT FROM NEW.description
+        OR OLD.search_vector IS DISTINCT FROM NEW.search_vector
+    )
+    EXECUTE FUNCTION platform_video_search_vector_refresh();
+"""
+
+TEXT_ONLY = """
+DROP TRIGGER platform_video_search_vector_update ON platform_video;
+
+CREATE TRIGGER platform_video_search_vector_update
+    BEFORE UPDATE OF title, description ON platform_video
+    FOR EACH ROW
+    WHEN (OLD.title IS DISTINCT FROM NEW.title OR OLD.description IS DISTINCT FROM NEW.description)
+    EXECUTE FUNCTION platform_video_search_vector_update();
+
+DROP FUNCTION platform_video_search_vector_refresh();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platform', '0009_remove_totals_words'),
+    ]
+
+    operations = [
+        migrations.RunSQL(TRIGGERS, TEXT_ONLY),
+    ]
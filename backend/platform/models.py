@@ -1,6 +1,8 @@
 from django.conf import settings
 from django.db import models
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 
 
 class Channel(models.Model):
@@ -55,6 +57,9 @@ class Video(models.Model):
     tags = models.ManyToManyField(Tag, related_name="videos", blank=True)
     speakers = models.ManyToManyField(Speaker, related_name="videos", blank=True)
 
+    # russian tsvector of title + description, maintained by a DB trigger
+    search_vector = SearchVectorField(null=True, editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -63,6 +68,10 @@ class Video(models.Model):
             models.Index(fields=["upload_date"]),
             models.Index(fields=["premium"]),
             models.Index(fields=["level"]),
+            GinIndex(fields=["search_vector"], name="platform_video_search_gin"),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["platform", "on_platform_id"], name="platform_video_platform_on_platform_id"),
         ]
 
     def __str__(self):
@@ -137,6 +146,19 @@ class OffPlatformLog(models.Model):
         return f"{self.user_id} - {self.date_start.date()} ({self.time_duration//60} min)"
 
 
+class UserDailyTotals(models.Model):
+    """Per-day sums of the logs above, maintained like ``journal.UserDailyTotals``."""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="daily_totals_old")
+    day = models.DateField()
+    on_seconds = models.BigIntegerField(default=0)
+    off_seconds = models.FloatField(default=0.0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "day"], name="platform_userdailytotals_user_day"),
+        ]
+
+
 class UserWordFrequency(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="word_freqs_old")
     word = models.CharField(max_length=128, db_index=True)
@@ -5,19 +5,37 @@ Thin service layer the views call. Uses Django ORM only.
 
 from contextlib import contextmanager
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from django.utils import timezone
 
 from backend.platform import models as m
 
 UserModel = get_user_model()
 
+DURATION_STEP = 60  # seconds per duration histogram bucket
+
+
+def _duration_seconds(value):
+    return int(value) * 60 if value > 1000 else int(value)
+
 
 # ------------------------
-# connection context (no-op)
+# connection context
 # ------------------------
+class Connection:
+    """
+    Request scope handed to the views by connect_context(). The ORM manages
+    the actual database connection; ``cache`` holds per-request lookups (see
+    utils/dimensions.py) so they are loaded once per request, not once per row.
+    """
+
+    def __init__(self):
+        self.cache = {}
+
+
 @contextmanager
 def connect_context():
-    yield None
+    yield Connection()
 
 
 # ------------------------
@@ -79,28 +97,36 @@ class Video:
             obj = m.Video.objects.filter(on_platform_id=str(video_id)).first()
         return obj
 
+    # browse sort keys; each ends with "id" so the order is total (keyset paging needs that)
+    SORT_ORDERINGS = {
+        "new": ("-upload_date", "-id"),
+        "old": ("upload_date", "id"),
+        "short": ("duration", "id"),
+        "long": ("-duration", "-id"),
+        "relevance": ("-search_rank", "-id"),
+    }
+
     @staticmethod
-    def all(
-        _conn,
+    def _browse(
         *,
         sort_order="new",
-        page=0,
         filters=None,
         speaker_ids=None,
         tag_ids=None,
-        user_id=None,
-        hide_watched=False,
         min_duration=None,
         max_duration=None,
         text="",
+        **_ignored,
     ):
-        from django.db.models import Q
+        """Filtered browse queryset and its ordering tuple."""
+        from backend.videos.search import full_text_search
 
         qs = m.Video.objects.all()
 
-        # text search (title/description)
+        # text search (title/description) through the GIN-indexed search_vector;
+        # same query and rank as the videos API
         if text:
-            qs = qs.filter(Q(title__icontains=text) | Q(description__icontains=text))
+            qs = full_text_search(qs, text)
 
         # levels
         if filters and filters.get("level"):
@@ -119,21 +145,19 @@ class Video:
 
         # duration
         if min_duration is not None:
-            qs = qs.filter(duration__gte=int(min_duration) * 60 if min_duration > 1000 else int(min_duration))
+            qs = qs.filter(duration__gte=_duration_seconds(min_duration))
         if max_duration is not None:
-            qs = qs.filter(duration__lte=int(max_duration) * 60 if max_duration > 1000 else int(max_duration))
+            qs = qs.filter(duration__lte=_duration_seconds(max_duration))
 
         # sort
-        if sort_order == "new":
-            qs = qs.order_by("-upload_date", "-id")
-        elif sort_order == "old":
-            qs = qs.order_by("upload_date", "id")
-        elif sort_order == "short":
-            qs = qs.order_by("duration")
-        elif sort_order == "long":
-            qs = qs.order_by("-duration")
-        else:
-            qs = qs.order_by("-id")
+        if sort_order == "relevance" and not text:
+            sort_order = None
+        ordering = Video.SORT_ORDERINGS.get(sort_order, ("-id",))
+        return qs.order_by(*ordering), ordering
+
+    @staticmethod
+    def all(_conn, *, page=0, **params):
+        qs, _ = Video._browse(**params)
 
         # paging
         PAGE_SIZE = 50
@@ -142,7 +166,155 @@ class Video:
             end = start + PAGE_SIZE
             return list(qs[start:end])
         return list(qs)
-    
+
+    @staticmethod
+    def page_after(_conn, *, cursor=None, page_size=50, **params):
+        """
+        Keyset page: the ``page_size`` videos after ``cursor`` in the browse
+        order, and the cursor for the page after that (None on the last page).
+        No OFFSET and no count, so every page costs the same.
+
+        Raises ValueError for a cursor that is malformed or was issued for a
+        different sort.
+        """
+        from backend.videos.pagination import decode_cursor, encode_cursor, keyset_filter
+
+        qs, ordering = Video._browse(**params)
+        if cursor:
+            qs = qs.filter(keyset_filter(ordering, decode_cursor(cursor, ordering)))
+        rows = list(qs[: page_size + 1])
+        videos = rows[:page_size]
+        next_cursor = None
+        if len(rows) > page_size:
+            next_cursor = encode_cursor(ordering, [getattr(videos[-1], f.lstrip("-")) for f in ordering])
+        return videos, next_cursor
+
+    @staticmethod
+    def facet_counts(
+        _conn,
+        *,
+        filters=None,
+        speaker_ids=None,
+        tag_ids=None,
+        min_duration=None,
+        max_duration=None,
+        text="",
+        **_ignored,
+    ):
+        """
+        Disjunctive facet counts for the browse sidebar, in one statement.
+
+        Each facet is counted over the videos matching every active filter
+        *except its own* ("how many would I get if I switched to this value").
+        Every filter is evaluated once per video as a boolean flag inside a
+        materialized CTE; the facets are then grouped from it with UNION ALL.
+
+        Returns {"total": n, "level": {name: n}, "channel": {id: n},
+        "speaker": {id: n}, "tag": {id: n}, "duration": {bucket: n},
+        "max_duration": secs or None}; duration buckets are DURATION_STEP wide
+        and ignore only the duration filter.
+        """
+        from django.db import connection
+        from django.db.models import BooleanField, Exists, ExpressionWrapper, OuterRef, Q, Value
+
+        from backend.videos.search import text_query
+
+        filters = filters or {}
+
+        def flag(q):
+            return ExpressionWrapper(q, output_field=BooleanField()) if q else Value(True, output_field=BooleanField())
+
+        text_q = Q(search_vector=text_query(text)) if text else None
+        level_q = Q(level__in=filters["level"]) if filters.get("level") else None
+        channel_q = Q(channel_id__in=[int(c) for c in filters["channel_id"]]) if filters.get("channel_id") else None
+        duration_q = Q()
+        if min_duration is not None:
+            duration_q &= Q(duration__gte=_duration_seconds(min_duration))
+        if max_duration is not None:
+            duration_q &= Q(duration__lte=_duration_seconds(max_duration))
+
+        speaker_flag = flag(None)
+        if speaker_ids:
+            speaker_flag = Exists(m.Video.speakers.through.objects.filter(
+                video_id=OuterRef("pk"), speaker_id__in=[int(s) for s in speaker_ids]))
+        tag_flag = flag(None)
+        if tag_ids:
+            tag_flag = Exists(m.Video.tags.through.objects.filter(
+                video_id=OuterRef("pk"), tag_id__in=[int(t) for t in tag_ids]))
+
+        inner = m.Video.objects.annotate(
+            p_text=flag(text_q),
+            p_level=flag(level_q),
+            p_channel=flag(channel_q),
+            p_speaker=speaker_flag,
+            p_tag=tag_flag,
+            p_duration=flag(duration_q),
+        ).values("id", "level", "channel_id", "duration",
+                 "p_text", "p_level", "p_channel", "p_speaker", "p_tag", "p_duration").order_by()
+        inner_sql, inner_params = inner.query.sql_with_params()
+
+        flags = ["p_text", "p_level", "p_channel", "p_speaker", "p_tag", "p_duration"]
+
+        def all_but(own=None):
+            return " AND ".join(f"v.{f}" for f in flags if f != own)
+
+        sql = f"""
+            WITH v AS MATERIALIZED ({inner_sql})
+            SELECT 'total', NULL, COUNT(*) FROM v WHERE {all_but()}
+            UNION ALL
+            SELECT 'level', v.level, COUNT(*) FROM v WHERE {all_but("p_level")} GROUP BY v.level
+            UNION ALL
+            SELECT 'channel', v.channel_id::text, COUNT(*) FROM v WHERE {all_but("p_channel")} GROUP BY v.channel_id
+            UNION ALL
+            SELECT 'speaker', vs.speaker_id::text, COUNT(*)
+            FROM v JOIN {m.Video.speakers.through._meta.db_table} vs ON vs.video_id = v.id
+            WHERE {all_but("p_speaker")} GROUP BY vs.speaker_id
+            UNION ALL
+            SELECT 'tag', vt.tag_id::text, COUNT(*)
+            FROM v JOIN {m.Video.tags.through._meta.db_table} vt ON vt.video_id = v.id
+            WHERE {all_but("p_tag")} GROUP BY vt.tag_id
+            UNION ALL
+            SELECT 'duration', (v.duration / %s)::text, COUNT(*) FROM v WHERE {all_but("p_duration")}
+            GROUP BY v.duration / %s
+            UNION ALL
+            SELECT 'max_duration', NULL, MAX(v.duration) FROM v WHERE {all_but("p_duration")}
+        """
+        ret = {"total": 0, "level": {}, "channel": {}, "speaker": {}, "tag": {}, "duration": {}, "max_duration": None}
+        with connection.cursor() as cursor:
+            cursor.execute(sql, (*inner_params, DURATION_STEP, DURATION_STEP))
+            for facet, key, count in cursor.fetchall():
+                if facet in ("total", "max_duration"):
+                    ret[facet] = count if count is not None else ret[facet]
+                elif facet == "level":
+                    ret[facet][key] = count
+                else:
+                    ret[facet][int(key)] = count
+        return ret
+
+    @staticmethod
+    def related(_conn, video, limit=10):
+        """
+        Up to ``limit`` videos sharing the most tags/speakers with ``video``,
+        ranked in one query (same level first on ties).
+        """
+        from django.db.models import Case, Count, IntegerField, Q, Value, When
+
+        tag_ids = list(video.tags.values_list("id", flat=True))
+        speaker_ids = list(video.speakers.values_list("id", flat=True))
+        if not tag_ids and not speaker_ids:
+            return []
+        shared = (
+            Count("tags", filter=Q(tags__id__in=tag_ids), distinct=True)
+            + Count("speakers", filter=Q(speakers__id__in=speaker_ids), distinct=True)
+        )
+        same_level = Case(When(level=video.level, then=Value(1)), default=Value(0), output_field=IntegerField())
+        return list(
+            m.Video.objects.filter(Q(tags__id__in=tag_ids) | Q(speakers__id__in=speaker_ids))
+            .exclude(pk=video.pk)
+            .annotate(shared=shared, same_level=same_level)
+            .order_by("-shared", "-same_level", "-id")[:limit]
+        )
+
     def mark_as_watched(self, conn, uid: int) -> None:
         # Watch the last second of the video
         User.insert_watch_data(conn, uid, self.id, 1, datetime.datetime.now(), self.duration - 1, self.duration)
@@ -163,22 +335,12 @@ class User:
     # --- writes used by the dashboard/views ---
     @staticmethod
     def insert_watch_data(_conn, user_id, vid, elapsed, now, t_start, t_end):
-        try:
-            user = UserModel.objects.get(pk=user_id)
-        except UserModel.DoesNotExist:
-            return
+        # spooled like /api/videos/watchtime/; the user and video (pk or
+        # on-platform id) are resolved when the spool is flushed
+        from backend.journal.ingest import heartbeat, submit
 
-        video = m.Video.objects.filter(pk=vid).first() or m.Video.objects.filter(on_platform_id=str(vid)).first()
         aware_now = now if timezone.is_aware(now) else timezone.make_aware(now)
-
-        m.UserViewLog.objects.create(
-            user=user,
-            video=video,
-            watch_date=aware_now,
-            watch_time=int(elapsed),
-            video_time_start=float(t_start),
-            video_time_end=float(t_end),
-        )
+        submit([heartbeat(user_id, vid, aware_now, elapsed, t_start, t_end, target="platform")])
 
     @staticmethod
     def insert_off_platform_time(_conn, user_id, duration_seconds, start, end, comment):
@@ -187,13 +349,17 @@ class User:
         except UserModel.DoesNotExist:
             return
 
+        from backend.journal.totals import add_off_platform
+
         def mk(dt):
             return dt if timezone.is_aware(dt) else timezone.make_aware(dt)
 
-        m.OffPlatformLog.objects.create(
-            user=user,
-            time_duration=int(duration_seconds),
-            date_start=mk(start),
-            date_end=mk(end),
-            comment=comment or "",
-        )
+        with transaction.atomic():
+            log = m.OffPlatformLog.objects.create(
+                user=user,
+                time_duration=int(duration_seconds),
+                date_start=mk(start),
+                date_end=mk(end),
+                comment=comment or "",
+            )
+            add_off_platform(m.UserDailyTotals, [log])
@@ -0,0 +1,26 @@
+# backend/platform/signals.py
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from backend.videos.catalog import bump_catalog_version
+from . import models as m
+
+# Version of the legacy catalog's dimension tables (channels, tags, speakers).
+DIMENSIONS_VERSION_KEY = "platform:dimensions-version"
+
+
+def _dimensions_changed(sender, **kwargs):
+    if kwargs.get("action", "post_").startswith("pre_"):
+        return
+    # Wait for the commit so readers never cache uncommitted names.
+    transaction.on_commit(partial(bump_catalog_version, DIMENSIONS_VERSION_KEY))
+
+
+for model in (m.Channel, m.Tag, m.Speaker):
+    post_save.connect(_dimensions_changed, sender=model, dispatch_uid=f"platform-dims-save-{model.__name__}")
+    post_delete.connect(_dimensions_changed, sender=model, dispatch_uid=f"platform-dims-delete-{model.__name__}")
+
+for through in (m.Video.tags.through, m.Video.speakers.through):
+    m2m_changed.connect(_dimensions_changed, sender=through, dispatch_uid=f"platform-dims-m2m-{through.__name__}")
@@ -0,0 +1,69 @@
+from django.test import TestCase
+
+from . import models as m
+from .services import db
+from .utils.dimensions import current_dimensions, dimensions
+
+
+class FacetCountsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        first, second = m.Channel.objects.create(name="First"), m.Channel.objects.create(name="Second")
+        cls.tags = [m.Tag.objects.create(name=f"tag {i}") for i in range(2)]
+        cls.speaker = m.Speaker.objects.create(name="speaker")
+        for i, (level, channel, duration, tags, speakers) in enumerate([
+            ("Beginner", first, 30, cls.tags[:1], [cls.speaker]),
+            ("Advanced", first, 90, cls.tags[1:], []),
+            ("Advanced", second, 200, cls.tags, [cls.speaker]),
+        ]):
+            video = m.Video.objects.create(
+                on_platform_id=f"vid{i}", channel=channel, title=f"Video {i}", level=level, duration=duration,
+            )
+            video.tags.set(tags)
+            video.speakers.set(speakers)
+        cls.first, cls.second = first, second
+
+    def test_each_facet_ignores_only_its_own_filter(self):
+        tag, other = self.tags
+        with self.assertNumQueries(1):
+            counts = db.Video.facet_counts(None, filters={"level": ["Advanced"]}, tag_ids=[tag.pk])
+        self.assertEqual(counts, {
+            "total": 1,
+            "level": {"Beginner": 1, "Advanced": 1},
+            "channel": {self.second.pk: 1},
+            "speaker": {self.speaker.pk: 1},
+            "tag": {tag.pk: 1, other.pk: 2},
+            "duration": {3: 1},
+            "max_duration": 200,
+        })
+
+    def test_duration_facet_ignores_the_duration_filter(self):
+        counts = db.Video.facet_counts(None, min_duration=60)
+        self.assertEqual(counts["total"], 2)
+        self.assertEqual(counts["level"], {"Advanced": 2})
+        self.assertEqual(counts["duration"], {0: 1, 1: 1, 3: 1})
+
+
+class DimensionsTests(TestCase):
+    def test_maps_follow_committed_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            channel = m.Channel.objects.create(name="Channel")
+        dims = current_dimensions()
+        self.assertEqual(dims.channel_ids["Channel"], channel.pk)
+        # same version: reused from process memory, only the version is read
+        with self.assertNumQueries(1):
+            self.assertIs(current_dimensions(), dims)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tag = m.Tag.objects.create(name="new tag")
+        self.assertEqual(current_dimensions().tag_names, {tag.pk: "new tag"})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tag.delete()
+        self.assertEqual(current_dimensions().tag_names, {})
+
+    def test_a_request_resolves_them_once(self):
+        with db.connect_context() as conn:
+            first = dimensions(conn)
+            with self.assertNumQueries(0):
+                self.assertIs(dimensions(conn), first)
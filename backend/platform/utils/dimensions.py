@@ -0,0 +1,98 @@
+# backend/platform/utils/dimensions.py
+"""
+id <-> name lookups for channels, tags and speakers, shared by the formatters,
+views and filter parsing.
+
+The maps are built once per dimensions version (bumped by the signals in
+platform/signals.py when a channel, tag or speaker changes) and kept in the
+Django cache under that version. With the default ``CACHES`` (LocMemCache)
+the cache is per process, so each worker builds them once per version; a
+shared backend would let workers reuse one build, nothing else depends on
+it. Each request resolves them once and keeps them on its connection scope,
+so formatting a page is O(rows) with no per-row queries. Cache entries expire after DIMENSION_CACHE_TIMEOUT seconds,
+which bounds staleness if a bump is missed; ``Dimensions.age`` reports it.
+"""
+import threading
+import time
+from functools import cached_property
+
+from django.conf import settings
+from django.core.cache import cache
+
+from backend.videos.catalog import catalog_version
+from ..services import db
+from ..signals import DIMENSIONS_VERSION_KEY
+
+DIMENSIONS_KEY = "platform:dimensions:{version}"
+
+
+class Dimensions:
+    def __init__(self, version, data):
+        self.version = version
+        self.built_at = data["built_at"]
+        self.channel_names = data["channel"]
+        self.tag_names = data["tag"]
+        self.speaker_names = data["speaker"]
+
+    @classmethod
+    def build(cls, conn=None):
+        return {
+            "built_at": time.time(),
+            "channel": dict(db.Channel.all(conn).values_list("id", "name")),
+            "tag": dict(db.Tag.all(conn).values_list("id", "name")),
+            "speaker": dict(db.Speaker.all(conn).values_list("id", "name")),
+        }
+
+    @property
+    def age(self):
+        """Seconds since these maps were read from the database."""
+        return time.time() - self.built_at
+
+    @cached_property
+    def channel_ids(self):
+        return {name: pk for pk, name in self.channel_names.items()}
+
+    @cached_property
+    def tag_ids(self):
+        return {name: pk for pk, name in self.tag_names.items()}
+
+    @cached_property
+    def speaker_ids(self):
+        return {name: pk for pk, name in self.speaker_names.items()}
+
+
+_local = None  # this process's last Dimensions, reused while its version and age hold
+_lock = threading.Lock()
+
+
+def _is_fresh(dims, version):
+    timeout = getattr(settings, "DIMENSION_CACHE_TIMEOUT", 300)
+    return dims is not None and dims.version == version and dims.age < timeout
+
+
+def current_dimensions(conn=None):
+    """Dimensions for the current version: process memory, then the shared cache, then the database."""
+    global _local
+    version = catalog_version(DIMENSIONS_VERSION_KEY)
+    dims = _local
+    if _is_fresh(dims, version):
+        return dims
+    with _lock:
+        if not _is_fresh(_local, version):
+            key = DIMENSIONS_KEY.format(version=version)
+            data = cache.get(key)
+            if data is None:
+                data = Dimensions.build(conn)
+                cache.set(key, data, timeout=getattr(settings, "DIMENSION_CACHE_TIMEOUT", 300))
+            _local = Dimensions(version, data)
+        return _local
+
+
+def dimensions(conn):
+    """The Dimensions for this request (``conn`` from db.connect_context())."""
+    scope = getattr(conn, "cache", None)
+    if scope is None:
+        return current_dimensions(conn)
+    if "dimensions" not in scope:
+        scope["dimensions"] = current_dimensions(conn)
+    return scope["dimensions"]
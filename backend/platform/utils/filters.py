@@ -1,35 +1,5 @@
 from backend import utils as backend_utils
-from ..services import db
-
-_TAGNAME2ID = None
-_CHANNEL_NAME2ID = None
-_SPEAKER_NAME2ID = None
-_CHANNEL_ID2NAME = None
-_SPEAKER_ID2NAME = None
-
-def _cid2name(conn):
-    global _CHANNEL_ID2NAME
-    if _CHANNEL_ID2NAME is None:
-        _CHANNEL_ID2NAME = {c.id: c.name for c in db.Channel.all(conn)}
-    return _CHANNEL_ID2NAME
-
-def _cname2id(conn):
-    global _CHANNEL_NAME2ID
-    if _CHANNEL_NAME2ID is None:
-        _CHANNEL_NAME2ID = {c.name: c.id for c in db.Channel.all(conn)}
-    return _CHANNEL_NAME2ID
-
-def _tagname2id(conn):
-    global _TAGNAME2ID
-    if _TAGNAME2ID is None:
-        _TAGNAME2ID = {t.name: t.id for t in db.Tag.all(conn)}
-    return _TAGNAME2ID
-
-def _sname2id(conn):
-    global _SPEAKER_NAME2ID
-    if _SPEAKER_NAME2ID is None:
-        _SPEAKER_NAME2ID = {s.name: s.id for s in db.Speaker.all(conn)}
-    return _SPEAKER_NAME2ID
+from .dimensions import dimensions
 
 def parse_filters(conn, args):
     filters = {}
@@ -39,20 +9,22 @@ def parse_filters(conn, args):
             vs = backend_utils.parse_comma_separated_string(s)
             filters[k_aft] = vs
 
+    dims = dimensions(conn)
+
     if (vs := filters.get("level")) is not None:
         filters["level"] = [v for v in vs]
 
     if (vs := filters.get("channel")) is not None:
         del filters["channel"]
-        filters["channel_id"] = [str(_cname2id(conn).get(v)) for v in vs if _cname2id(conn).get(v) is not None]
+        filters["channel_id"] = [str(dims.channel_ids[v]) for v in vs if v in dims.channel_ids]
 
     tag_ids = None
     if (vs := filters.pop("tag", None)) is not None:
-        tag_ids = [str(_tagname2id(conn).get(v)) for v in vs if _tagname2id(conn).get(v) is not None]
+        tag_ids = [str(dims.tag_ids[v]) for v in vs if v in dims.tag_ids]
 
     speaker_ids = None
     if (vs := filters.pop("speaker", None)) is not None:
-        speaker_ids = [str(_sname2id(conn).get(v)) for v in vs if _sname2id(conn).get(v) is not None]
+        speaker_ids = [str(dims.speaker_ids[v]) for v in vs if v in dims.speaker_ids]
 
     durations = args.get("durations")
     min_duration = max_duration = None
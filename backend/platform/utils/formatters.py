@@ -1,5 +1,5 @@
 # backend/platform/utils/formatters.py
-from ..services import db
+from .dimensions import dimensions
 
 def _iter_tags(conn, video):
     tags_attr = getattr(video, "tags", None)
@@ -23,6 +23,14 @@ def _iter_speakers(conn, video):
         return list(speakers_attr.all())
     return []
 
+def _channel_id(video):
+    # only fall back to video.channel (a query per row on a model instance)
+    # when there is no channel_id attribute
+    channel_id = getattr(video, "channel_id", None)
+    if channel_id is None:
+        channel_id = getattr(getattr(video, "channel", None), "id", None)
+    return channel_id
+
 
 class Formatter:
     @classmethod
@@ -31,7 +39,7 @@ class Formatter:
             "id": getattr(video, "id", None),
             "platform": getattr(video, "platform", "youtube"),
             "onPlatformId": getattr(video, "on_platform_id", None),
-            "channel_id": getattr(video, "channel_id", getattr(getattr(video, "channel", None), "id", None)),
+            "channel_id": _channel_id(video),
             "duration": getattr(video, "duration", 0),
             "title": getattr(video, "title", ""),
             "description": getattr(video, "description", ""),
@@ -40,11 +48,10 @@ class Formatter:
             "premium": getattr(video, "premium", False),
         }
         d.pop("onPlatformId", None)
-        channel_id = getattr(video, "channel_id", None) or getattr(getattr(video, "channel", None), "id", None)
-        cid2cname = {c.id: c.name for c in db.Channel.all(conn)}
+        channel_id = _channel_id(video)
         return {
             **d,
-            "channelName": cid2cname.get(channel_id),
+            "channelName": dimensions(conn).channel_names.get(channel_id),
             "url": f"/watch/{getattr(video, 'id', None)}",
             "thumbnailUrl": f"/assets/thumbnail/{getattr(video, 'platform', 'youtube')}/{getattr(video, 'id', None)}.webp",
         }
@@ -55,7 +62,7 @@ class Formatter:
             "id": getattr(video, "id", None),
             "platform": getattr(video, "platform", "youtube"),
             "onPlatformId": getattr(video, "on_platform_id", None),
-            "channel_id": getattr(video, "channel_id", getattr(getattr(video, "channel", None), "id", None)),
+            "channel_id": _channel_id(video),
             "duration": getattr(video, "duration", 0),
             "title": getattr(video, "title", ""),
             "description": getattr(video, "description", ""),
@@ -1,18 +1,18 @@
 # backend/platform/views/progress.py
 import datetime
-from collections import defaultdict
 
 from django.urls import path
 from django.http import JsonResponse
 from django.utils import timezone
-from django.db.models import Sum
+from django.db import transaction
 
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 
 from backend.platform.services import db
-from backend.platform.models import OffPlatformLog, UserViewLog, UserWordFrequency
+from backend.journal.totals import add_off_platform, calendar_columns, calendar_window, user_totals
+from backend.platform.models import OffPlatformLog, UserDailyTotals, UserWordFrequency
 
 
 # ---------- endpoints ----------
@@ -92,7 +92,13 @@ def user_off_platform_log_delete(request):
     start_dt = datetime.datetime.strptime(f"{data['startDate']} {data['startTime']}", "%Y-%m-%d %H:%M:%S")
     start_dt = timezone.make_aware(start_dt)
     secs = int(data["minutes"] * 60)
-    OffPlatformLog.objects.filter(user_id=user["id"], date_start=start_dt, time_duration=secs).delete()
+    with transaction.atomic():
+        logs = list(
+            OffPlatformLog.objects.select_for_update()
+            .filter(user_id=user["id"], date_start=start_dt, time_duration=secs)
+        )
+        add_off_platform(UserDailyTotals, logs, sign=-1)
+        OffPlatformLog.objects.filter(pk__in=[log.pk for log in logs]).delete()
     return Response("ok")
 
 
@@ -101,30 +107,19 @@ def user_off_platform_log_delete(request):
 def user_progress_consistency_calendar(request):
     """
     Heatmap source: per-day totals of on/off-platform seconds.
-    Returns list of [date_str, {"on": secs, "off": secs}]
+    Query: from/to (YYYY-MM-DD, default: the last 365 days).
+    Returns {"from", "to", "dates": [...], "on": [secs], "off": [secs]} (active days only)
     """
     user = request.session.get("user") or db.User.anonymous().to_dict()
     if user.get("id", -1) == -1:
         return JsonResponse({"error": "Unauthorized"}, status=401)
 
-    date2on_off2seconds = defaultdict(lambda: {"on": 0, "off": 0})
-
-    for row in (
-        UserViewLog.objects.filter(user_id=user["id"]).values("watch_date__date").annotate(total=Sum("watch_time"))
-    ):
-        d = row["watch_date__date"].strftime("%Y-%m-%d")
-        date2on_off2seconds[d]["on"] += row["total"] or 0
-
-    for l in OffPlatformLog.objects.filter(user_id=user["id"]).only("date_start", "date_end", "time_duration"):
-        d1 = l.date_start.date()
-        d2 = l.date_end.date()
-        days = (d2 - d1).days + 1
-        per_day = (l.time_duration or 0) / max(days, 1)
-        for i in range(days):
-            d = (d1 + datetime.timedelta(days=i)).strftime("%Y-%m-%d")
-            date2on_off2seconds[d]["off"] += per_day
-
-    return Response(sorted(date2on_off2seconds.items()))
+    try:
+        start, end = calendar_window(request.GET)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    # per-day rows kept by backend/journal/totals.py
+    return Response(calendar_columns(UserDailyTotals, user["id"], start, end))
 
 
 @api_view(["GET"])
@@ -151,10 +146,8 @@ def word_frequency_reset(request):
 @permission_classes([AllowAny])
 def user_overall(request):
     user = request.session.get("user") or db.User.anonymous().to_dict()
-    seconds_on = UserViewLog.objects.filter(user_id=user["id"]).aggregate(s=Sum("watch_time"))["s"] or 0
-    seconds_off = OffPlatformLog.objects.filter(user_id=user["id"]).aggregate(s=Sum("time_duration"))["s"] or 0
-    words = UserWordFrequency.objects.filter(user_id=user["id"]).aggregate(s=Sum("count"))["s"] or 0
-    return Response({"hours": (seconds_on + seconds_off) / 3600.0, "words": words})
+    totals = user_totals(UserDailyTotals, user["id"])
+    return Response({"hours": (totals["on"] + totals["off"]) / 3600.0, "words": totals["words"]})
 
 
 # ---------- urls ----------
@@ -5,14 +5,15 @@ from dateutil import tz
 from django.urls import path
 from django.http import JsonResponse
 from django.utils import timezone
-from django.db.models import Sum, Case, When, IntegerField
+from django.db.models import Sum
 
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 
 from backend.utils import camel_to_snake
-from backend.platform.models import UserViewLog, OffPlatformLog
+from backend.journal.totals import user_totals
+from backend.platform.models import UserViewLog, OffPlatformLog, UserDailyTotals
 from backend.platform.services import db
 from backend.platform.services import mail as mail_svc
 
@@ -56,32 +57,19 @@ def user_get(request):
 
     uid = user["id"]
 
-    # ---- ORM aggregates for totals/today ----
-    agg_on = UserViewLog.objects.filter(user_id=uid).aggregate(
-        total=Sum("watch_time"),
-        today=Sum(
-            Case(
-                When(watch_date__gt=last_morning, then="watch_time"),
-                default=0,
-                output_field=IntegerField(),
-            )
-        ),
+    # ---- totals from the per-day rollup (O(days)); "today" depends on the
+    # client's timezone, so it is summed from the (user, date) indexes ----
+    totals = user_totals(UserDailyTotals, uid)
+    watch_time = totals["on"]
+    off_platform_time = round(totals["off"])
+
+    watch_time_today = (
+        UserViewLog.objects.filter(user_id=uid, watch_date__gt=last_morning).aggregate(s=Sum("watch_time"))["s"] or 0
     )
-    watch_time = agg_on["total"] or 0
-    watch_time_today = agg_on["today"] or 0
-
-    agg_off = OffPlatformLog.objects.filter(user_id=uid).aggregate(
-        total=Sum("time_duration"),
-        today=Sum(
-            Case(
-                When(date_start__gte=last_morning, then="time_duration"),
-                default=0,
-                output_field=IntegerField(),
-            )
-        ),
+    off_platform_time_today = (
+        OffPlatformLog.objects.filter(user_id=uid, date_start__gte=last_morning)
+        .aggregate(s=Sum("time_duration"))["s"] or 0
     )
-    off_platform_time = agg_off["total"] or 0
-    off_platform_time_today = agg_off["today"] or 0
 
     time_total = int(watch_time + off_platform_time)
     time_today = int(watch_time_today + off_platform_time_today)
@@ -8,6 +8,7 @@ from rest_framework.response import Response
 from dateutil import tz
 
 from ..services import db
+from ..utils.dimensions import dimensions
 from ..utils.formatters import Formatter, _iter_tags
 
 
@@ -28,22 +29,8 @@ def get_video(request, video_id: str):
         tags = _iter_tags(conn, video)
         related = []
         if include_related and tags:
-            id2related = {}
-            for t in tags:
-                all_videos = getattr(t, "all_videos", None)
-                if callable(all_videos):
-                    try:
-                        for v in all_videos(conn, uid=user["id"]):
-                            id2related[getattr(v, "id", None)] = v
-                    except TypeError:
-                        for v in all_videos(conn):
-                            id2related[getattr(v, "id", None)] = v
-                else:
-                    vids_mgr = getattr(t, "videos", None)
-                    if hasattr(vids_mgr, "all"):
-                        for v in vids_mgr.all():
-                            id2related[getattr(v, "id", None)] = v
-            related = list(id2related.values())
+            # ranked and capped in SQL instead of formatting every video of every tag
+            related = db.Video.related(conn, video)
 
         ret = Formatter.video_detail(conn, video, tags, related_videos=related)
 
@@ -52,8 +39,7 @@ def get_video(request, video_id: str):
             channel_name = video.channel.name
         else:
             cid = getattr(video, "channel_id", None)
-            cid2name = {c.id: c.name for c in db.Channel.all(conn)}
-            channel_name = cid2name.get(cid)
+            channel_name = dimensions(conn).channel_names.get(cid)
 
         ret["video"]["channelName"] = channel_name
         return Response(ret)
@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'django_filters',
     'backend.platform',
@@ -151,6 +152,42 @@ REST_FRAMEWORK = {
     ],
 }
 
+# In-memory catalog index used by the video list/statistics endpoints
+# (backend/videos/catalog_index.py). MAX_AGE bounds staleness in seconds for
+# catalog writes that do not bump the catalog version (raw SQL, restores).
+CATALOG_INDEX_ENABLED = True
+CATALOG_INDEX_MAX_AGE = 300
+
+# Legacy channel/tag/speaker id<->name maps (backend/platform/utils/dimensions.py)
+# are built once per dimensions version and kept in the cache (per process
+# with the default CACHES); entries expire after this many seconds, which
+# bounds staleness when the version bump is not visible.
+DIMENSION_CACHE_TIMEOUT = 300
+
+# Upstream channel sync (backend/videos/sync.py, `manage.py sync_channels`):
+# metadata fetch threads, seconds between syncs of a channel, and requests per
+# second allowed per host (hosts not listed get CHANNEL_SYNC_DEFAULT_RATE).
+CHANNEL_SYNC_WORKERS = 4
+CHANNEL_SYNC_INTERVAL = 6 * 3600
+CHANNEL_SYNC_RATES = {"www.youtube.com": 1.0}
+CHANNEL_SYNC_DEFAULT_RATE = 1.0
+
+# Watch-time heartbeats (backend/journal/ingest.py): requests append to a spool
+# file under WATCHTIME_SPOOL_DIR and a per-process flusher writes them every
+# WATCHTIME_FLUSH_INTERVAL seconds or WATCHTIME_FLUSH_SIZE heartbeats. The
+# directory must be local, writable by the app user and shared by the
+# processes of one host (the image sets it to a volume; a worker will not
+# start without it). FSYNC makes appends survive power loss; WRITE_BEHIND =
+# False writes inline.
+WATCHTIME_WRITE_BEHIND = True
+WATCHTIME_SPOOL_DIR = Path(os.environ.get("WATCHTIME_SPOOL_DIR", BASE_DIR / "var" / "watchtime"))
+WATCHTIME_FLUSH_INTERVAL = 2.0
+WATCHTIME_FLUSH_SIZE = 1000
+WATCHTIME_SPOOL_FSYNC = False
+# compact_view_logs rolls log rows older than this into one row per
+# (user, video, day) (backend/journal/compaction.py)
+WATCHTIME_COMPACT_AFTER_DAYS = 90
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
 
@@ -20,7 +20,7 @@ from django.contrib import admin
 from django.urls import include, path, include
 from rest_framework import routers
 from .users import views as user_views
-from backend.videos.views import VideoViewSet, ChannelViewSet, TagViewSet, SpeakerViewSet
+from backend.videos.views import VideoViewSet, ChannelViewSet, TagViewSet, SpeakerViewSet, SearchViewSet
 from backend.journal.views import JournalViewSet
 
 router = routers.DefaultRouter()
@@ -30,6 +30,7 @@ router.register(r'channels', ChannelViewSet, basename='channel')
 router.register(r'tags', TagViewSet, basename='tag')
 router.register(r'speakers', SpeakerViewSet, basename='speaker')
 router.register(r'journal', JournalViewSet, basename='journal')
+router.register(r'search', SearchViewSet, basename='search')
 
 
 urlpatterns = [
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Channel, Speaker, Tag, Video
+from .models import Channel, ChannelSync, Speaker, Tag, Video
 
 @admin.register(Channel)
 class ChannelAdmin(admin.ModelAdmin):
@@ -7,6 +7,13 @@ class ChannelAdmin(admin.ModelAdmin):
     search_fields = ("name",)
     list_filter = ("platform",)
 
+@admin.register(ChannelSync)
+class ChannelSyncAdmin(admin.ModelAdmin):
+    list_display = ("channel", "url", "enabled", "last_synced_at", "cursor")
+    list_filter = ("enabled",)
+    readonly_fields = ("cursor", "last_synced_at", "last_error")
+    autocomplete_fields = ("channel",)
+
 @admin.register(Speaker)
 class SpeakerAdmin(admin.ModelAdmin):
     list_display = ("id", "name")
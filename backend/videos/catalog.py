@@ -0,0 +1,62 @@
+"""
+Catalog version counter.
+
+Any change to videos, channels, tags or speakers bumps a single number kept in
+a ``CatalogVersion`` row (see ``signals.py``; importer and sync runs bump it
+too). Process-local structures built from the catalog compare against it to
+decide when they are stale, and conditional reads hash it into their ETag.
+Being a row rather than a cache entry, a bump from any worker or management
+command is seen by every process, and is never lost to eviction.
+
+``key`` lets other catalogs (the legacy ``platform`` tables, per-user watched
+sets) keep their own counter with the same semantics.
+
+Each bump also records when it happened (``catalog_last_modified``), which
+backs the ``Last-Modified`` header of conditional catalog reads.
+"""
+
+import time
+
+from django.db import connection
+
+from .models import CatalogVersion
+
+CATALOG_VERSION_KEY = "videos:catalog-version"
+
+# A new row starts at the current time in milliseconds rather than 1, so a
+# version lost to a rollback or a restore is never handed out again to a
+# process that still holds data built from it.
+BUMP_SQL = f"""
+    INSERT INTO {CatalogVersion._meta.db_table} (key, version, modified_at)
+    VALUES (%s, (extract(epoch FROM clock_timestamp()) * 1000)::bigint, now())
+    ON CONFLICT (key) DO UPDATE SET version = {CatalogVersion._meta.db_table}.version + 1, modified_at = now()
+    RETURNING version
+"""
+
+
+def catalog_versions(*keys):
+    """
+    ``{key: (version, modified unix time)}`` of ``keys`` in one query. A key
+    never bumped is version 0, modified "now" so it never looks older.
+    """
+    found = {
+        key: (version, modified_at.timestamp())
+        for key, version, modified_at in CatalogVersion.objects.filter(key__in=keys)
+        .values_list("key", "version", "modified_at")
+    }
+    return {key: found.get(key) or (0, time.time()) for key in keys}
+
+
+def catalog_version(key: str = CATALOG_VERSION_KEY) -> int:
+    return catalog_versions(key)[key][0]
+
+
+def catalog_last_modified(key: str = CATALOG_VERSION_KEY) -> float:
+    """Unix time of the last bump; "now" if never bumped."""
+    return catalog_versions(key)[key][1]
+
+
+def bump_catalog_version(key: str = CATALOG_VERSION_KEY) -> int:
+    with connection.cursor() as cursor:
+        cursor.execute(BUMP_SQL, [key])
+        return cursor.fetchone()[0]
@@ -0,0 +1,295 @@
+"""
+Process-local, array-backed index over the video catalog.
+
+The catalog is a few thousand rows that change a handful of times a day, so
+browse filters, sorts and facet counts are answered from NumPy columns instead
+of joining ``tags``/``speakers``/``channel`` in Postgres on every request:
+
+- one column per scalar attribute (id, duration, level, channel, upload date,
+  premium) in id order;
+- one boolean membership row per tag and per speaker (``tag_bits`` /
+  ``speaker_bits``, shape ``(n_tags, n_videos)``), so "has any of these tags"
+  is an OR over a few rows and facet counts are a single matrix reduction.
+
+The index is rebuilt when ``catalog_version()`` moves, or after
+``CATALOG_INDEX_MAX_AGE`` seconds as a bound on staleness for writes that
+bypass the bumps (raw SQL, restores). Anything it does not understand makes
+``filter_mask`` return ``None`` and the caller falls back to the ORM.
+"""
+
+import threading
+import time
+from datetime import date
+
+import numpy as np
+from django.conf import settings
+
+from .catalog import catalog_version
+from .facets import DURATION_STEP
+from .models import Video, Channel, Tag, Speaker
+from .pagination import ordering_names
+
+# Query params the index can answer; anything else goes to the ORM (notably
+# text/q, ranked full-text searches in Postgres, and DRF's search).
+SUPPORTED_PARAMS = {
+    "level", "level__in",
+    "channel_id", "channel_id__in", "channel__name", "channel__name__in",
+    "tags__name", "tags__name__in", "speakers__name", "speakers__name__in",
+    "premium", "durations", "hide-watched", "sort", "ordering",
+    "page", "cursor", "pagination", "format",
+}
+
+DEFAULT_ORDERING = ordering_names(Video.SORT_ORDERINGS["new"])
+# a missing upload date sorts lowest, as in the ORM (pagination.null_ordering)
+NULL_DAY = 0
+
+
+def supports(params):
+    """Whether the index can answer a request with these query params (checked before building it)."""
+    return all(key in SUPPORTED_PARAMS for key in params.keys())
+
+
+def _split(value):
+    return [v for v in (s.strip() for s in value.split(",")) if v]
+
+
+class CatalogIndex:
+    def __init__(self, version):
+        self.version = version
+        self.built_at = time.monotonic()
+
+        rows = list(
+            Video.objects.order_by("id").values_list(
+                "id", "duration", "level", "channel_id", "upload_date", "premium",
+            )
+        )
+        self.size = len(rows)
+        ids, durations, levels, channel_ids, upload_dates, premiums = zip(*rows) if rows else ((),) * 6
+
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.duration = np.asarray(durations, dtype=np.int64)
+        self.channel_id = np.asarray(channel_ids, dtype=np.int64)
+        self.premium = np.asarray(premiums, dtype=bool)
+
+        self.level_names = [value for value, _ in Video.LEVEL_CHOICES]
+        level_code = {name: i for i, name in enumerate(self.level_names)}
+        self.level = np.asarray([level_code.get(l, len(self.level_names)) for l in levels], dtype=np.int16)
+
+        # upload_date as a day number; NULL sorts before every date, as SORT_ORDERINGS puts it
+        self.upload_day = np.asarray(
+            [NULL_DAY if d is None else d.toordinal() for d in upload_dates], dtype=np.int64,
+        )
+
+        self.channel_names = dict(Channel.objects.values_list("id", "name"))
+        self.channel_by_name = {name: cid for cid, name in self.channel_names.items()}
+        self.tag_names, self.tag_bits = self._membership(Tag, Video.tags.through, "tag_id")
+        self.speaker_names, self.speaker_bits = self._membership(Speaker, Video.speakers.through, "speaker_id")
+        self.tag_row = {name: i for i, name in enumerate(self.tag_names)}
+        self.speaker_row = {name: i for i, name in enumerate(self.speaker_names)}
+
+    def _membership(self, model, through, fk):
+        dims = sorted(model.objects.values_list("id", "name"), key=lambda d: d[1])
+        row = {pk: i for i, (pk, _) in enumerate(dims)}
+        bits = np.zeros((len(dims), self.size), dtype=bool)
+        links = np.asarray(
+            [(row[pk], vid) for pk, vid in through.objects.values_list(fk, "video_id") if pk in row],
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        # ignore links to videos created after the column snapshot was read
+        links = links[np.isin(links[:, 1], self.ids)]
+        bits[links[:, 0], self.positions(links[:, 1])] = True
+        return [name for _, name in dims], bits
+
+    def positions(self, video_ids):
+        """Row positions of ``video_ids`` (ids must exist in the index)."""
+        return np.searchsorted(self.ids, video_ids)
+
+    def is_fresh(self, version):
+        max_age = getattr(settings, "CATALOG_INDEX_MAX_AGE", 300)
+        return self.version == version and time.monotonic() - self.built_at < max_age
+
+    # ---- filtering ----
+    def _any_of(self, bits, row_of, names):
+        rows = [row_of[n] for n in names if n in row_of]
+        if not rows:
+            return np.zeros(self.size, dtype=bool)
+        return bits[rows].any(axis=0)
+
+    def filter_mask(self, params, watched_ids=None):
+        """
+        Boolean mask of the videos ``VideoViewSet.get_queryset`` (plus its
+        filter backends) would return for ``params``, or ``None`` if the
+        request needs the ORM.
+        """
+        if not supports(params):
+            return None
+        mask = np.ones(self.size, dtype=bool)
+
+        for key in ("level", "level__in"):
+            if params.get(key):
+                names = [params[key]] if key == "level" else _split(params[key])
+                if any(n not in self.level_names for n in names):
+                    return None  # invalid choice: let the filterset report it
+                mask &= np.isin(self.level, [self.level_names.index(n) for n in names])
+
+        for key in ("channel_id", "channel_id__in"):
+            if params.get(key):
+                values = [params[key]] if key == "channel_id" else _split(params[key])
+                try:
+                    cids = [int(v) for v in values]
+                except ValueError:
+                    return None
+                if key == "channel_id" and cids[0] not in self.channel_names:
+                    return None
+                mask &= np.isin(self.channel_id, cids)
+
+        for key in ("channel__name", "channel__name__in"):
+            if params.get(key):
+                names = [params[key]] if key == "channel__name" else _split(params[key])
+                mask &= np.isin(self.channel_id, [self.channel_by_name[n] for n in names if n in self.channel_by_name])
+
+        for key, bits, row_of in (
+            ("tags__name", self.tag_bits, self.tag_row),
+            ("speakers__name", self.speaker_bits, self.speaker_row),
+        ):
+            if params.get(key):
+                mask &= self._any_of(bits, row_of, [params[key]])
+            if params.get(f"{key}__in"):
+                mask &= self._any_of(bits, row_of, _split(params[f"{key}__in"]))
+
+        premium = {"1": True, "0": False, "true": True, "false": False}.get(params.get("premium", "").lower())
+        if premium is not None:
+            mask &= self.premium == premium
+
+        durations = params.get("durations")
+        if durations and "," in durations:
+            d1, d2 = durations.split(",", 1)
+            try:
+                if d1:
+                    v1 = float(d1)
+                    mask &= self.duration >= (int(v1) * 60 if v1 > 1000 else int(v1))
+                if d2:
+                    v2 = float(d2)
+                    mask &= self.duration <= (int(v2) * 60 if v2 > 1000 else int(v2))
+            except ValueError:
+                pass
+
+        if watched_ids is not None and len(watched_ids):
+            mask &= ~np.isin(self.ids, np.fromiter(watched_ids, dtype=np.int64))
+        return mask
+
+    # ---- sorting ----
+    def ordering_for(self, params):
+        if params.get("ordering"):
+            fields = tuple(_split(params["ordering"]))
+            if not fields or any(f.lstrip("-") not in ("upload_date", "duration", "id") for f in fields):
+                return None
+            return fields
+        sort = params.get("sort", "").lower()
+        return ordering_names(Video.SORT_ORDERINGS[sort]) if sort in Video.SORT_ORDERINGS else DEFAULT_ORDERING
+
+    def ordered_ids(self, mask, ordering, after=None):
+        """
+        Ids selected by ``mask`` in ``ordering``; with ``after`` (sort values
+        from a keyset cursor) only the ids that sort strictly after it.
+        """
+        if after is not None:
+            mask = mask & self._after(ordering, after)
+        columns = self._values()
+        selected = np.flatnonzero(mask)
+        keys = []
+        for field in ordering:
+            column = columns[field.lstrip("-")][selected]
+            keys.append(-column if field.startswith("-") else column)
+        # np.lexsort sorts by the last key first
+        order = np.lexsort(keys[::-1]) if keys else np.arange(len(selected))
+        return self.ids[selected[order]].tolist()
+
+    def _values(self):
+        return {"upload_date": self.upload_day, "duration": self.duration, "id": self.ids}
+
+    @staticmethod
+    def _to_column(name, value):
+        if name != "upload_date":
+            return int(value)
+        return NULL_DAY if value is None else date.fromisoformat(value).toordinal()
+
+    @staticmethod
+    def _from_column(name, value):
+        if name != "upload_date":
+            return value
+        # same representation a cursor from the ORM path carries (DjangoJSONEncoder)
+        return None if value == NULL_DAY else date.fromordinal(value).isoformat()
+
+    def _after(self, ordering, values):
+        """Row-value comparison ``row > values`` in ``ordering``; ``ValueError`` on bad values."""
+        columns = self._values()
+        after = np.zeros(self.size, dtype=bool)
+        equal = np.ones(self.size, dtype=bool)
+        for field, value in zip(ordering, values):
+            name = field.lstrip("-")
+            column = columns[name]
+            value = self._to_column(name, value)
+            after |= equal & ((column < value) if field.startswith("-") else (column > value))
+            equal &= column == value
+        return after
+
+    def sort_values(self, video_id, ordering):
+        """The sort key of ``video_id`` under ``ordering``, as plain Python values."""
+        i = self.positions([video_id])[0]
+        columns = self._values()
+        return [self._from_column(f.lstrip("-"), columns[f.lstrip("-")][i].item()) for f in ordering]
+
+    # ---- facets ----
+    def statistics(self, mask):
+        """Same payload as ``facets.facet_statistics`` for the masked videos."""
+        level_counts = np.bincount(self.level[mask], minlength=len(self.level_names) + 1)
+        channel_ids, channel_counts = np.unique(self.channel_id[mask], return_counts=True)
+        speaker_counts = self.speaker_bits[:, mask].sum(axis=1)
+        tag_counts = self.tag_bits[:, mask].sum(axis=1)
+
+        durations = self.duration[mask]
+        d_max = int(durations.max()) + 20 if len(durations) else 0
+        n_steps = max(1, d_max // DURATION_STEP + 1)
+        buckets = np.bincount(np.clip(durations // DURATION_STEP, 0, n_steps - 1), minlength=n_steps)
+
+        channels = sorted(
+            (self.channel_names.get(int(cid), ""), int(n)) for cid, n in zip(channel_ids, channel_counts)
+        )
+        return {
+            "total": int(mask.sum()),
+            "statistics": {
+                "levels": [
+                    {"name": name, "count": int(level_counts[i])}
+                    for i, name in enumerate(self.level_names) if level_counts[i]
+                ],
+                "channels": [{"name": name, "count": n} for name, n in channels],
+                "speakers": [
+                    {"name": name, "count": int(n)} for name, n in zip(self.speaker_names, speaker_counts) if n
+                ],
+                "topics": [
+                    {"name": name, "count": int(n)} for name, n in zip(self.tag_names, tag_counts) if n
+                ],
+                "durations": [
+                    {"count": int(buckets[i]), "start": i * DURATION_STEP, "end": (i + 1) * DURATION_STEP}
+                    for i in range(n_steps)
+                ],
+            },
+        }
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_catalog_index():
+    """Return the current process-wide index, rebuilding it if stale."""
+    global _index
+    version = catalog_version()
+    index = _index
+    if index is not None and index.is_fresh(version):
+        return index
+    with _lock:
+        if _index is None or not _index.is_fresh(version):
+            _index = CatalogIndex(version)
+        return _index
@@ -0,0 +1,89 @@
+"""
+Conditional GET for catalog reads.
+
+Catalog responses only change when the catalog version moves (``catalog.py``:
+bumped on commit by every save/delete of a video, channel, tag or speaker and
+by tag/speaker changes, the same writes that move ``Video.updated_at``). The
+ETag is a hash of that version and whatever else shapes the response: URL,
+``Accept``, the user and, for video payloads, the user's premium flag and
+watched-set version (``watched`` badges, ``hide-watched``).
+
+Catalog-wide responses also carry ``Last-Modified`` from the catalog
+version's bump time. Per-user responses carry only the ETag: a user's
+premium flag has no modification time, so ``If-Modified-Since`` could
+answer 304 after it changed.
+
+A repeat request whose ``If-None-Match`` (or ``If-Modified-Since``) still
+matches gets a 304 straight after authentication and one query for the
+versions (``CatalogVersion`` rows, so every worker sees every bump), before
+any catalog query or serializer runs.
+"""
+
+import functools
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from backend.journal.progress import watched_version_key
+from .catalog import CATALOG_VERSION_KEY, catalog_versions
+
+
+def catalog_validators(request, per_user=False):
+    """
+    ``(ETag, Last-Modified unix time)`` of the response to ``request``;
+    Last-Modified is ``None`` for ``per_user`` responses.
+    """
+    user = request.user
+    watched = per_user and user.is_authenticated
+    keys = [CATALOG_VERSION_KEY] + ([watched_version_key(user.pk)] if watched else [])
+    versions = catalog_versions(*keys)
+    version, last_modified = versions[CATALOG_VERSION_KEY]
+    parts = [version, request.get_full_path(), request.META.get("HTTP_ACCEPT", ""), user.pk]
+    if watched:
+        parts += [getattr(user, "premium", False), versions[keys[1]][0]]
+    etag = quote_etag(hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest())
+    return etag, None if per_user else int(last_modified)
+
+
+def conditional_catalog(per_user=False):
+    """
+    Decorate a viewset GET handler: answer 304 when the client's validators
+    still match, else run the handler and stamp ETag (and Last-Modified,
+    unless ``per_user``) on a 200.
+    """
+
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(self, request, *args, **kwargs):
+            etag, last_modified = catalog_validators(request, per_user)
+            not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if not_modified is not None:
+                response = not_modified
+            else:
+                response = handler(self, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            response.headers["ETag"] = etag
+            if last_modified is not None:
+                response.headers["Last-Modified"] = http_date(last_modified)
+            # per-user payloads: browsers may keep them, shared caches may not
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ("Accept", "Authorization", "Cookie"))
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+class ConditionalCatalogMixin:
+    """Conditional ``list``/``retrieve`` for the read-only dimension viewsets."""
+
+    @conditional_catalog()
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_catalog()
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
@@ -0,0 +1,174 @@
+"""
+"Viewers also watched": item-item collaborative filtering over watch history.
+
+The (user, video) pairs come from ``journal.UserVideoProgress`` (one row per
+pair, already de-duplicated from the heartbeat log) and form a sparse binary
+users x videos matrix ``X``. Item-item cosine similarity is
+
+    sim(i, j) = co_viewers(i, j) / sqrt(viewers(i) * viewers(j))
+
+with ``co_viewers = X.T @ X`` computed a block of videos at a time, so memory
+stays proportional to the block's co-watch pairs. Each video keeps its top
+``ALSO_WATCHED_N`` neighbours with at least ``MIN_CO_VIEWERS`` shared viewers
+in ``VideoAlsoWatched``.
+
+``build_also_watched`` recomputes every video. ``refresh_also_watched``
+recomputes the videos watched by users whose pairs were written since the
+last build or refresh (``REFRESHED_KEY``); viewer counts of untouched lists
+drift until the next full build.
+"""
+
+import numpy as np
+from scipy import sparse
+from django.db import connection, transaction
+from django.utils import timezone
+
+from backend.journal.models import UserVideoProgress
+from .catalog import bump_catalog_version
+from .models import CatalogVersion, VideoAlsoWatched
+
+ALSO_WATCHED_N = 20
+MIN_CO_VIEWERS = 2
+# co-watch pairs materialized per block of videos
+BLOCK_PAIRS = 20_000_000
+# CatalogVersion row whose ``modified_at`` is when the last build or refresh
+# started reading pairs; it moves even when a run writes no lists
+REFRESHED_KEY = "videos:also-watched-refreshed"
+
+
+def _load_pairs(since=None):
+    """(user_id, video_id) int64 array of watch pairs, streamed with COPY."""
+    table = UserVideoProgress._meta.db_table
+    where, params = "", []
+    if since is not None:
+        # every pair of the users with a pair written since ``since``; by write
+        # time, as a late flush can add a pair with an old first_watched_at
+        where = f" WHERE user_id IN (SELECT user_id FROM {table} WHERE updated_at > %s)"
+        params.append(since)
+    # One line per video ("video\tuser user ...\n") rather than per pair:
+    # psycopg yields a Python object per COPY row, which dominated the load.
+    sql = f"SELECT video_id, string_agg(user_id::text, ' ') FROM {table}{where} GROUP BY video_id"
+    with connection.cursor() as cursor:
+        with cursor.cursor.copy(f"COPY ({sql}) TO STDOUT", params) as copy:
+            data = b"".join(bytes(chunk) for chunk in copy)
+    users, videos = [], []
+    for line in data.splitlines():
+        video, viewers = line.split(b"\t")
+        viewers = np.array(viewers.split(), dtype=np.int64)
+        users.append(viewers)
+        videos.append(np.full(len(viewers), int(video), dtype=np.int64))
+    if not users:
+        return np.empty((0, 2), dtype=np.int64)
+    return np.column_stack([np.concatenate(users), np.concatenate(videos)])
+
+
+class CoWatchMatrix:
+    def __init__(self, pairs):
+        self.user_ids, users = np.unique(pairs[:, 0], return_inverse=True)
+        self.video_ids, videos = np.unique(pairs[:, 1], return_inverse=True)
+        x = sparse.csr_matrix(
+            (np.ones(len(pairs), dtype=np.float32), (users.reshape(-1), videos.reshape(-1))),
+            shape=(len(self.user_ids), len(self.video_ids)),
+        )
+        x.data[:] = 1  # duplicates summed by the constructor
+        self.x = x
+        self.xt = x.T.tocsr()  # videos x users
+        self.viewers = np.asarray(x.sum(axis=0)).ravel()
+
+    def positions(self, video_ids):
+        return np.searchsorted(self.video_ids, video_ids)
+
+    def blocks(self, rows):
+        """Yield (rows, co-viewer counts as CSR ``len(rows) x n_videos``)."""
+        # rough pairs per video: its viewers times the mean history length
+        mean_history = self.x.nnz / max(1, self.x.shape[0])
+        cost = np.cumsum(np.maximum(1, self.viewers[rows] * mean_history))
+        start = 0
+        while start < len(rows):
+            spent = cost[start - 1] if start else 0
+            stop = max(start + 1, int(np.searchsorted(cost, spent + BLOCK_PAIRS)))
+            block = rows[start:stop]
+            yield block, (self.xt[block] @ self.x).tocsr()
+            start = stop
+
+    def top_n(self, block, co, n):
+        """Per row: (video ids, scores) best first."""
+        for i, row in enumerate(block):
+            cols = co.indices[co.indptr[i]:co.indptr[i + 1]]
+            counts = co.data[co.indptr[i]:co.indptr[i + 1]]
+            keep = (counts >= MIN_CO_VIEWERS) & (cols != row)
+            cols, counts = cols[keep], counts[keep]
+            scores = counts / np.sqrt(self.viewers[row] * self.viewers[cols])
+            if len(cols) > n:
+                kth = np.partition(scores, len(scores) - n)[len(scores) - n]
+                cols, scores = cols[scores >= kth], scores[scores >= kth]
+            order = np.lexsort((self.video_ids[cols], -scores))[:n]
+            yield self.video_ids[cols[order]], scores[order]
+
+
+def _write(matrix, rows, n, now):
+    table = VideoAlsoWatched._meta.db_table
+    computed_at = now.isoformat()
+    written = []
+    for block, co in matrix.blocks(rows):
+        lines = []
+        for row, (ids, scores) in zip(block, matrix.top_n(block, co, n)):
+            video_id = matrix.video_ids[row]
+            lines.extend(
+                f"{video_id}\t{vid}\t{rank}\t{score!r}\t{computed_at}\n"
+                for rank, (vid, score) in enumerate(zip(ids.tolist(), scores.tolist()))
+            )
+        video_ids = matrix.video_ids[block].tolist()
+        VideoAlsoWatched.objects.filter(video_id__in=video_ids).delete()
+        # ~20 rows per video: COPY instead of bulk_create keeps a full build
+        # from being bound by INSERT statements
+        with connection.cursor() as cursor:
+            with cursor.cursor.copy(
+                f"COPY {table} (video_id, neighbor_id, rank, score, computed_at) FROM STDIN"
+            ) as copy:
+                copy.write("".join(lines))
+        written.extend(video_ids)
+    # conditional reads of the lists validate against the catalog version
+    transaction.on_commit(bump_catalog_version)
+    return written
+
+
+def _refreshed_at():
+    return CatalogVersion.objects.filter(key=REFRESHED_KEY).values_list("modified_at", flat=True).first()
+
+
+def _mark_refreshed(at):
+    CatalogVersion.objects.update_or_create(key=REFRESHED_KEY, defaults={"modified_at": at})
+
+
+def build_also_watched(n=ALSO_WATCHED_N):
+    """Recompute every video's list. Returns the number of videos processed."""
+    now = timezone.now()
+    matrix = CoWatchMatrix(_load_pairs())
+    with transaction.atomic():
+        VideoAlsoWatched.objects.all().delete()
+        written = _write(matrix, np.arange(len(matrix.video_ids)), n, now)
+        _mark_refreshed(now)
+    return len(written)
+
+
+def refresh_also_watched(n=ALSO_WATCHED_N):
+    """
+    Recompute the lists of videos watched by users whose pairs were written
+    since the last build. Returns the number of videos processed.
+    """
+    since = _refreshed_at()
+    if since is None:
+        return build_also_watched(n)
+    now = timezone.now()
+    touched = _load_pairs(since)
+    if not len(touched):
+        _mark_refreshed(now)
+        return 0
+    # co-watch counts of the touched videos need every viewer, not just the new ones
+    matrix = CoWatchMatrix(_load_pairs())
+    rows = matrix.positions(np.unique(touched[:, 1]))
+    with transaction.atomic():
+        written = _write(matrix, rows, n, now)
+        _mark_refreshed(now)
+    return len(written)
@@ -0,0 +1,104 @@
+"""
+Facet counts for the browse sidebar, computed in a single SQL round trip.
+
+The filtered queryset is embedded as a CTE and every facet (level, channel,
+speaker, topic, duration bucket) is emitted as a ``(facet, name)`` row, then
+counted with ``GROUPING SETS`` so the per-facet subtotals come back in the same
+statement. The ``level`` subtotal doubles as the total number of matched videos
+because every video has exactly one level.
+"""
+
+from django.db import connection
+
+from .models import Video, Channel, Tag, Speaker
+
+DURATION_STEP = 60  # seconds per histogram bucket (legacy value)
+
+_FACET_SQL = """
+WITH matched AS MATERIALIZED (
+    SELECT v.id, v.level, v.channel_id, v.duration
+    FROM {video} v
+    WHERE v.id IN ({ids_sql})
+),
+bounds AS (
+    -- legacy sizing: enough buckets to cover max(duration) + 20s
+    SELECT GREATEST(1, (COALESCE(MAX(duration), -20) + 20) / %s + 1) AS n_steps
+    FROM matched
+),
+facet_rows AS (
+    SELECT 'level' AS facet, m.level AS name, NULL::integer AS n_steps
+    FROM matched m
+    UNION ALL
+    SELECT 'channel', c.name, NULL
+    FROM matched m JOIN {channel} c ON c.id = m.channel_id
+    UNION ALL
+    SELECT 'speaker', s.name, NULL
+    FROM matched m
+    JOIN {video_speakers} vs ON vs.video_id = m.id
+    JOIN {speaker} s ON s.id = vs.speaker_id
+    UNION ALL
+    SELECT 'topic', t.name, NULL
+    FROM matched m
+    JOIN {video_tags} vt ON vt.video_id = m.id
+    JOIN {tag} t ON t.id = vt.tag_id
+    UNION ALL
+    SELECT 'duration',
+           GREATEST(width_bucket(m.duration, 0, b.n_steps * %s, b.n_steps) - 1, 0)::text,
+           b.n_steps
+    FROM matched m CROSS JOIN bounds b
+)
+SELECT facet, name, GROUPING(name) AS is_subtotal, COUNT(*), MAX(n_steps)
+FROM facet_rows
+GROUP BY GROUPING SETS ((facet, name), (facet))
+"""
+
+
+def _facet_sql(ids_sql):
+    return _FACET_SQL.format(
+        video=Video._meta.db_table,
+        channel=Channel._meta.db_table,
+        speaker=Speaker._meta.db_table,
+        tag=Tag._meta.db_table,
+        video_speakers=Video.speakers.through._meta.db_table,
+        video_tags=Video.tags.through._meta.db_table,
+        ids_sql=ids_sql,
+    )
+
+
+def facet_statistics(qs):
+    """
+    Return the ``{"total": ..., "statistics": {...}}`` payload served by
+    ``VideoViewSet.statistics`` for the videos matched by ``qs``.
+    """
+    ids_sql, ids_params = qs.order_by().values("id").query.sql_with_params()
+    counts = {"level": {}, "channel": {}, "speaker": {}, "topic": {}, "duration": {}}
+    total = 0
+    n_steps = 1
+    with connection.cursor() as cursor:
+        cursor.execute(_facet_sql(ids_sql), (*ids_params, DURATION_STEP, DURATION_STEP))
+        for facet, name, is_subtotal, count, steps in cursor.fetchall():
+            if not is_subtotal:
+                counts[facet][name] = count
+            elif facet == "level":
+                total = count
+            elif facet == "duration":
+                n_steps = steps or 1
+
+    level_order = {value: i for i, (value, _) in enumerate(Video.LEVEL_CHOICES)}
+    buckets = counts["duration"]
+    return {
+        "total": total,
+        "statistics": {
+            "levels": [
+                {"name": k, "count": v}
+                for k, v in sorted(counts["level"].items(), key=lambda kv: level_order.get(kv[0], len(level_order)))
+            ],
+            "channels": [{"name": k, "count": v} for k, v in sorted(counts["channel"].items())],
+            "speakers": [{"name": k, "count": v} for k, v in sorted(counts["speaker"].items())],
+            "topics": [{"name": k, "count": v} for k, v in sorted(counts["topic"].items())],
+            "durations": [
+                {"count": buckets.get(str(i), 0), "start": i * DURATION_STEP, "end": (i + 1) * DURATION_STEP}
+                for i in range(n_steps)
+            ],
+        },
+    }
@@ -0,0 +1,273 @@
+"""
+Bulk catalog ingestion (``manage.py import_catalog``).
+
+Accepted inputs, by file:
+
+- yt-dlp info JSON: one ``*.info.json`` object per video, a playlist dump with
+  ``entries``, or ``-j`` output with one object per line;
+- ``frontend/db.json``-style files: ``{"videos": [...]}`` (or a bare list) of
+  API-shaped records (``channelName``, ``tagNames``, ``uploadDate``, ...).
+
+Files are parsed and normalized in a process pool. Rows are then written a
+batch at a time: missing channels/tags/speakers with ``ignore_conflicts``,
+videos as one ``INSERT ... ON CONFLICT (platform, on_platform_id) DO UPDATE``,
+and tag/speaker links as bulk through-table inserts. A re-import updates the
+existing rows instead of adding duplicates.
+
+Only the fields a source actually provides are written on update, so
+re-importing yt-dlp dumps does not reset a level or premium flag set in the
+admin. Records without an on-platform id are keyed by their source ``id``.
+"""
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+
+from django.db import transaction
+
+from .catalog import bump_catalog_version
+from .models import Channel, Speaker, Tag, Video
+
+BATCH_SIZE = 2000
+FILE_SUFFIXES = (".json", ".jsonl")
+LEVELS = {value for value, _ in Video.LEVEL_CHOICES}
+
+
+def parse_upload_date(value):
+    """``date`` from yt-dlp's ``YYYYMMDD`` (or ISO) string; ``None`` if absent or unparseable."""
+    if not value:
+        return None
+    for fmt in ("%Y%m%d", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(str(value).strip(), fmt).date()
+        except ValueError:
+            pass
+    return None
+
+
+def _clip(value, model, name):
+    return str(value)[: model._meta.get_field(name).max_length]
+
+
+def _names(values, model):
+    """De-duplicated, clipped dimension names (order kept)."""
+    names = (_clip(v, model, "name").strip() for v in values or () if v)
+    return list(dict.fromkeys(n for n in names if n))
+
+
+@dataclass
+class Record:
+    platform: str
+    on_platform_id: str
+    channel: str
+    fields: dict  # Video field -> value, only what the source provides
+    tags: list = None  # None: the source says nothing about tags, leave them alone
+    speakers: list = None
+
+
+def record_from_info(info):
+    channel = info.get("channel") or info.get("uploader")
+    if not info.get("id") or not channel:
+        return None
+    fields = {
+        "title": _clip(info.get("title") or info["id"], Video, "title"),
+        "description": info.get("description") or "",
+        "duration": int(info.get("duration") or 0),
+        "upload_date": parse_upload_date(info.get("upload_date")),
+    }
+    if info.get("language"):
+        fields["language"] = _clip(info["language"], Video, "language")
+    return Record(
+        platform=(info.get("extractor_key") or info.get("extractor") or Channel.YOUTUBE).lower(),
+        on_platform_id=_clip(info["id"], Video, "on_platform_id"),
+        channel=_clip(channel, Channel, "name"),
+        fields=fields,
+        tags=_names(info.get("tags"), Tag),
+    )
+
+
+def _from_api(record, platform):
+    def pick(*keys):
+        return next((record[k] for k in keys if record.get(k) is not None), None)
+
+    key = pick("onPlatformId", "on_platform_id", "id")
+    channel = pick("channelName", "channel_name")
+    if key is None or not channel:
+        return None
+    fields = {}
+    for name, keys, convert in (
+        ("title", ("title",), lambda v: _clip(v, Video, "title")),
+        ("description", ("description",), str),
+        ("duration", ("duration",), int),
+        ("upload_date", ("uploadDate", "upload_date"), parse_upload_date),
+        ("language", ("language",), lambda v: _clip(v, Video, "language")),
+        ("rating", ("rating",), float),
+        ("premium", ("premium",), bool),
+    ):
+        value = pick(*keys)
+        if value is not None:
+            fields[name] = convert(value)
+    if pick("level") in LEVELS:
+        fields["level"] = record["level"]
+    fields.setdefault("title", str(key))
+    fields.setdefault("duration", 0)
+    tags, speakers = pick("tagNames", "tags"), pick("speakerNames", "speakers")
+    return Record(
+        platform=str(pick("platform") or platform).lower(),
+        on_platform_id=_clip(key, Video, "on_platform_id"),
+        channel=_clip(channel, Channel, "name"),
+        fields=fields,
+        tags=None if tags is None else _names(tags, Tag),
+        speakers=None if speakers is None else _names(speakers, Speaker),
+    )
+
+
+def _documents(path):
+    text = Path(path).read_text(encoding="utf-8")
+    try:
+        yield json.loads(text)
+    except json.JSONDecodeError:
+        # yt-dlp -j / JSON lines
+        for line in text.splitlines():
+            if line.strip():
+                yield json.loads(line)
+
+
+def parse_file(path, platform=Channel.YOUTUBE):
+    """``(records, skipped, error)`` for one input file. Runs in a worker process."""
+    records, skipped = [], 0
+    try:
+        for doc in _documents(path):
+            if isinstance(doc, dict) and isinstance(doc.get("videos"), list):
+                items, convert = doc["videos"], lambda r: _from_api(r, platform)
+            elif isinstance(doc, list):
+                items, convert = doc, lambda r: _from_api(r, platform)
+            elif isinstance(doc, dict) and isinstance(doc.get("entries"), list):
+                items, convert = doc["entries"], record_from_info
+            else:
+                items, convert = [doc], record_from_info
+            for item in items:
+                record = convert(item) if isinstance(item, dict) else None
+                if record is None:
+                    skipped += 1
+                else:
+                    records.append(record)
+    except (OSError, UnicodeDecodeError, ValueError, TypeError) as exc:
+        return [], 0, f"{path}: {exc}"
+    return records, skipped, None
+
+
+def input_files(paths):
+    for path in map(Path, paths):
+        if path.is_dir():
+            yield from sorted(str(p) for p in path.rglob("*") if p.suffix in FILE_SUFFIXES and p.is_file())
+        else:
+            yield str(path)
+
+
+def _ensure(model, names):
+    """``{name: id}`` for ``names``, creating the missing rows."""
+    names = set(names)
+    if not names:
+        return {}
+    model.objects.bulk_create([model(name=n) for n in names], ignore_conflicts=True)
+    return dict(model.objects.filter(name__in=names).values_list("name", "id"))
+
+
+def _link(through, fk, video_ids, links):
+    """Replace the ``fk`` links of ``video_ids`` with ``links`` (``(video_id, dim_id)`` pairs)."""
+    through.objects.filter(video_id__in=video_ids).delete()
+    through.objects.bulk_create(
+        [through(video_id=v, **{fk: d}) for v, d in links], ignore_conflicts=True, batch_size=5000,
+    )
+
+
+@dataclass
+class ImportStats:
+    files: int = 0
+    videos: int = 0
+    skipped: int = 0
+    errors: list = field(default_factory=list)
+
+
+def write_batch(records):
+    """Upsert one batch of records. Returns the number of videos written."""
+    # later records win over earlier duplicates: ON CONFLICT may not touch a row twice
+    records = list({(r.platform, r.on_platform_id): r for r in records}.values())
+    with transaction.atomic():
+        channels = _ensure(Channel, (r.channel for r in records))
+        tags = _ensure(Tag, (n for r in records for n in r.tags or ()))
+        speakers = _ensure(Speaker, (n for r in records for n in r.speakers or ()))
+
+        # one upsert per field set, so a source only overwrites what it provides
+        groups = {}
+        for r in records:
+            groups.setdefault(tuple(sorted(r.fields)), []).append(r)
+        for names, group in groups.items():
+            Video.objects.bulk_create(
+                [
+                    Video(platform=r.platform, on_platform_id=r.on_platform_id, channel_id=channels[r.channel], **r.fields)
+                    for r in group
+                ],
+                update_conflicts=True,
+                unique_fields=["platform", "on_platform_id"],
+                update_fields=["channel", *names, "updated_at"],
+            )
+
+        # bulk_create(update_conflicts=True) does not return ids for updated rows (Django < 5)
+        ids = {}
+        for platform in {r.platform for r in records}:
+            keys = [r.on_platform_id for r in records if r.platform == platform]
+            for key, pk in Video.objects.filter(platform=platform, on_platform_id__in=keys).values_list("on_platform_id", "id"):
+                ids[platform, key] = pk
+        for attr, through, fk, dims in (
+            ("tags", Video.tags.through, "tag_id", tags),
+            ("speakers", Video.speakers.through, "speaker_id", speakers),
+        ):
+            given = [r for r in records if getattr(r, attr) is not None]
+            if given:
+                _link(
+                    through, fk,
+                    [ids[r.platform, r.on_platform_id] for r in given],
+                    [(ids[r.platform, r.on_platform_id], dims[n]) for r in given for n in getattr(r, attr)],
+                )
+    return len(records)
+
+
+def import_catalog(paths, workers=None, batch_size=BATCH_SIZE, platform=Channel.YOUTUBE, progress=None):
+    """
+    Parse ``paths`` (files or directories) in ``workers`` processes and upsert
+    the videos ``batch_size`` at a time. ``progress(stats)`` is called after
+    every batch. Returns an ``ImportStats``.
+    """
+    files = list(input_files(paths))
+    stats = ImportStats(files=len(files))
+    workers = workers or os.cpu_count() or 1
+    pending = []
+
+    def flush():
+        stats.videos += write_batch(pending)
+        pending.clear()
+        if progress:
+            progress(stats)
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, len(files) // (workers * 8))
+            for records, skipped, error in pool.map(parse_file, files, [platform] * len(files), chunksize=chunksize):
+                if error:
+                    stats.errors.append(error)
+                stats.skipped += skipped
+                pending.extend(records)
+                if len(pending) >= batch_size:
+                    flush()
+        if pending:
+            flush()
+    finally:
+        if stats.videos:
+            # bulk writes send no model signals: invalidate catalog caches/ETags once
+            bump_catalog_version()
+    return stats
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from backend.videos.cowatch import ALSO_WATCHED_N, build_also_watched, refresh_also_watched
+
+
+class Command(BaseCommand):
+    help = (
+        'Precompute "viewers also watched" lists from watch history. By default only videos '
+        "watched by users with new activity since the last build are recomputed; --full rebuilds everything."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="recompute every video")
+        parser.add_argument("-n", type=int, default=ALSO_WATCHED_N, help=f"videos per list (default {ALSO_WATCHED_N})")
+
+    def handle(self, *args, full=False, n=ALSO_WATCHED_N, **options):
+        count = build_also_watched(n=n) if full else refresh_also_watched(n=n)
+        self.stdout.write(self.style.SUCCESS(f'Recomputed "also watched" for {count} video(s)'))
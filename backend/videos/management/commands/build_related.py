@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from backend.videos.related import RELATED_K, build_neighbors, refresh_neighbors, stale_video_ids
+
+
+class Command(BaseCommand):
+    help = (
+        "Precompute the related-videos neighbour table. By default only stale videos "
+        "(and the lists they enter or leave) are recomputed; --full rebuilds everything."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="recompute every video")
+        parser.add_argument("--video", type=int, action="append", default=[], help="recompute this video id (repeatable)")
+        parser.add_argument("-k", type=int, default=RELATED_K, help=f"neighbours per video (default {RELATED_K})")
+
+    def handle(self, *args, full=False, video=None, k=RELATED_K, **options):
+        if full:
+            n = build_neighbors(k=k)
+        else:
+            video_ids = video or stale_video_ids()
+            n = refresh_neighbors(video_ids, k=k)
+        self.stdout.write(self.style.SUCCESS(f"Recomputed related videos for {n} video(s)"))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from backend.videos.importer import BATCH_SIZE, import_catalog
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-load videos from yt-dlp info JSON dumps or frontend/db.json-style files. "
+        "Existing videos (same platform and on-platform id) are updated in place."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+", help="files or directories (scanned for *.json / *.jsonl)")
+        parser.add_argument("--workers", type=int, default=None, help="parser processes (default: CPU count)")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help=f"videos per transaction (default {BATCH_SIZE})")
+        parser.add_argument("--platform", default="youtube", help="platform for records that do not name one")
+
+    def handle(self, *args, paths, workers=None, batch_size=BATCH_SIZE, platform="youtube", **options):
+        def progress(stats):
+            if options["verbosity"] > 1:
+                self.stdout.write(f"{stats.videos} video(s) written")
+
+        stats = import_catalog(paths, workers=workers, batch_size=batch_size, platform=platform, progress=progress)
+        for error in stats.errors:
+            self.stderr.write(error)
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stats.videos} video(s) from {stats.files} file(s); "
+            f"skipped {stats.skipped} record(s), {len(stats.errors)} unreadable file(s)"
+        ))
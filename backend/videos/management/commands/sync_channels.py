@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.videos.models import ChannelSync
+from backend.videos.sync import due_syncs, sync_channels
+
+
+class Command(BaseCommand):
+    help = (
+        "Sync channels from upstream: fetch metadata only for videos that are new or whose "
+        "title/duration changed. By default only channels due per CHANNEL_SYNC_INTERVAL are synced."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--channel", type=int, action="append", default=[], help="sync this channel id (repeatable)")
+        parser.add_argument("--full", action="store_true", help="read whole listings instead of stopping at the cursor")
+        parser.add_argument("--workers", type=int, default=None, help="metadata fetch threads (default CHANNEL_SYNC_WORKERS)")
+
+    def handle(self, *args, channel=None, full=False, workers=None, **options):
+        if channel:
+            syncs = list(ChannelSync.objects.filter(channel_id__in=channel).select_related("channel"))
+            if not syncs:
+                raise CommandError("No sync configured for the given channel(s)")
+        else:
+            syncs = list(due_syncs())
+        for result in sync_channels(syncs, full=full, workers=workers):
+            for error in result.errors:
+                self.stderr.write(f"{result.channel}: {error}")
+            self.stdout.write(
+                f"{result.channel}: {result.listed} listed, {result.fetched} fetched, {result.written} written"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Synced {len(syncs)} channel(s)"))
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.23 on 2026-10-17 23:09
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+SEARCH_VECTOR_TRIGGER = """
+CREATE FUNCTION videos_video_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('pg_catalog.russian', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('pg_catalog.russian', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER videos_video_search_vector_trigger
+    BEFORE INSERT OR UPDATE ON videos_video
+    FOR EACH ROW EXECUTE FUNCTION videos_video_search_vector_update();
+
+-- backfill existing rows through the trigger
+UPDATE videos_video SET title = title;
+"""
+
+DROP_SEARCH_VECTOR_TRIGGER = """
+DROP TRIGGER IF EXISTS videos_video_search_vector_trigger ON videos_video;
+DROP FUNCTION IF EXISTS videos_video_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0002_expand_levels'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='video',
+            name='level',
+            field=models.CharField(choices=[('Beginner 0', 'Beginner 0'), ('Beginner 1', 'Beginner 1'), ('Beginner 2', 'Beginner 2'), ('Intermediate 1', 'Intermediate 1'), ('Intermediate 2', 'Intermediate 2'), ('Advanced', 'Advanced'), ('Native', 'Native')], default='Beginner 0', max_length=32),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='videos_video_search_gin'),
+        ),
+        migrations.RunSQL(SEARCH_VECTOR_TRIGGER, DROP_SEARCH_VECTOR_TRIGGER),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.23 on 2026-10-17 23:11
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0003_video_search_vector'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='channel',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='videos_channel_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='speaker',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='videos_speaker_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='videos_tag_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='videos_video_title_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
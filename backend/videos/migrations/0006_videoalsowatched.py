@@ -0,0 +1,32 @@
+# Generated by Django 4.2.23 on 2026-10-17 23:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0005_videoneighbor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VideoAlsoWatched',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('computed_at', models.DateTimeField()),
+                ('neighbor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='videos.video')),
+                ('video', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='also_watched', to='videos.video')),
+            ],
+            options={
+                'ordering': ['video', 'rank'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='videoalsowatched',
+            constraint=models.UniqueConstraint(fields=('video', 'rank'), name='videos_videoalsowatched_video_rank'),
+        ),
+    ]
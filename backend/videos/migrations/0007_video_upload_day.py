@@ -0,0 +1,59 @@
+from datetime import datetime
+
+from django.db import migrations, models
+
+BATCH_SIZE = 5000
+
+
+def parse_upload_date(value):
+    """The old column held yt-dlp style ``YYYYMMDD`` (occasionally ISO); anything else becomes NULL."""
+    for fmt in ("%Y%m%d", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value.strip(), fmt).date()
+        except ValueError:
+            pass
+    return None
+
+
+def _batches(Video, fields):
+    last = 0
+    while True:
+        batch = list(Video.objects.filter(id__gt=last).order_by("id").values_list("id", *fields)[:BATCH_SIZE])
+        if not batch:
+            return
+        yield batch
+        last = batch[-1][0]
+
+
+def copy_to_date(apps, schema_editor):
+    Video = apps.get_model("videos", "Video")
+    for batch in _batches(Video, ["upload_date"]):
+        Video.objects.bulk_update(
+            [Video(id=pk, upload_day=parse_upload_date(value)) for pk, value in batch], ["upload_day"],
+        )
+
+
+def copy_to_string(apps, schema_editor):
+    Video = apps.get_model("videos", "Video")
+    for batch in _batches(Video, ["upload_day"]):
+        Video.objects.bulk_update(
+            [Video(id=pk, upload_date=day.strftime("%Y%m%d") if day else "") for pk, day in batch], ["upload_date"],
+        )
+
+
+class Migration(migrations.Migration):
+    # each batch commits on its own, so a large table is never locked for the whole copy
+    atomic = False
+
+    dependencies = [
+        ('videos', '0006_videoalsowatched'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='upload_day',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.RunPython(copy_to_date, copy_to_string),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0007_video_upload_day'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='video',
+            name='videos_vide_upload__339bc0_idx',
+        ),
+        migrations.RemoveField(
+            model_name='video',
+            name='upload_date',
+        ),
+        migrations.RenameField(
+            model_name='video',
+            old_name='upload_day',
+            new_name='upload_date',
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['upload_date', 'id'], name='videos_video_upload_date_id'),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['duration', 'id'], name='videos_video_duration_id'),
+        ),
+    ]
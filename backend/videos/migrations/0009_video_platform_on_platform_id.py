@@ -0,0 +1,74 @@
+# Generated by Django 4.2.23 on 2026-10-17 23:48
+
+import sys
+
+from django.db import IntegrityError, migrations, models, transaction
+from django.db.models import Count, Min
+
+
+def merge_duplicates(apps, schema_editor):
+    """
+    Merge the videos sharing a (platform, on_platform_id) into the oldest one:
+    tag/speaker links and every row pointing at a duplicate move to it, then
+    the duplicates are deleted. A row that cannot move because the oldest
+    video already has its counterpart (a second progress row or neighbour
+    rank for the same video; derived data, rebuilt from the logs) is deleted
+    with its duplicate. Both are reported.
+    """
+    Video = apps.get_model("videos", "Video")
+    groups = list(
+        Video.objects.values("platform", "on_platform_id").annotate(n=Count("id"), keep=Min("id")).filter(n__gt=1)
+    )
+    relations = [
+        f for f in Video._meta.get_fields(include_hidden=True)
+        if f.auto_created and not f.concrete and (f.one_to_many or f.one_to_one)
+    ]
+    merged = dropped = 0
+    for group in groups:
+        keep = group["keep"]
+        duplicates = list(
+            Video.objects.filter(platform=group["platform"], on_platform_id=group["on_platform_id"])
+            .exclude(pk=keep).values_list("pk", flat=True)
+        )
+        for field in Video._meta.local_many_to_many:
+            through = field.remote_field.through
+            source, target = f"{field.m2m_field_name()}_id", f"{field.m2m_reverse_field_name()}_id"
+            linked = set(through.objects.filter(**{f"{source}__in": duplicates}).values_list(target, flat=True))
+            through.objects.bulk_create(
+                [through(**{source: keep, target: pk}) for pk in linked], ignore_conflicts=True,
+            )
+        for relation in relations:
+            name = relation.field.name
+            rows = relation.related_model._base_manager.filter(**{f"{name}__in": duplicates})
+            try:
+                with transaction.atomic():
+                    rows.update(**{name: keep})
+            except IntegrityError:
+                for pk in rows.values_list("pk", flat=True):
+                    try:
+                        with transaction.atomic():
+                            relation.related_model._base_manager.filter(pk=pk).update(**{name: keep})
+                    except IntegrityError:
+                        dropped += 1
+        Video.objects.filter(pk__in=duplicates).delete()
+        merged += len(duplicates)
+    if merged:
+        sys.stdout.write(
+            f"\n  merged {merged} duplicate video(s) into {len(groups)}; "
+            f"{dropped} related row(s) already present on the kept video were deleted"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0008_video_upload_date_typed'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='video',
+            constraint=models.UniqueConstraint(fields=('platform', 'on_platform_id'), name='videos_video_platform_on_platform_id'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.23 on 2026-10-17 23:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0009_video_platform_on_platform_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChannelSync',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(help_text='channel videos tab or uploads playlist', max_length=512)),
+                ('enabled', models.BooleanField(default=True)),
+                ('cursor', models.CharField(blank=True, max_length=32)),
+                ('last_synced_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('channel', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='sync', to='videos.channel')),
+            ],
+        ),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations
+
+
+# recompute the tsvector only when the text changes, not on every UPDATE of
+# the row (view counts, updated_at bumps); Django's save() names every column,
+# hence the WHEN as well as the column list
+TRIGGERS = """
+DROP TRIGGER videos_video_search_vector_trigger ON videos_video;
+
+CREATE TRIGGER videos_video_search_vector_insert
+    BEFORE INSERT ON videos_video
+    FOR EACH ROW EXECUTE FUNCTION videos_video_search_vector_update();
+
+CREATE TRIGGER videos_video_search_vector_update
+    BEFORE UPDATE OF title, description ON videos_video
+    FOR EACH ROW
+    WHEN (OLD.title IS DISTINCT FROM NEW.title OR OLD.description IS DISTINCT FROM NEW.description)
+    EXECUTE FUNCTION videos_video_search_vector_update();
+"""
+
+ONE_TRIGGER = """
+DROP TRIGGER videos_video_search_vector_insert ON videos_video;
+DROP TRIGGER videos_video_search_vector_update ON videos_video;
+
+CREATE TRIGGER videos_video_search_vector_trigger
+    BEFORE INSERT OR UPDATE ON videos_video
+    FOR EACH ROW EXECUTE FUNCTION videos_video_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0010_channelsync'),
+    ]
+
+    operations = [
+        migrations.RunSQL(TRIGGERS, ONE_TRIGGER),
+    ]
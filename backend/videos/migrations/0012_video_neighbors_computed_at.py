@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-18 00:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0011_search_vector_trigger_columns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='neighbors_computed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.23 on 2026-10-18 00:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0013_catalogversion'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='video',
+            name='videos_video_upload_date_id',
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(models.OrderBy(models.F('upload_date'), nulls_first=True), models.OrderBy(models.F('id')), name='videos_video_upload_date_id'),
+        ),
+    ]
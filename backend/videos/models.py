@@ -1,3 +1,5 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
 class Channel(models.Model):
@@ -7,13 +9,34 @@ class Channel(models.Model):
     name = models.CharField(max_length=255, unique=True)
     platform = models.CharField(max_length=32, choices=PLATFORM_CHOICES, default=YOUTUBE)
 
+    class Meta:
+        indexes = [GinIndex(fields=["name"], name="videos_channel_name_trgm", opclasses=["gin_trgm_ops"])]
+
     def __str__(self):
         return self.name
 
 
+class ChannelSync(models.Model):
+    """Where and how far a channel has been synced from upstream (see ``videos/sync.py``)."""
+    channel = models.OneToOneField(Channel, on_delete=models.CASCADE, related_name="sync")
+    url = models.URLField(max_length=512, help_text="channel videos tab or uploads playlist")
+    enabled = models.BooleanField(default=True)
+    # newest on-platform id of the listing at the last sync that fetched
+    # everything it found; an incremental sync stops reading the listing there
+    cursor = models.CharField(max_length=32, blank=True)
+    last_synced_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.channel} <- {self.url}"
+
+
 class Speaker(models.Model):
     name = models.CharField(max_length=255, unique=True)
 
+    class Meta:
+        indexes = [GinIndex(fields=["name"], name="videos_speaker_name_trgm", opclasses=["gin_trgm_ops"])]
+
     def __str__(self):
         return self.name
 
@@ -21,6 +44,9 @@ class Speaker(models.Model):
 class Tag(models.Model):
     name = models.CharField(max_length=255, unique=True)
 
+    class Meta:
+        indexes = [GinIndex(fields=["name"], name="videos_tag_name_trgm", opclasses=["gin_trgm_ops"])]
+
     def __str__(self):
         return self.name
 
@@ -36,6 +62,15 @@ class Video(models.Model):
         ("Native", "Native"),
     ]
 
+    # Browse sort keys; each ends with "id" so the order is total. A missing
+    # upload date sorts lowest, as in the (upload_date, id) index.
+    SORT_ORDERINGS = {
+        "new": (models.F("upload_date").desc(nulls_last=True), "-id"),
+        "old": (models.F("upload_date").asc(nulls_first=True), "id"),
+        "short": ("duration", "id"),
+        "long": ("-duration", "-id"),
+    }
+
     platform = models.CharField(max_length=32, default="youtube")
     # on-platform id (e.g., YouTube video id like 6ET0DMVxyNU). Keep it searchable.
     on_platform_id = models.CharField(max_length=32, db_index=True)
@@ -46,7 +81,9 @@ class Video(models.Model):
 
     title = models.CharField(max_length=512)
     description = models.TextField(blank=True)
-    upload_date = models.CharField(max_length=16, blank=True)  # keep string compatibility
+    # served as "YYYYMMDD" by the API (serializers.UploadDateField), as the
+    # column used to store it
+    upload_date = models.DateField(null=True, blank=True)
 
     rating = models.FloatField(default=0.0)
     level = models.CharField(max_length=32, choices=LEVEL_CHOICES, default="Beginner 0")
@@ -56,15 +93,79 @@ class Video(models.Model):
     tags = models.ManyToManyField(Tag, related_name="videos", blank=True)
     speakers = models.ManyToManyField(Speaker, related_name="videos", blank=True)
 
+    # weighted russian tsvector of title (A) + description (B); maintained by a
+    # database trigger (migration 0003), never written from Python
+    search_vector = SearchVectorField(null=True, editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # when the related-videos list (VideoNeighbor) was last computed, even if
+    # it came out empty; NULL: never, or a listed neighbour was deleted
+    neighbors_computed_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     class Meta:
         indexes = [
-            models.Index(fields=["upload_date"]),
+            # browse sorts (SORT_ORDERINGS): each index serves its ascending
+            # order forwards and its descending order backwards
+            models.Index(
+                models.F("upload_date").asc(nulls_first=True), models.F("id").asc(),
+                name="videos_video_upload_date_id",
+            ),
+            models.Index(fields=["duration", "id"], name="videos_video_duration_id"),
             models.Index(fields=["premium"]),
             models.Index(fields=["level"]),
+            GinIndex(fields=["search_vector"], name="videos_video_search_gin"),
+            GinIndex(fields=["title"], name="videos_video_title_trgm", opclasses=["gin_trgm_ops"]),
         ]
+        constraints = [
+            models.UniqueConstraint(fields=["platform", "on_platform_id"], name="videos_video_platform_on_platform_id"),
+        ]
+
+    def __str__(self):
+        return f"{self.title} ({self.on_platform_id})"
+
+
+class VideoNeighbor(models.Model):
+    """Precomputed top-K related videos of ``video`` (see ``videos/related.py``)."""
+    video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name="neighbors")
+    neighbor = models.ForeignKey(Video, on_delete=models.CASCADE, related_name="+")
+    rank = models.PositiveSmallIntegerField()  # 0 = most related
+    score = models.FloatField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["video", "rank"], name="videos_videoneighbor_video_rank"),
+        ]
+        ordering = ["video", "rank"]
+
+    def __str__(self):
+        return f"{self.video_id} -> {self.neighbor_id} ({self.score:.3f})"
+
+
+class VideoAlsoWatched(models.Model):
+    """Precomputed "viewers also watched" list of ``video`` (see ``videos/cowatch.py``)."""
+    video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name="also_watched")
+    neighbor = models.ForeignKey(Video, on_delete=models.CASCADE, related_name="+")
+    rank = models.PositiveSmallIntegerField()  # 0 = most similar
+    score = models.FloatField()  # item-item cosine over co-viewers
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["video", "rank"], name="videos_videoalsowatched_video_rank"),
+        ]
+        ordering = ["video", "rank"]
+
+    def __str__(self):
+        return f"{self.video_id} -> {self.neighbor_id} ({self.score:.3f})"
+
+
+class CatalogVersion(models.Model):
+    """Change counter of one catalog key (see ``videos/catalog.py``)."""
+    key = models.CharField(max_length=100, primary_key=True)
+    version = models.BigIntegerField(default=0)
+    modified_at = models.DateTimeField()
 
     def __str__(self):
-        return f"{self.title} ({self.on_platform_id})"
\ No newline at end of file
+        return f"{self.key} = {self.version}"
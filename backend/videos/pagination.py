@@ -0,0 +1,193 @@
+"""
+Keyset (cursor) pagination for the video catalog.
+
+A page is "the next N rows after the last row you saw" in the active sort
+order, e.g. ``(-upload_date, -id)``. The cursor carries that row's sort values,
+so each page is an index range read with no OFFSET and no ``COUNT(*)``: page
+200 of an infinite scroll costs the same as page 1.
+
+The cursor is an opaque token; it is only valid for the ordering it was issued
+for.
+
+NULL sorts as the lowest value of a nullable column: first ascending, last
+descending (``null_ordering``), the placement of the catalog's indexes and of
+the in-memory catalog index.
+"""
+
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from django.db.models.expressions import OrderBy
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def ordering_names(ordering):
+    """``order_by`` items (names or ``F(...).asc()/.desc()``) as ``"name"``/``"-name"`` strings."""
+    return tuple(
+        f"{'-' if item.descending else ''}{item.expression.name}" if isinstance(item, OrderBy) else item
+        for item in ordering
+    )
+
+
+def null_ordering(model, ordering):
+    """``ordering`` for ``order_by`` with NULLs of nullable fields sorting lowest."""
+    nullable = nullable_fields(model, ordering_names(ordering))
+    return tuple(
+        (F(name).desc(nulls_last=True) if item.startswith("-") else F(name).asc(nulls_first=True))
+        if name in nullable else item
+        for item, name in ((item, item.lstrip("-")) for item in ordering_names(ordering))
+    )
+
+
+def keyset_ordering(ordering):
+    """``ordering`` as names, with an ``id`` tiebreaker appended so the order is total."""
+    ordering = ordering_names(ordering)
+    if not ordering or ordering[-1].lstrip("-") not in ("id", "pk"):
+        ordering += ("-id" if ordering and ordering[-1].startswith("-") else "id",)
+    return ordering
+
+
+def _sorts_after(field, value, nullable):
+    """Rows whose ``field`` sorts strictly after ``value`` (NULL lowest: first ascending, last descending)."""
+    name, descending = field.lstrip("-"), field.startswith("-")
+    if value is None:
+        return Q(pk__in=[]) if descending else Q(**{f"{name}__isnull": False})
+    clause = Q(**{f"{name}__{'lt' if descending else 'gt'}": value})
+    if name in nullable and descending:
+        clause |= Q(**{f"{name}__isnull": True})
+    return clause
+
+
+def _equals(name, value):
+    return Q(**{f"{name}__isnull": True}) if value is None else Q(**{name: value})
+
+
+def keyset_filter(ordering, values, nullable=()):
+    """
+    Rows strictly after ``values`` in ``ordering``, i.e. the row-value
+    comparison ``(a, b) > (x, y)`` expanded per-column so mixed directions work.
+    ``nullable`` names the ordering fields that may hold NULL.
+    """
+    first, descending = ordering[0].lstrip("-"), ordering[0].startswith("-")
+    # Redundant with the OR below, but lets the planner use a range scan on
+    # the leading sort column.
+    if values[0] is None:
+        bound = Q(**{f"{first}__isnull": True}) if descending else Q()
+    else:
+        bound = Q(**{f"{first}__{'lte' if descending else 'gte'}": values[0]})
+        if first in nullable and descending:
+            bound |= Q(**{f"{first}__isnull": True})
+    after = Q()
+    for i, field in enumerate(ordering):
+        clause = _sorts_after(field, values[i], nullable)
+        for prev, value in zip(ordering[:i], values[:i]):
+            clause &= _equals(prev.lstrip("-"), value)
+        after |= clause
+    return bound & after
+
+
+def nullable_fields(model, ordering):
+    """Names in ``ordering`` that are nullable model fields (annotations are never treated as nullable)."""
+    names = set()
+    for field in ordering:
+        try:
+            if model._meta.get_field(field.lstrip("-")).null:
+                names.add(field.lstrip("-"))
+        except FieldDoesNotExist:
+            pass
+    return names
+
+
+def encode_cursor(ordering, values):
+    payload = json.dumps({"o": list(ordering), "v": list(values)}, cls=DjangoJSONEncoder, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, ordering):
+    """Sort values stored in ``cursor``; ``ValueError`` if it is malformed or for another ordering."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        stored, values = payload["o"], payload["v"]
+    except (TypeError, ValueError, KeyError):
+        raise ValueError("malformed cursor")
+    if stored != list(ordering) or not isinstance(values, list) or len(values) != len(ordering):
+        raise ValueError("cursor does not match the current ordering")
+    if any(v is not None and not isinstance(v, (str, int, float)) for v in values):
+        raise ValueError("unsupported cursor value")
+    return values
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only cursor pagination on the queryset's own ``order_by``.
+
+    Response: ``{"next": url | null, "cursor": token | null, "results": [...]}``.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_cursor_values(self, request, ordering):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            return decode_cursor(cursor, ordering)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        ordering = keyset_ordering(queryset.query.order_by or ("id",))
+        queryset = queryset.order_by(*null_ordering(queryset.model, ordering))
+        after = self.get_cursor_values(request, ordering)
+        if after is not None:
+            try:
+                queryset = queryset.filter(
+                    keyset_filter(ordering, after, nullable_fields(queryset.model, ordering))
+                )
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+        rows = list(queryset[: self.page_size + 1])
+        return self.paginate_ordered(
+            rows, ordering, request, key=lambda obj: [getattr(obj, f.lstrip("-")) for f in ordering],
+        )
+
+    def paginate_ordered(self, items, ordering, request, key):
+        """
+        Page over ``items`` that are already sorted by ``ordering`` and start
+        after the request's cursor; ``key(item)`` gives an item's sort values.
+        """
+        self.request = request
+        page = list(items[: self.page_size])
+        has_next = len(items) > self.page_size
+        self.next_cursor = encode_cursor(ordering, key(page[-1])) if has_next else None
+        return page
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(remove_query_param(url, "page"), self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "cursor": self.next_cursor, "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "cursor": {"type": "string", "nullable": True},
+                "results": schema,
+            },
+        }
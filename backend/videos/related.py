@@ -0,0 +1,186 @@
+"""
+Precomputed related videos.
+
+Each video's top-K neighbours are scored offline and stored in
+``VideoNeighbor``, so a detail page reads its related videos with one indexed
+query instead of fanning out over the tag graph.
+
+score(a, b) = (1 - LEVEL_WEIGHT) * weighted_jaccard(a, b) + LEVEL_WEIGHT * level_proximity(a, b)
+
+- weighted Jaccard is taken over the union of a video's tags and speakers,
+  each feature weighted by its inverse document frequency, so sharing a rare
+  tag counts for more than sharing "news";
+- level proximity is ``1 - |level_a - level_b| / (n_levels - 1)`` on the
+  ``Video.LEVEL_CHOICES`` order.
+
+Only videos that share at least one feature are candidates. ``build_neighbors``
+recomputes everything; ``refresh_neighbors`` recomputes the given videos and
+every other video whose list they enter or leave. Between full builds the IDF
+weights of untouched lists drift slightly, so run the full build periodically
+(``manage.py build_related --full``).
+"""
+
+import numpy as np
+from scipy import sparse
+from django.db import transaction
+from django.utils import timezone
+
+from .catalog import bump_catalog_version
+from .models import Video, VideoNeighbor
+
+RELATED_K = 10
+LEVEL_WEIGHT = 0.2
+# rows scored per block, sized so a dense block stays around 16 MB of float32
+BLOCK_CELLS = 1 << 22
+
+
+class FeatureMatrix:
+    """Videos x (tags + speakers) membership with IDF weights."""
+
+    def __init__(self):
+        # ids and levels from one query, so a video added in between cannot be half-known
+        videos = list(Video.objects.order_by("id").values_list("id", "level"))
+        self.ids = np.asarray([pk for pk, _ in videos], dtype=np.int64)
+        n = len(self.ids)
+        level_code = {value: i for i, (value, _) in enumerate(Video.LEVEL_CHOICES)}
+        self.level = np.asarray([level_code.get(level, 0) for _, level in videos], dtype=np.float32)
+        self.level_span = max(1, len(Video.LEVEL_CHOICES) - 1)
+
+        rows, cols = [], []
+        offset = 0
+        for through, fk in ((Video.tags.through, "tag_id"), (Video.speakers.through, "speaker_id")):
+            links = np.asarray(list(through.objects.values_list("video_id", fk)), dtype=np.int64).reshape(-1, 2)
+            links = links[np.isin(links[:, 0], self.ids)]
+            features, codes = np.unique(links[:, 1], return_inverse=True)
+            rows.append(self.positions(links[:, 0]))
+            cols.append(codes.reshape(-1) + offset)
+            offset += len(features)
+        rows, cols = np.concatenate(rows), np.concatenate(cols)
+
+        self.binary = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=(n, offset),
+        )
+        df = np.asarray(self.binary.sum(axis=0)).ravel()
+        self.idf = np.log((1 + n) / (1 + df)).astype(np.float32) + 1
+        self.weighted = self.binary.multiply(self.idf).tocsr()
+        self.total = np.asarray(self.weighted.sum(axis=1)).ravel()
+
+    def positions(self, video_ids):
+        return np.searchsorted(self.ids, video_ids)
+
+    def scores(self, rows):
+        """Dense ``len(rows) x n`` score block; 0 where nothing is shared (and on the diagonal)."""
+        shared = (self.weighted[rows] @ self.binary.T).toarray()
+        union = self.total[rows][:, None] + self.total[None, :] - shared
+        with np.errstate(divide="ignore", invalid="ignore"):
+            jaccard = np.where(shared > 0, shared / union, 0)
+        proximity = 1 - np.abs(self.level[rows][:, None] - self.level[None, :]) / self.level_span
+        scores = np.where(shared > 0, (1 - LEVEL_WEIGHT) * jaccard + LEVEL_WEIGHT * proximity, 0)
+        scores[np.arange(len(rows)), rows] = 0
+        return scores
+
+    def blocks(self, rows):
+        size = max(1, BLOCK_CELLS // max(1, len(self.ids)))
+        for start in range(0, len(rows), size):
+            block = rows[start:start + size]
+            yield block, self.scores(block)
+
+
+def _top_k(scores, k):
+    """Per row: (columns, scores) of the k best positive scores, best first."""
+    for row in scores:
+        candidates = np.flatnonzero(row > 0)
+        if len(candidates) > k:
+            # keep everything tied with the k-th score so the cut below is deterministic
+            kth = np.partition(row[candidates], len(candidates) - k)[len(candidates) - k]
+            candidates = candidates[row[candidates] >= kth]
+        # ties broken by position (i.e. lower video id)
+        order = np.lexsort((candidates, -row[candidates]))[:k]
+        yield candidates[order], row[candidates[order]]
+
+
+def _write(matrix, rows, scores, k, now):
+    neighbors = []
+    for row, (cols, values) in zip(rows, _top_k(scores, k)):
+        neighbors.extend(
+            VideoNeighbor(
+                video_id=int(matrix.ids[row]), neighbor_id=int(matrix.ids[col]),
+                rank=rank, score=float(value), computed_at=now,
+            )
+            for rank, (col, value) in enumerate(zip(cols, values))
+        )
+    video_ids = matrix.ids[rows].tolist()
+    VideoNeighbor.objects.filter(video_id__in=video_ids).delete()
+    VideoNeighbor.objects.bulk_create(neighbors, batch_size=1000)
+    Video.objects.filter(pk__in=video_ids).update(neighbors_computed_at=now)
+
+
+def build_neighbors(k=RELATED_K):
+    """Recompute the neighbour lists of every video. Returns the number of videos processed."""
+    matrix = FeatureMatrix()
+    now = timezone.now()
+    rows = np.arange(len(matrix.ids))
+    with transaction.atomic():
+        VideoNeighbor.objects.exclude(video_id__in=matrix.ids.tolist()).delete()
+        for block, scores in matrix.blocks(rows):
+            _write(matrix, block, scores, k, now)
+        # detail payloads embed the lists: move their ETags once the lists are in
+        transaction.on_commit(bump_catalog_version)
+    return len(rows)
+
+
+def stale_video_ids():
+    """
+    Videos whose list may be out of date: never computed, a listed neighbour
+    was deleted (both: ``neighbors_computed_at`` is NULL), or changed since
+    (``updated_at`` moves on save and on tag/speaker changes). A list that
+    is short because there are few candidates is not stale; new candidates
+    reach it through ``refresh_neighbors`` of the new video.
+    """
+    from django.db.models import F, Q
+
+    return list(
+        Video.objects.filter(Q(neighbors_computed_at__isnull=True) | Q(updated_at__gt=F("neighbors_computed_at")))
+        .values_list("id", flat=True)
+    )
+
+
+def refresh_neighbors(video_ids, k=RELATED_K):
+    """
+    Recompute the lists of ``video_ids`` and of every video whose top-k they
+    now enter or have left. Returns the number of videos processed.
+    """
+    matrix = FeatureMatrix()
+    known = set(matrix.ids.tolist())
+    changed = matrix.positions(np.asarray(sorted(pk for pk in video_ids if pk in known), dtype=np.int64))
+    if not len(changed):
+        return 0
+
+    # current k-th best score of every video, and who currently lists a changed video
+    kth = np.zeros(len(matrix.ids), dtype=np.float32)
+    full = np.zeros(len(matrix.ids), dtype=bool)
+    last = VideoNeighbor.objects.filter(rank=k - 1).values_list("video_id", "score")
+    for video_id, score in last:
+        if video_id in known:
+            kth[matrix.positions(video_id)] = score
+            full[matrix.positions(video_id)] = True
+    listing = set(
+        VideoNeighbor.objects.filter(neighbor_id__in=matrix.ids[changed].tolist())
+        .values_list("video_id", flat=True)
+    ) & known
+
+    affected = set(changed.tolist())
+    affected.update(matrix.positions(np.asarray(sorted(listing), dtype=np.int64)).tolist())
+    # scores are symmetric, so the changed rows also give every video's score against them
+    for _, scores in matrix.blocks(changed):
+        # ">=": on a tie the lower id wins, so an equal score can still enter
+        enters = (scores > 0) & ((scores >= kth[None, :]) | ~full[None, :])
+        affected.update(np.flatnonzero(enters.any(axis=0)).tolist())
+
+    rows = np.asarray(sorted(affected), dtype=np.int64)
+    now = timezone.now()
+    with transaction.atomic():
+        for block, scores in matrix.blocks(rows):
+            _write(matrix, block, scores, k, now)
+        transaction.on_commit(bump_catalog_version)
+    return len(rows)
@@ -0,0 +1,147 @@
+"""
+Text search over the video catalog.
+
+``Video.search_vector`` is a weighted (title A, description B) russian
+tsvector kept current by a database trigger and covered by a GIN index, so a
+match is an index lookup instead of an ``icontains`` scan.
+
+The fuzzy mode uses pg_trgm word similarity over video titles and tag,
+speaker and channel names (GIN ``gin_trgm_ops`` indexes) to survive typos and
+Latin-keyboard transliteration.
+"""
+
+from contextlib import contextmanager
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db import connection, transaction
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast, Greatest
+
+from .models import Video, Channel, Tag, Speaker
+
+SEARCH_CONFIG = "russian"
+
+
+def text_query(text):
+    # websearch syntax: plain words, "quoted phrases", -exclusions, OR
+    return SearchQuery(text, config=SEARCH_CONFIG, search_type="websearch")
+
+
+def full_text_search(qs, text):
+    """Filter ``qs`` to videos matching ``text`` and annotate ``search_rank`` (ts_rank)."""
+    query = text_query(text)
+    return qs.filter(search_vector=query).annotate(search_rank=_rank(SearchRank(F("search_vector"), query)))
+
+
+def _rank(expression):
+    # ts_rank/word_similarity return float4, which does not survive the round
+    # trip through Python; as float8 a rank read back from a row compares equal
+    # to itself, which keyset pagination on (-search_rank, -id) relies on.
+    return Cast(expression, FloatField())
+
+
+# ---- typo-tolerant (pg_trgm) search ----
+
+DEFAULT_SIMILARITY = 0.4
+
+# Latin -> Cyrillic, longest sequences first, for learners typing "privet" or
+# "borshch" on a Latin keyboard.
+_TRANSLIT = [
+    ("shch", "щ"), ("sch", "щ"),
+    ("yo", "ё"), ("zh", "ж"), ("kh", "х"), ("ts", "ц"), ("ch", "ч"), ("sh", "ш"),
+    ("yu", "ю"), ("ya", "я"), ("ye", "е"),
+    ("a", "а"), ("b", "б"), ("v", "в"), ("g", "г"), ("d", "д"), ("e", "е"), ("z", "з"),
+    ("i", "и"), ("j", "й"), ("y", "ы"), ("k", "к"), ("l", "л"), ("m", "м"), ("n", "н"),
+    ("o", "о"), ("p", "п"), ("r", "р"), ("s", "с"), ("t", "т"), ("u", "у"), ("f", "ф"),
+    ("h", "х"), ("c", "к"), ("w", "в"), ("x", "кс"), ("q", "к"), ("'", "ь"),
+]
+
+
+def to_cyrillic(text):
+    out, i, lower = [], 0, text.lower()
+    while i < len(lower):
+        for latin, cyrillic in _TRANSLIT:
+            if lower.startswith(latin, i):
+                out.append(cyrillic)
+                i += len(latin)
+                break
+        else:
+            out.append(lower[i])
+            i += 1
+    return "".join(out)
+
+
+def fuzzy_terms(text):
+    """The query as typed, plus its Cyrillic transliteration when it differs."""
+    terms = [text.strip()]
+    cyrillic = to_cyrillic(terms[0])
+    if cyrillic != terms[0].lower():
+        terms.append(cyrillic)
+    return terms
+
+
+def parse_similarity(value, default=DEFAULT_SIMILARITY):
+    try:
+        return min(1.0, max(0.05, float(value)))
+    except (TypeError, ValueError):
+        return default
+
+
+@contextmanager
+def similarity_threshold(threshold):
+    """
+    Run the block in a transaction with pg_trgm's word similarity threshold
+    set for that transaction only (``SET LOCAL``), so it never leaks to later
+    requests on a pooled connection. ``%>``, the operator the GIN trigram
+    indexes serve, reads the setting when the query *runs*: evaluate the
+    ``fuzzy_search``/``fuzzy_names`` querysets inside the block.
+    """
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)", [str(threshold)])
+        yield
+
+
+def _similar(model, field, terms):
+    match = Q()
+    for term in terms:
+        match |= Q(**{f"{field}__trigram_word_similar": term})
+    return model.objects.filter(match)
+
+
+def _word_similarity(field, terms):
+    scores = [TrigramWordSimilarity(term, field) for term in terms]
+    return Greatest(*scores) if len(scores) > 1 else scores[0]
+
+
+def fuzzy_search(qs, text):
+    """
+    Filter ``qs`` to videos whose title, channel, tags or speakers are
+    trigram-similar to ``text`` (or its transliteration) and annotate
+    ``search_rank`` with the best title/channel word similarity. Evaluate
+    it inside ``similarity_threshold``.
+
+    Each source is matched through its own GIN trigram index and the video
+    ids are UNIONed, so no branch forces a scan of the video table.
+    """
+    terms = fuzzy_terms(text)
+    candidates = _similar(Video, "title", terms).values("id").union(
+        Video.objects.filter(channel__in=_similar(Channel, "name", terms)).values("id"),
+        Video.tags.through.objects.filter(tag__in=_similar(Tag, "name", terms)).values("video_id"),
+        Video.speakers.through.objects.filter(speaker__in=_similar(Speaker, "name", terms)).values("video_id"),
+    )
+    return qs.filter(id__in=candidates).annotate(
+        search_rank=_rank(Greatest(_word_similarity("title", terms), _word_similarity("channel__name", terms))),
+    )
+
+
+def fuzzy_names(model, text, limit=10):
+    """Closest ``model`` rows by name, as ``[{"id", "name", "similarity"}]`` (inside ``similarity_threshold``)."""
+    terms = fuzzy_terms(text)
+    rows = (
+        _similar(model, "name", terms)
+        .annotate(similarity=_word_similarity("name", terms))
+        .order_by("-similarity", "name")
+        .values("id", "name", "similarity")[:limit]
+    )
+    return list(rows)
@@ -1,6 +1,7 @@
 from rest_framework import serializers
-from pathlib import Path
 from .models import Video, Channel, Tag, Speaker
+from .thumbnails import local_thumbnails, thumbnail_url
+from backend.journal.progress import video_progress
 
 class ChannelSerializer(serializers.ModelSerializer):
     class Meta:
@@ -17,35 +18,87 @@ class TagSerializer(serializers.ModelSerializer):
         model = Tag
         fields = ["id", "name"]
 
+class UploadDateField(serializers.DateField):
+    """``Video.upload_date`` as the ``YYYYMMDD`` string the API has always sent; ``""`` when unknown."""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("format", "%Y%m%d")
+        kwargs.setdefault("input_formats", ["%Y%m%d", "iso-8601"])
+        kwargs.setdefault("required", False)
+        kwargs.setdefault("allow_null", True)
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        value = super().get_attribute(instance)
+        return "" if value is None else value
+
+    def to_representation(self, value):
+        return super().to_representation(value) if value else ""
+
+    def to_internal_value(self, value):
+        return super().to_internal_value(value) if value else None
+
 class VideoSerializer(serializers.ModelSerializer):
     channelName = serializers.CharField(source="channel.name", read_only=True)
     tagNames = serializers.SerializerMethodField()
     speakerNames = serializers.SerializerMethodField()
     thumbnailUrl = serializers.SerializerMethodField()
+    watched = serializers.SerializerMethodField()
+    lastWatchTime = serializers.SerializerMethodField()
+    coverage = serializers.SerializerMethodField()
+    completed = serializers.SerializerMethodField()
+    upload_date = UploadDateField()
 
     class Meta:
         model = Video
         fields = [
             "id","platform","on_platform_id","language","channel","channelName","duration",
             "title","description","upload_date","rating","level","premium",
-            "tagNames","speakerNames","thumbnailUrl",
+            "tagNames","speakerNames","thumbnailUrl","watched","lastWatchTime","coverage","completed",
+        ]
+        read_only_fields = [
+            "id","channelName","tagNames","speakerNames","thumbnailUrl","watched","lastWatchTime","coverage","completed",
         ]
-        read_only_fields = ["id","channelName","tagNames","speakerNames","thumbnailUrl"]
 
+    # Read tags/speakers through .all() so the viewsets' prefetch_related is
+    # used; values_list() would issue two queries per row.
     def get_tagNames(self, obj):
-        return list(obj.tags.values_list("name", flat=True))
+        return [t.name for t in obj.tags.all()]
 
     def get_speakerNames(self, obj):
-        return list(obj.speakers.values_list("name", flat=True))
+        return [s.name for s in obj.speakers.all()]
 
     def get_thumbnailUrl(self, obj):
         # Prefer local asset if it exists, else fall back to platform (YouTube) hosted thumbnail.
-        local = Path('assets') / 'thumbnail' / obj.platform / f"{obj.id}.webp"
-        if local.exists():
-            return f"/assets/thumbnail/{obj.platform}/{obj.id}.webp"
-        if obj.platform == 'youtube' and obj.on_platform_id:
-            return f"https://img.youtube.com/vi/{obj.on_platform_id}/hqdefault.jpg"
-        return ""
+        # The manifest is looked up once per response, not once per row.
+        root = self.root
+        if not hasattr(root, "_local_thumbnails"):
+            root._local_thumbnails = local_thumbnails()
+        return thumbnail_url(obj, root._local_thumbnails)
+
+    def _progress(self, obj):
+        # the user's progress rows for this response's videos, read once per response
+        root = self.root
+        if not hasattr(root, "_progress_rows"):
+            request = self.context.get("request")
+            videos = root.instance if isinstance(root, serializers.ListSerializer) else [obj]
+            root._progress_rows = video_progress(getattr(request, "user", None), [v.id for v in videos])
+        return root._progress_rows.get(obj.id)
+
+    def get_watched(self, obj):
+        return self._progress(obj) is not None
+
+    def get_lastWatchTime(self, obj):
+        progress = self._progress(obj)
+        return progress.last_position if progress else None
+
+    def get_coverage(self, obj):
+        progress = self._progress(obj)
+        return round(progress.coverage, 4) if progress else 0.0
+
+    def get_completed(self, obj):
+        progress = self._progress(obj)
+        return bool(progress and progress.completed)
 
 class VideoDetailSerializer(VideoSerializer):
     related = serializers.SerializerMethodField()
@@ -54,9 +107,19 @@ class VideoDetailSerializer(VideoSerializer):
         fields = VideoSerializer.Meta.fields + ["related"]
 
     def get_related(self, obj):
-        # naive related: share at least one tag (excluding self)
-        tag_ids = obj.tags.values_list("id", flat=True)
+        # precomputed neighbours (videos/related.py), best first
+        related = [
+            n.neighbor for n in obj.neighbors.select_related("neighbor__channel")
+            .prefetch_related("neighbor__tags", "neighbor__speakers")
+        ]
+        if related:
+            return VideoSerializer(related, many=True, context=self.context).data
+        # not computed yet: naive related, share at least one tag (excluding self)
+        tag_ids = [t.id for t in obj.tags.all()]
         if not tag_ids:
             return []
-        qs = Video.objects.filter(tags__in=tag_ids).exclude(pk=obj.pk).distinct()[:10]
+        qs = (
+            Video.objects.filter(tags__in=tag_ids).exclude(pk=obj.pk).distinct()
+            .select_related("channel").prefetch_related("tags", "speakers")[:10]
+        )
         return VideoSerializer(qs, many=True, context=self.context).data
@@ -0,0 +1,52 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.utils import timezone
+
+from .catalog import bump_catalog_version
+from .models import Video, Channel, Tag, Speaker
+
+
+def _catalog_changed(sender, **kwargs):
+    if kwargs.get("action", "post_").startswith("pre_"):
+        return
+    # Wait for the commit so readers never rebuild from uncommitted rows.
+    transaction.on_commit(bump_catalog_version)
+
+
+for model in (Video, Channel, Tag, Speaker):
+    post_save.connect(_catalog_changed, sender=model, dispatch_uid=f"catalog-save-{model.__name__}")
+    post_delete.connect(_catalog_changed, sender=model, dispatch_uid=f"catalog-delete-{model.__name__}")
+
+for through in (Video.tags.through, Video.speakers.through):
+    m2m_changed.connect(_catalog_changed, sender=through, dispatch_uid=f"catalog-m2m-{through.__name__}")
+
+
+def _video_features_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # Tags/speakers feed the related-videos table (related.py), which finds
+    # stale rows by Video.updated_at; an m2m change does not save the video.
+    if action == "pre_clear" and reverse:
+        # tag.videos.clear() sends no pk_set and the links are gone by post_clear
+        instance._cleared_video_ids = set(
+            sender.objects.filter(**{f"{instance._meta.model_name}_id": instance.pk}).values_list("video_id", flat=True)
+        )
+        return
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        video_ids = {instance.pk}
+    elif action == "post_clear":
+        video_ids = instance.__dict__.pop("_cleared_video_ids", set())
+    else:
+        video_ids = pk_set
+    if video_ids:
+        Video.objects.filter(pk__in=video_ids).update(updated_at=timezone.now())
+
+
+def _neighbor_deleted(sender, instance, **kwargs):
+    # the lists holding the video lose a row to the cascade; recompute them
+    Video.objects.filter(neighbors__neighbor=instance).update(neighbors_computed_at=None)
+
+
+for through in (Video.tags.through, Video.speakers.through):
+    m2m_changed.connect(_video_features_changed, sender=through, dispatch_uid=f"related-m2m-{through.__name__}")
+pre_delete.connect(_neighbor_deleted, sender=Video, dispatch_uid="related-neighbor-delete")
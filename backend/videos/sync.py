@@ -0,0 +1,181 @@
+"""
+Incremental sync of channels from upstream (``manage.py sync_channels``).
+
+For each due ``ChannelSync`` the channel's flat playlist listing (ids, titles
+and durations only, newest first) is read a page at a time and diffed against
+the stored videos. Only ids that are new, or whose title or duration changed,
+get a full metadata fetch. Those fetches run on a bounded thread pool shared
+by every channel in the run, and each request first waits on a per-host rate
+limiter. The results are upserted through ``importer.write_batch``.
+
+An incremental sync stops reading the listing at the page holding the
+channel's cursor: the newest id seen by the last sync that fetched everything
+it found. A sync with failed fetches keeps the old cursor, so the next run
+reads back to it and retries them.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .catalog import bump_catalog_version
+from .importer import BATCH_SIZE, record_from_info, write_batch
+from .models import ChannelSync, Video
+
+LISTING_PAGE = 100
+VIDEO_URL = "https://www.youtube.com/watch?v={id}"
+
+
+class RateLimiter:
+    """Spaces requests to each host at least ``1 / rate`` seconds apart, across threads."""
+
+    def __init__(self, rates=None, default_rate=1.0, clock=time.monotonic, sleep=time.sleep):
+        self.rates = dict(rates or {})
+        self.default_rate = default_rate
+        self.clock, self.sleep = clock, sleep
+        self._next = {}  # host -> earliest time its next request may start
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        host = urlsplit(url).hostname or ""
+        interval = 1 / self.rates.get(host, self.default_rate)
+        with self._lock:
+            now = self.clock()
+            start = max(now, self._next.get(host, now))
+            self._next[host] = start + interval
+        if start > now:
+            self.sleep(start - now)
+
+
+class YtDlpSource:
+    """Listings and per-video metadata through ``yt_dlp.YoutubeDL`` (or a stand-in with its interface)."""
+
+    def __init__(self, limiter, ydl_factory=None):
+        if ydl_factory is None:
+            import yt_dlp
+
+            ydl_factory = yt_dlp.YoutubeDL
+        self.limiter = limiter
+        self.ydl_factory = ydl_factory
+
+    def _extract(self, url, **params):
+        self.limiter.wait(url)
+        with self.ydl_factory({"quiet": True, "skip_download": True, **params}) as ydl:
+            return ydl.extract_info(url, download=False)
+
+    def listing(self, url, start, end):
+        """Flat entries ``start``..``end`` (1-based, inclusive) of a channel or playlist."""
+        info = self._extract(url, extract_flat="in_playlist", playliststart=start, playlistend=end)
+        return [entry for entry in (info or {}).get("entries") or () if entry and entry.get("id")]
+
+    def video(self, video_id):
+        return self._extract(VIDEO_URL.format(id=video_id))
+
+
+def _changed(entry, title, duration):
+    if entry.get("title") and entry["title"] != title:
+        return True
+    return bool(entry.get("duration")) and int(entry["duration"]) != duration
+
+
+@dataclass
+class SyncResult:
+    channel: str
+    listed: int = 0
+    fetched: int = 0
+    written: int = 0
+    errors: list = field(default_factory=list)
+
+
+def pending_ids(sync, source, full=False):
+    """``(ids to fetch, newest listed id, entries read)`` for ``sync``'s channel."""
+    platform = sync.channel.platform
+    todo, newest, listed, start = [], None, 0, 1
+    while True:
+        entries = source.listing(sync.url, start, start + LISTING_PAGE - 1)
+        listed += len(entries)
+        if start == 1 and entries:
+            newest = entries[0]["id"]
+        ids = [entry["id"] for entry in entries]
+        stored = {
+            key: (title, duration)
+            for key, title, duration in Video.objects.filter(platform=platform, on_platform_id__in=ids)
+            .values_list("on_platform_id", "title", "duration")
+        }
+        todo.extend(
+            entry["id"] for entry in entries
+            if entry["id"] not in stored or _changed(entry, *stored[entry["id"]])
+        )
+        if len(entries) < LISTING_PAGE or (not full and sync.cursor and sync.cursor in ids):
+            return list(dict.fromkeys(todo)), newest, listed
+        start += LISTING_PAGE
+
+
+def sync_channel(sync, source, pool, full=False):
+    """Sync one channel, fetching metadata on ``pool``. Returns a ``SyncResult``."""
+    result = SyncResult(channel=sync.channel.name)
+    try:
+        todo, newest, result.listed = pending_ids(sync, source, full)
+    except Exception as exc:  # yt-dlp raises its own DownloadError/ExtractorError hierarchy
+        result.errors.append(f"listing {sync.url}: {exc}")
+        todo, newest = [], None
+
+    records = []
+    futures = {pool.submit(source.video, video_id): video_id for video_id in todo}
+    for future in as_completed(futures):
+        try:
+            record = record_from_info(future.result())
+        except Exception as exc:
+            result.errors.append(f"{futures[future]}: {exc}")
+            continue
+        if record is None:
+            result.errors.append(f"{futures[future]}: no usable metadata")
+            continue
+        # the listing decides the channel, whatever name the video page shows
+        record.platform, record.channel = sync.channel.platform, sync.channel.name
+        records.append(record)
+    result.fetched = len(records)
+    for start in range(0, len(records), BATCH_SIZE):
+        result.written += write_batch(records[start:start + BATCH_SIZE])
+
+    sync.last_synced_at = timezone.now()
+    sync.last_error = "\n".join(result.errors[:20])
+    if newest and not result.errors:
+        sync.cursor = newest
+    sync.save(update_fields=["last_synced_at", "last_error", "cursor"])
+    return result
+
+
+def due_syncs(interval=None):
+    """Enabled channel syncs not run within ``interval`` seconds, least recently synced first."""
+    interval = settings.CHANNEL_SYNC_INTERVAL if interval is None else interval
+    cutoff = timezone.now() - timedelta(seconds=interval)
+    return (
+        ChannelSync.objects.filter(enabled=True)
+        .filter(Q(last_synced_at__isnull=True) | Q(last_synced_at__lte=cutoff))
+        .select_related("channel")
+        .order_by(F("last_synced_at").asc(nulls_first=True), "id")
+    )
+
+
+def sync_channels(syncs=None, full=False, workers=None, source=None):
+    """Sync ``syncs`` (default: the due ones) one channel at a time with a shared fetch pool."""
+    syncs = due_syncs() if syncs is None else syncs
+    if source is None:
+        limiter = RateLimiter(settings.CHANNEL_SYNC_RATES, settings.CHANNEL_SYNC_DEFAULT_RATE)
+        source = YtDlpSource(limiter)
+    results = []
+    with ThreadPoolExecutor(max_workers=workers or settings.CHANNEL_SYNC_WORKERS) as pool:
+        for sync in syncs:
+            results.append(sync_channel(sync, source, pool, full))
+    if any(r.written for r in results):
+        # bulk upserts send no model signals
+        bump_catalog_version()
+    return results
@@ -1,3 +1,566 @@
-from django.test import TestCase
+import importlib
+import json
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps as django_apps
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from backend.journal.models import UserVideoProgress, UserViewLog
+from backend.journal.progress import record_watches
+from backend.users.models import User
+from .catalog import bump_catalog_version
+from .cowatch import build_also_watched, refresh_also_watched
+from .facets import facet_statistics
+from .importer import import_catalog, parse_file
+from .models import Video, Channel, ChannelSync, Tag, Speaker, VideoAlsoWatched, VideoNeighbor
+from .pagination import KeysetPagination, decode_cursor, encode_cursor
+from .related import build_neighbors, stale_video_ids
+from .search import similarity_threshold
+from .sync import RateLimiter, YtDlpSource, sync_channels
+
+
+class ViewerClient:
+    """A ``viewer`` user, authenticated on ``self.client``."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="viewer", password="x")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+
+class VideoListQueryCountTests(ViewerClient, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.channel = Channel.objects.create(name="Channel")
+        cls.tags = [Tag.objects.create(name=f"tag {i}") for i in range(3)]
+        cls.speakers = [Speaker.objects.create(name=f"speaker {i}") for i in range(2)]
+
+    def add_videos(self, n):
+        start = Video.objects.count()
+        # run the catalog-version bumps so the in-memory index sees the new rows
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(start, start + n):
+                video = Video.objects.create(
+                    on_platform_id=f"vid{i}", channel=self.channel, duration=60 + i,
+                    title=f"Video {i}", upload_date=f"2024-{i % 12 + 1:02d}-01",
+                )
+                video.tags.set(self.tags)
+                video.speakers.set(self.speakers)
+
+    def count_queries(self, url):
+        self.client.get(url)  # warm per-process caches (catalog index, thumbnail manifest)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def assert_constant_queries(self, url):
+        self.add_videos(2)
+        baseline = self.count_queries(url)
+        self.add_videos(23)
+        self.client.get(url)
+        with self.assertNumQueries(baseline):
+            response = self.client.get(url)
+        self.assertEqual(len(response.json()["results"]), 25)
+        self.assertEqual(sorted(response.json()["results"][0]["tagNames"]), [t.name for t in self.tags])
+
+    @override_settings(CATALOG_INDEX_ENABLED=False)
+    def test_orm_list_page_is_constant(self):
+        self.assert_constant_queries("/api/videos/")
+
+    @override_settings(CATALOG_INDEX_ENABLED=True)
+    def test_index_list_page_is_constant(self):
+        self.assert_constant_queries("/api/videos/?sort=short")
+
+    @override_settings(CATALOG_INDEX_ENABLED=False)
+    def test_cursor_page_is_constant(self):
+        self.assert_constant_queries("/api/videos/?pagination=cursor&sort=long")
+
+    @override_settings(CATALOG_INDEX_ENABLED=True)
+    def test_search_goes_to_the_orm_without_building_the_index(self):
+        self.add_videos(3)
+        with mock.patch("backend.videos.views.get_catalog_index") as index:
+            response = self.client.get("/api/videos/?search=Video 1")
+            self.client.get("/api/videos/statistics/?search=Video 1")
+        index.assert_not_called()
+        self.assertEqual([v["title"] for v in response.json()["results"]], ["Video 1"])
+
+
+class FacetStatisticsTests(ViewerClient, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        first, second = Channel.objects.create(name="First"), Channel.objects.create(name="Second")
+        tags = [Tag.objects.create(name=f"tag {i}") for i in range(2)]
+        speakers = [Speaker.objects.create(name=f"speaker {i}") for i in range(2)]
+        # the first two share level, channel and duration: each still counts
+        for i, (level, channel, duration, video_tags, video_speakers) in enumerate([
+            ("Beginner 0", first, 30, tags, speakers[:1]),
+            ("Beginner 0", first, 30, tags[:1], []),
+            ("Advanced", second, 125, [], speakers),
+        ]):
+            video = Video.objects.create(
+                on_platform_id=f"vid{i}", channel=channel, title=f"Video {i}", level=level, duration=duration,
+            )
+            video.tags.set(video_tags)
+            video.speakers.set(video_speakers)
+        bump_catalog_version()
+
+    def test_facets_and_histogram_in_one_statement(self):
+        with self.assertNumQueries(1):
+            payload = facet_statistics(Video.objects.all())
+        self.assertEqual(payload["total"], 3)
+        statistics = payload["statistics"]
+        self.assertEqual(statistics["levels"], [{"name": "Beginner 0", "count": 2}, {"name": "Advanced", "count": 1}])
+        self.assertEqual(statistics["channels"], [{"name": "First", "count": 2}, {"name": "Second", "count": 1}])
+        self.assertEqual(statistics["speakers"], [{"name": "speaker 0", "count": 2}, {"name": "speaker 1", "count": 1}])
+        self.assertEqual(statistics["topics"], [{"name": "tag 0", "count": 2}, {"name": "tag 1", "count": 1}])
+        # enough 60 s buckets to cover the longest video + 20 s
+        self.assertEqual([(d["start"], d["count"]) for d in statistics["durations"]], [(0, 2), (60, 0), (120, 1)])
+
+    def test_sql_and_catalog_index_agree(self):
+        first = Channel.objects.get(name="First")
+        for query in ("", "?level=Advanced", f"?channel_id={first.pk}"):
+            with override_settings(CATALOG_INDEX_ENABLED=False):
+                sql = self.client.get(f"/api/videos/statistics/{query}").json()
+            with override_settings(CATALOG_INDEX_ENABLED=True):
+                index = self.client.get(f"/api/videos/statistics/{query}").json()
+            self.assertEqual(sql, index, query)
+
+
+class KeysetPaginationTests(ViewerClient, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        channel = Channel.objects.create(name="Channel")
+        for i, day in enumerate(["2024-01-01", None, "2024-03-01", "2024-01-01", None, "2024-02-01"]):
+            Video.objects.create(
+                on_platform_id=f"vid{i}", channel=channel, duration=60 + i % 2, title=f"Video {i}", upload_date=day,
+            )
+        bump_catalog_version()  # on_commit bumps never run here; retire other tests' catalog index
+
+    def walk(self, url):
+        titles = []
+        with mock.patch.object(KeysetPagination, "page_size", 2):
+            while url:
+                body = self.client.get(url).json()
+                titles += [v["title"] for v in body["results"]]
+                url = body["next"]
+        return titles
+
+    def test_cursor_pages_put_missing_upload_dates_lowest(self):
+        new = ["Video 2", "Video 5", "Video 3", "Video 0", "Video 4", "Video 1"]
+        for enabled in (False, True):
+            with self.subTest(catalog_index=enabled), override_settings(CATALOG_INDEX_ENABLED=enabled):
+                self.assertEqual(self.walk("/api/videos/?pagination=cursor&sort=new"), new)
+                self.assertEqual(self.walk("/api/videos/?pagination=cursor&sort=old"), new[::-1])
+                self.assertEqual(
+                    self.walk("/api/videos/?pagination=cursor&ordering=-duration,upload_date"),
+                    ["Video 1", "Video 3", "Video 5", "Video 4", "Video 0", "Video 2"],
+                )
+        self.assertEqual(
+            [v["title"] for v in self.client.get("/api/videos/?ordering=upload_date").json()["results"]][:2],
+            ["Video 1", "Video 4"],
+        )
+
+    def test_cursor_round_trip(self):
+        ordering = ("-upload_date", "-id")
+        cursor = encode_cursor(ordering, [None, 7])
+        self.assertEqual(decode_cursor(cursor, ordering), [None, 7])
+        with self.assertRaises(ValueError):
+            decode_cursor(cursor, ("upload_date", "id"))
+        with self.assertRaises(ValueError):
+            decode_cursor("not a cursor", ordering)
+        self.assertEqual(self.client.get("/api/videos/?cursor=bogus").status_code, 404)
+
+
+class ConditionalGetTests(ViewerClient, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.channel = Channel.objects.create(name="Channel")
+        cls.tag = Tag.objects.create(name="tag")
+        cls.video = Video.objects.create(
+            on_platform_id="vid", channel=cls.channel, duration=60, title="Video", upload_date="2024-01-01",
+        )
+
+    def test_repeat_request_is_not_modified_without_catalog_queries(self):
+        for url in ("/api/videos/", f"/api/videos/{self.video.pk}/", "/api/videos/statistics/", "/api/tags/"):
+            etag = self.client.get(url).headers["ETag"]
+            with self.assertNumQueries(1):  # the versions
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.headers["ETag"], etag)
+
+    def test_catalog_change_invalidates(self):
+        etag = self.client.get("/api/tags/").headers["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tag.name = "renamed"
+            self.tag.save()
+        response = self.client.get("/api/tags/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+    def test_bumps_are_shared_between_processes(self):
+        etag = self.client.get("/api/tags/").headers["ETag"]
+        cache.clear()  # another worker: nothing in common but the database
+        self.assertEqual(self.client.get("/api/tags/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        bump_catalog_version()  # e.g. from a management command
+        self.assertEqual(self.client.get("/api/tags/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_watching_invalidates_video_payloads_only(self):
+        video_etag = self.client.get("/api/videos/").headers["ETag"]
+        tag_etag = self.client.get("/api/tags/").headers["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f"/api/videos/{self.video.pk}/mark-as-watched/")
+        self.assertEqual(self.client.get("/api/videos/", HTTP_IF_NONE_MATCH=video_etag).status_code, 200)
+        self.assertEqual(self.client.get("/api/tags/", HTTP_IF_NONE_MATCH=tag_etag).status_code, 304)
+
+    def test_per_user_payloads_are_validated_by_etag_only(self):
+        last_modified = self.client.get("/api/tags/").headers["Last-Modified"]
+        self.assertEqual(self.client.get("/api/tags/", HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        response = self.client.get("/api/videos/")
+        self.assertNotIn("Last-Modified", response.headers)
+        self.assertEqual(self.client.get("/api/videos/", HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200)
+
+    def test_related_and_also_watched_builds_invalidate(self):
+        url = f"/api/videos/{self.video.pk}/"
+        for build in (build_neighbors, build_also_watched):
+            etag = self.client.get(url).headers["ETag"]
+            with self.captureOnCommitCallbacks(execute=True):
+                build()
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200, build.__name__)
+
+
+class FullTextSearchTests(ViewerClient, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        channel = Channel.objects.create(name="Channel")
+        # the title match is the older video, so "-id" alone would put it second
+        cls.in_title = Video.objects.create(
+            on_platform_id="v1", channel=channel, duration=60, title="Кошки дома", description="Про животных",
+        )
+        cls.in_description = Video.objects.create(
+            on_platform_id="v2", channel=channel, duration=60, title="Прогулка", description="Мы видели кошки",
+        )
+
+    def vector(self, video):
+        return Video.objects.values_list("search_vector", flat=True).get(pk=video.pk)
+
+    def test_title_match_ranks_above_description_match(self):
+        for text in ("кошка", "кошки"):
+            results = self.client.get("/api/videos/", {"text": text}).json()["results"]
+            self.assertEqual([v["title"] for v in results], ["Кошки дома", "Прогулка"], text)
+
+    def test_vector_follows_the_text_only(self):
+        video = self.in_title
+        # a marker the triggers would never compute, to tell "kept" from "recomputed"
+        with connection.cursor() as cursor:
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")  # no deferred FK checks pending on the table
+            cursor.execute("ALTER TABLE videos_video DISABLE TRIGGER USER")
+            cursor.execute(
+                "UPDATE videos_video SET search_vector = to_tsvector('simple', 'marker') WHERE id = %s", [video.pk],
+            )
+            cursor.execute("ALTER TABLE videos_video ENABLE TRIGGER USER")
+        video.duration = 90
+        video.save()  # names every column, search_vector (None here) included
+        self.assertEqual(self.vector(video), "'marker':1")
+        Video.objects.filter(pk=video.pk).update(duration=120)
+        self.assertEqual(self.vector(video), "'marker':1")
+
+        video.title = "Собаки дома"
+        video.save()
+        self.assertIn("собак", self.vector(video))
+        self.assertNotIn("marker", self.vector(video))
+        self.assertEqual(
+            [v["title"] for v in self.client.get("/api/videos/", {"text": "собака"}).json()["results"]],
+            ["Собаки дома"],
+        )
+
+
+class SimilarityThresholdTests(TransactionTestCase):
+    def threshold(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT current_setting('pg_trgm.word_similarity_threshold', true)")
+            return cursor.fetchone()[0]
+
+    def test_threshold_does_not_outlive_its_transaction(self):
+        with similarity_threshold(0.25):
+            self.assertEqual(self.threshold(), "0.25")
+        self.assertNotEqual(self.threshold(), "0.25")
+
+
+class RelatedVideosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.channel = Channel.objects.create(name="Channel")
+        cls.common, cls.rare = Tag.objects.create(name="common"), Tag.objects.create(name="rare")
+        cls.videos = {}
+        for name, level, tags in (
+            ("base", "Beginner 0", ["common", "rare"]),
+            ("rare", "Beginner 0", ["rare"]),
+            ("common", "Beginner 0", ["common"]),
+            ("common far", "Native", ["common"]),
+            ("unrelated", "Beginner 0", []),
+        ):
+            video = Video.objects.create(
+                on_platform_id=name, channel=cls.channel, duration=60, title=name, level=level,
+            )
+            video.tags.set([t for t in (cls.common, cls.rare) if t.name in tags])
+            cls.videos[name] = video
+
+    def related(self, name):
+        return list(
+            VideoNeighbor.objects.filter(video=self.videos[name]).order_by("rank").values_list("neighbor__title", flat=True)
+        )
+
+    def test_rare_tags_and_close_levels_rank_first(self):
+        build_neighbors()
+        self.assertEqual(self.related("base"), ["rare", "common", "common far"])
+        self.assertEqual(self.related("unrelated"), [])
+        self.assertEqual(stale_video_ids(), [])
+
+    def test_changes_and_deleted_neighbours_mark_lists_stale(self):
+        build_neighbors()
+        self.rare.videos.clear()
+        self.assertEqual(sorted(stale_video_ids()), sorted(self.videos[n].pk for n in ("base", "rare")))
+        build_neighbors()
+        self.videos["common far"].delete()
+        self.assertEqual(sorted(stale_video_ids()), sorted(self.videos[n].pk for n in ("base", "common")))
+
+
+class AlsoWatchedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.channel = Channel.objects.create(name="Channel")
+        cls.videos = [
+            Video.objects.create(on_platform_id=f"vid{i}", channel=cls.channel, duration=60, title=f"Video {i}")
+            for i in range(3)
+        ]
+        cls.users = [User.objects.create_user(username=f"viewer{i}", password="x") for i in range(3)]
+
+    def watch(self, user, video, at):
+        record_watches(user.pk, [(video.pk, at, 10, 0, 10)])
+
+    def test_refresh_picks_up_late_written_watches(self):
+        past = timezone.now() - timedelta(days=30)
+        for user in self.users[:2]:
+            self.watch(user, self.videos[0], past)
+            self.watch(user, self.videos[1], past)
+        build_also_watched()
+        self.assertEqual(
+            list(VideoAlsoWatched.objects.filter(video=self.videos[0]).values_list("neighbor", flat=True)),
+            [self.videos[1].pk],
+        )
+        self.assertEqual(refresh_also_watched(), 0)
+        # flushed now, watched a month ago
+        self.watch(self.users[2], self.videos[2], past)
+        self.assertEqual(refresh_also_watched(), 1)
+        # that refresh wrote no list (one viewer), yet the next one starts after it
+        self.assertEqual(refresh_also_watched(), 0)
+
+
+class FakeYoutubeDL:
+    """
+    Local stand-in for ``yt_dlp.YoutubeDL``: serves ``channels`` (url -> info
+    dicts, newest first) as flat playlists and each video's full info by its
+    watch URL, honouring ``playliststart``/``playlistend``.
+    """
+
+    channels = {}
+    failing = set()
+    lock = threading.Lock()
+    active = peak = 0
+    fetched = []
+
+    def __init__(self, params=None):
+        self.params = params or {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def extract_info(self, url, download=True):
+        if url in self.channels:
+            start, end = self.params.get("playliststart", 1), self.params.get("playlistend")
+            entries = self.channels[url][start - 1:end]
+            return {"_type": "playlist", "entries": [
+                {"_type": "url", "id": v["id"], "title": v["title"], "duration": v["duration"]} for v in entries
+            ]}
+        video_id = url.rsplit("=", 1)[-1]
+        cls = type(self)
+        with cls.lock:
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+        try:
+            time.sleep(0.01)
+            if video_id in self.failing:
+                raise RuntimeError("HTTP Error 429: Too Many Requests")
+            info = next(v for videos in self.channels.values() for v in videos if v["id"] == video_id)
+            cls.fetched.append(video_id)
+            return dict(info, channel="Upstream name", extractor_key="Youtube", tags=["synced"])
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+
+@override_settings(CHANNEL_SYNC_WORKERS=3)
+class ChannelSyncTests(TestCase):
+    url = "https://www.youtube.com/@channel/videos"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.channel = Channel.objects.create(name="Channel")
+        cls.sync = ChannelSync.objects.create(channel=cls.channel, url=cls.url)
+
+    def setUp(self):
+        self.videos = [
+            {"id": f"v{i:03d}", "title": f"Video {i}", "duration": 60 + i, "upload_date": "20240101", "description": ""}
+            for i in range(250, 0, -1)
+        ]
+        FakeYoutubeDL.channels = {self.url: self.videos}
+        FakeYoutubeDL.failing = set()
+        FakeYoutubeDL.fetched = []
+        FakeYoutubeDL.peak = 0
+        self.listings = []
+        self.source = YtDlpSource(RateLimiter(default_rate=1000), ydl_factory=FakeYoutubeDL)
+        listing = self.source.listing
+        self.source.listing = lambda url, start, end: self.listings.append(start) or listing(url, start, end)
+
+    def run_sync(self, **kwargs):
+        self.sync.refresh_from_db()
+        with self.captureOnCommitCallbacks(execute=True):
+            return sync_channels([self.sync], source=self.source, **kwargs)[0]
+
+    def test_first_sync_fetches_everything_with_bounded_concurrency(self):
+        result = self.run_sync()
+        self.assertEqual((result.listed, result.fetched, result.errors), (250, 250, []))
+        self.assertLessEqual(FakeYoutubeDL.peak, 3)
+        self.assertEqual(Video.objects.filter(channel=self.channel).count(), 250)
+        self.assertFalse(Channel.objects.filter(name="Upstream name").exists())
+        self.sync.refresh_from_db()
+        self.assertEqual(self.sync.cursor, "v250")
+
+    def test_incremental_sync_fetches_only_new_and_changed(self):
+        self.run_sync()
+        FakeYoutubeDL.fetched = []
+        self.listings = []
+        self.videos.insert(0, {"id": "v251", "title": "New", "duration": 30, "upload_date": "20240102", "description": ""})
+        self.videos[5]["title"] = "Renamed"
+        result = self.run_sync()
+        self.assertEqual(sorted(FakeYoutubeDL.fetched), sorted(["v251", self.videos[5]["id"]]))
+        self.assertEqual(self.listings, [1])  # stopped at the page holding the cursor
+        self.assertEqual(Video.objects.get(on_platform_id=self.videos[5]["id"]).title, "Renamed")
+        self.assertEqual(result.written, 2)
+
+    def test_failed_fetch_keeps_cursor_and_is_retried(self):
+        FakeYoutubeDL.failing = {"v100"}
+        result = self.run_sync()
+        self.assertEqual(len(result.errors), 1)
+        self.sync.refresh_from_db()
+        self.assertEqual(self.sync.cursor, "")
+        self.assertIn("429", self.sync.last_error)
+
+        FakeYoutubeDL.failing = set()
+        FakeYoutubeDL.fetched = []
+        self.run_sync()
+        self.assertEqual(FakeYoutubeDL.fetched, ["v100"])
+        self.sync.refresh_from_db()
+        self.assertEqual((self.sync.cursor, self.sync.last_error), ("v250", ""))
+
+    def test_rate_limiter_spaces_requests_per_host(self):
+        now, slept = [0.0], []
+        limiter = RateLimiter({"a.example": 2}, default_rate=1, clock=lambda: now[0], sleep=slept.append)
+        for url in ("https://a.example/1", "https://a.example/2", "https://a.example/3", "https://b.example/1"):
+            limiter.wait(url)
+        self.assertEqual(slept, [0.5, 1.0])
+
+
+class ImportCatalogTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+
+    def write(self, name, text):
+        path = self.dir / name
+        path.write_text(text, encoding="utf-8")
+        return str(path)
+
+    def info(self, video_id, **fields):
+        return dict({
+            "id": video_id, "title": f"Title {video_id}", "channel": "Channel", "duration": 61.5,
+            "upload_date": "20240131", "tags": ["a", "b", "a", ""], "extractor_key": "Youtube",
+        }, **fields)
+
+    def test_parse_file_reads_ytdlp_lines_and_api_records(self):
+        lines = "\n".join(json.dumps(i) for i in (self.info("v1"), self.info("v2", upload_date="bad"), {"id": "v3"}))
+        records, skipped, error = parse_file(self.write("dump.jsonl", lines))
+        self.assertEqual((len(records), skipped, error), (2, 1, None))
+        self.assertEqual(records[0].fields["upload_date"], date(2024, 1, 31))
+        self.assertEqual(records[0].fields["duration"], 61)
+        self.assertEqual(records[0].tags, ["a", "b"])
+        self.assertIsNone(records[1].fields["upload_date"])
+
+        api = {"videos": [{"id": 7, "channelName": "Channel", "uploadDate": "2024-02-01", "level": "Native"}]}
+        [record], _, _ = parse_file(self.write("db.json", json.dumps(api)))
+        self.assertEqual((record.on_platform_id, record.fields["level"]), ("7", "Native"))
+        self.assertIsNone(record.tags)  # not given: leave the links alone
+        self.assertNotIn("description", record.fields)
+
+        _, _, error = parse_file(self.write("broken.json", "{"))
+        self.assertIn("broken.json", error)
+
+    def test_reimport_updates_in_place_and_keeps_fields_the_source_lacks(self):
+        self.write("dump.jsonl", "\n".join(json.dumps(self.info(f"v{i}")) for i in range(3)))
+        stats = import_catalog([str(self.dir)], workers=1, batch_size=2)
+        self.assertEqual((stats.files, stats.videos, stats.errors), (1, 3, []))
+        Video.objects.filter(on_platform_id="v1").update(level="Native", premium=True)
+
+        self.write("dump.jsonl", json.dumps(self.info("v1", title="Renamed", tags=["c"])))
+        import_catalog([str(self.dir)], workers=1)
+        self.assertEqual(Video.objects.count(), 3)
+        video = Video.objects.get(on_platform_id="v1")
+        self.assertEqual((video.title, video.level, video.premium), ("Renamed", "Native", True))
+        self.assertEqual([t.name for t in video.tags.all()], ["c"])
+
+    def test_constraint_migration_merges_duplicates(self):
+        migration = importlib.import_module("backend.videos.migrations.0009_video_platform_on_platform_id")
+        user = User.objects.create_user(username="viewer", password="x")
+        channel = Channel.objects.create(name="Channel")
+        tags = [Tag.objects.create(name=name) for name in ("a", "b")]
+        with connection.cursor() as cursor:
+            cursor.execute("ALTER TABLE videos_video DROP CONSTRAINT videos_video_platform_on_platform_id")
+        keep, duplicate = (
+            Video.objects.create(on_platform_id="v1", channel=channel, duration=60, title="Video") for _ in range(2)
+        )
+        keep.tags.set(tags[:1])
+        duplicate.tags.set(tags)
+        now = timezone.now()
+        for video in (keep, duplicate):
+            record_watches(user.pk, [(video.pk, now, 10, 0, 10)])
+            UserViewLog.objects.create(user=user, video=video, watch_date=now, watch_time=10)
+
+        with mock.patch("sys.stdout"):
+            migration.merge_duplicates(django_apps, None)
+        self.assertEqual(list(Video.objects.values_list("pk", flat=True)), [keep.pk])
+        self.assertEqual(sorted(t.name for t in keep.tags.all()), ["a", "b"])
+        self.assertEqual(UserViewLog.objects.filter(video=keep).count(), 2)
+        self.assertEqual(UserVideoProgress.objects.filter(video=keep).count(), 1)
@@ -1,13 +1,20 @@
-from datetime import datetime
 from pathlib import Path
 import io, tempfile, os, subprocess, shlex
-from django.db.models import Q, Sum
+from django.conf import settings
+from django.db import transaction
 from django.http import FileResponse
+from django.utils import timezone
 from rest_framework import viewsets, permissions, decorators, response, status
+from rest_framework.exceptions import NotFound
 from rest_framework.request import Request
 from rest_framework.response import Response
 
-from .models import Video, Channel, Tag, Speaker
+from .catalog_index import get_catalog_index, supports
+from .conditional import ConditionalCatalogMixin, conditional_catalog
+from .facets import facet_statistics
+from .models import Video, VideoAlsoWatched, Channel, Tag, Speaker
+from .pagination import KeysetPagination, keyset_ordering, null_ordering
+from .search import full_text_search, fuzzy_search, fuzzy_names, parse_similarity, similarity_threshold
 from .serializers import (
 	VideoSerializer,
 	VideoDetailSerializer,
@@ -15,7 +22,11 @@ from .serializers import (
 	TagSerializer,
 	SpeakerSerializer,
 )
-from backend.journal.models import UserViewLog
+from backend.journal.models import UserDailyTotals, UserVideoProgress, UserViewLog
+from backend.journal.ingest import heartbeat, submit
+from backend.journal.progress import record_watch, watched_videos
+from backend.journal.serializers import HeartbeatBatchSerializer, HeartbeatSerializer
+from backend.journal.totals import add_watch_time
 
 
 class VideoViewSet(viewsets.ModelViewSet):
@@ -32,7 +43,30 @@ class VideoViewSet(viewsets.ModelViewSet):
 	}
 	search_fields = ['title', 'description']
 	ordering_fields = ['upload_date', 'duration', 'id']
-	ordering = ['-upload_date', '-id']
+	# No class-level `ordering`: OrderingFilter would apply it on top of the
+	# sort/relevance order chosen in get_queryset. `?ordering=` still overrides.
+
+	@property
+	def paginator(self):
+		# ?cursor=... (or ?pagination=cursor for the first page) switches to
+		# keyset pagination on the active sort; page numbers stay the default.
+		params = self.request.query_params if self.request is not None else {}
+		if not hasattr(self, '_paginator') and ('cursor' in params or params.get('pagination') == 'cursor'):
+			self._paginator = KeysetPagination()
+		return super().paginator
+
+	def dispatch(self, request, *args, **kwargs):
+		# ?match=fuzzy reads pg_trgm's threshold, set for this request's transaction only
+		params = request.GET
+		if params.get('match') == 'fuzzy' and (params.get('text') or params.get('q')):
+			with similarity_threshold(parse_similarity(params.get('similarity'))):
+				return super().dispatch(request, *args, **kwargs)
+		return super().dispatch(request, *args, **kwargs)
+
+	def filter_queryset(self, queryset):
+		# `?ordering=` brings plain names; missing upload dates sort lowest as in SORT_ORDERINGS
+		queryset = super().filter_queryset(queryset)
+		return queryset.order_by(*null_ordering(queryset.model, queryset.query.order_by))
 
 	def get_serializer_class(self):
 		if self.action == "retrieve":
@@ -45,8 +79,10 @@ class VideoViewSet(viewsets.ModelViewSet):
 		# Legacy param mapping for backward compatibility
 		params = self.request.query_params
 		text = params.get('text') or params.get('q')
-		if text:
-			qs = qs.filter(Q(title__icontains=text) | Q(description__icontains=text))
+		if text and params.get('match') == 'fuzzy':
+			qs = fuzzy_search(qs, text)
+		elif text:
+			qs = full_text_search(qs, text)
 		# durations legacy parsing
 		durations = params.get('durations')
 		if durations and ',' in durations:
@@ -62,22 +98,57 @@ class VideoViewSet(viewsets.ModelViewSet):
 				pass
 		# hide-watched legacy flag
 		if params.get('hide-watched', 'false').lower() == 'true' and self.request.user.is_authenticated:
-			viewed_ids = UserViewLog.objects.filter(user=self.request.user).values_list('video_id', flat=True)
-			qs = qs.exclude(id__in=viewed_ids)
-		# manual sort mapping if "sort" provided (overrides ordering)
-		sort = params.get('sort')
-		if sort:
-			sort = sort.lower()
-			if sort == 'new':
-				qs = qs.order_by('-upload_date', '-id')
-			elif sort == 'old':
-				qs = qs.order_by('upload_date', 'id')
-			elif sort == 'short':
-				qs = qs.order_by('duration')
-			elif sort == 'long':
-				qs = qs.order_by('-duration')
-		return qs.distinct()
+			qs = qs.exclude(id__in=watched_videos(self.request.user))
+		# explicit "sort" wins; text searches default to relevance, the rest to newest
+		sort = (params.get('sort') or '').lower()
+		if sort in Video.SORT_ORDERINGS:
+			qs = qs.order_by(*Video.SORT_ORDERINGS[sort])
+		elif text:
+			qs = qs.order_by('-search_rank', '-id')
+		else:
+			qs = qs.order_by(*Video.SORT_ORDERINGS['new'])
+		# only the tag/speaker filters join rows that can repeat a video; a
+		# DISTINCT elsewhere puts a sort on top of the (upload_date|duration, id) index scans
+		if any(key.split('__', 1)[0] in ('tags', 'speakers') for key in params):
+			qs = qs.distinct()
+		return qs
+
+	def _catalog_index_mask(self):
+		"""Return (index, mask) when the in-memory catalog index can answer this request."""
+		params = self.request.query_params
+		if not getattr(settings, "CATALOG_INDEX_ENABLED", False) or not supports(params):
+			return None, None
+		index = get_catalog_index()
+		watched_ids = None
+		if params.get('hide-watched', 'false').lower() == 'true' and self.request.user.is_authenticated:
+			watched_ids = list(watched_videos(self.request.user))
+		return index, index.filter_mask(params, watched_ids)
 
+	@conditional_catalog(per_user=True)
+	def list(self, request, *args, **kwargs):
+		index, mask = self._catalog_index_mask()
+		ordering = index.ordering_for(request.query_params) if mask is not None else None
+		if ordering is None:
+			return super().list(request, *args, **kwargs)
+		if isinstance(self.paginator, KeysetPagination):
+			ordering = keyset_ordering(ordering)
+			after = self.paginator.get_cursor_values(request, ordering)
+			try:
+				ids = index.ordered_ids(mask, ordering, after=after)
+			except (TypeError, ValueError):
+				raise NotFound(self.paginator.invalid_cursor_message)
+			page = self.paginator.paginate_ordered(ids, ordering, request, key=lambda pk: index.sort_values(pk, ordering))
+		else:
+			ids = index.ordered_ids(mask, ordering)
+			page = self.paginate_queryset(ids)
+		page_ids = page if page is not None else ids
+		videos = super().get_queryset().in_bulk(page_ids)
+		serializer = self.get_serializer([videos[pk] for pk in page_ids if pk in videos], many=True)
+		if page is not None:
+			return self.get_paginated_response(serializer.data)
+		return Response(serializer.data)
+
+	@conditional_catalog(per_user=True)
 	def retrieve(self, request, *args, **kwargs):
 		obj = self.get_object()
 		# premium gate
@@ -86,85 +157,97 @@ class VideoViewSet(viewsets.ModelViewSet):
 		return super().retrieve(request, *args, **kwargs)
 
 	@decorators.action(detail=False, methods=["get"], url_path="statistics", permission_classes=[permissions.IsAuthenticated])
+	@conditional_catalog(per_user=True)
 	def statistics(self, request: Request):
-		qs = self.get_queryset()
-		# durations buckets (60s step like legacy) – compute max
-		durations = list(qs.values_list("duration", flat=True))
-		if durations:
-			d_max = max(durations) + 20
-		else:
-			d_max = 0
-		step = 60
-		n_steps = max(1, int((d_max // step) + 1))
-		buckets = [0] * n_steps
-		for d in durations:
-			i = min(n_steps - 1, max(0, d // step))
-			buckets[i] += 1
-		durations_payload = [
-			{"count": buckets[i], "start": i * step, "end": (i + 1) * step}
-			for i in range(n_steps)
-		]
-		level_counts = qs.values("level").order_by().annotate(count=Sum(0) + 1)  # hack: will adjust below
-		# Simpler manual count to avoid portability issues
-		from collections import Counter
-		level_counter = Counter(qs.values_list("level", flat=True))
-		channel_counter = Counter(qs.values_list("channel__name", flat=True))
-		speaker_counter = Counter(
-			Speaker.objects.filter(videos__in=qs).values_list("name", flat=True)
-		)
-		tag_counter = Counter(
-			Tag.objects.filter(videos__in=qs).values_list("name", flat=True)
+		index, mask = self._catalog_index_mask()
+		if mask is not None:
+			return response.Response(index.statistics(mask))
+		# single round trip: facet counts, duration histogram and total together
+		return response.Response(facet_statistics(self.filter_queryset(self.get_queryset())))
+
+	@decorators.action(detail=True, methods=["get"], url_path="also-watched", permission_classes=[permissions.IsAuthenticated])
+	def also_watched(self, request: Request, pk=None):
+		# precomputed by `manage.py build_also_watched` (videos/cowatch.py), best first
+		video = self.get_object()
+		rows = (
+			VideoAlsoWatched.objects.filter(video=video)
+			.select_related("neighbor__channel").prefetch_related("neighbor__tags", "neighbor__speakers")
 		)
-		return response.Response({
-			"total": qs.count(),
-			"statistics": {
-				"levels": [{"name": k, "count": v} for k, v in level_counter.items()],
-				"channels": [{"name": k, "count": v} for k, v in channel_counter.items()],
-				"speakers": [{"name": k, "count": v} for k, v in speaker_counter.items()],
-				"topics": sorted([{"name": k, "count": v} for k, v in tag_counter.items()], key=lambda x: x["name"]),
-				"durations": durations_payload,
-			},
+		serializer = VideoSerializer([row.neighbor for row in rows], many=True, context=self.get_serializer_context())
+		return Response(serializer.data)
+
+	@decorators.action(detail=True, methods=["get"], url_path="progress", permission_classes=[permissions.IsAuthenticated])
+	def progress(self, request: Request, pk=None):
+		# resume: one row of the user's progress rollup (journal/progress.py), no log scan
+		if not str(pk).isdigit():
+			raise NotFound()
+		progress = UserVideoProgress.objects.filter(user=request.user, video_id=pk).first()
+		if progress is None:
+			return Response({
+				"lastWatchTime": None, "watchedSeconds": 0, "coverage": 0.0, "completed": False, "lastWatchedAt": None,
+			})
+		return Response({
+			"lastWatchTime": progress.last_position,
+			"watchedSeconds": progress.watched_seconds,
+			"coverage": round(progress.coverage, 4),
+			"completed": progress.completed,
+			"lastWatchedAt": progress.last_watched_at,
 		})
 
 	@decorators.action(detail=True, methods=["post"], url_path="mark-as-watched", permission_classes=[permissions.IsAuthenticated])
 	def mark_as_watched(self, request: Request, pk=None):
 		video = self.get_object()
-		UserViewLog.objects.create(
-			user=request.user,
-			video=video,
-			watch_date=datetime.utcnow(),
-			watch_time=1,
-			video_time_start=max(0, video.duration - 1),
-			video_time_end=video.duration,
-		)
+		now = timezone.now()
+		start = max(0, video.duration - 1)
+		with transaction.atomic():
+			UserViewLog.objects.create(
+				user=request.user,
+				video=video,
+				watch_date=now,
+				watch_time=1,
+				video_time_start=start,
+				video_time_end=video.duration,
+			)
+			record_watch(request.user, video, now, 1, start, video.duration, completed=True)
+			add_watch_time(UserDailyTotals, [(request.user.pk, now, 1)])
 		return Response({}, status=status.HTTP_201_CREATED)
 
 	@decorators.action(detail=False, methods=["post"], url_path="watchtime", permission_classes=[permissions.IsAuthenticated])
 	def watchtime(self, request: Request):
 		data = request.data or {}
-		vid = data.get("videoId")
-		if not vid:
+		if not data.get("videoId"):
 			return Response({"error": "Missing videoId"}, status=400)
-		try:
-			video = Video.objects.get(pk=vid)
-		except Video.DoesNotExist:
-			return Response({"error": "Video not found"}, status=404)
-		try:
-			elapsed = float(data.get("elapsedTime", 0))
-			t_end = float(data.get("lastVideoTime", 0))
-		except (TypeError, ValueError):
+		serializer = HeartbeatSerializer(data={
+			"videoId": data.get("videoId"),
+			"elapsedTime": data.get("elapsedTime", 0),
+			"lastVideoTime": data.get("lastVideoTime", 0),
+		})
+		if not serializer.is_valid():
 			return Response({"error": "Invalid time payload"}, status=400)
-		t_start = t_end - elapsed
-		UserViewLog.objects.create(
-			user=request.user,
-			video=video,
-			watch_date=datetime.utcnow(),
-			watch_time=int(elapsed),
-			video_time_start=float(t_start),
-			video_time_end=float(t_end),
-		)
+		b = serializer.validated_data
+		# spooled, no query here: heartbeats for unknown videos are dropped at flush (journal/ingest.py)
+		submit([heartbeat(
+			request.user.pk, b["video_id"], b["watched_at"], b["watch_time"], b["video_time_start"], b["video_time_end"],
+		)])
 		return Response({})
 
+	@decorators.action(detail=False, methods=["post"], url_path="watchtime/batch", permission_classes=[permissions.IsAuthenticated])
+	def watchtime_batch(self, request: Request):
+		# {"heartbeats": [{videoId, elapsedTime, lastVideoTime, watchedAt?}, ...]}, any mix of videos;
+		# spooled as one append and written with the next flush; unknown videos are dropped there
+		data = request.data if isinstance(request.data, dict) else {"heartbeats": request.data}
+		serializer = HeartbeatBatchSerializer(data=data)
+		serializer.is_valid(raise_exception=True)
+		heartbeats = serializer.validated_data["heartbeats"]
+		submit([
+			heartbeat(
+				request.user.pk, b["video_id"], b["watched_at"], b["watch_time"],
+				b["video_time_start"], b["video_time_end"],
+			)
+			for b in heartbeats
+		])
+		return Response({"accepted": len(heartbeats)}, status=status.HTTP_202_ACCEPTED)
+
 	# ---- Download endpoints (premium-only) ----
 	def _assert_premium(self, request):
 		if not getattr(request.user, 'premium', False):
@@ -236,19 +319,45 @@ class VideoViewSet(viewsets.ModelViewSet):
 		return FileResponse(open(cache, 'rb'), as_attachment=True, filename=cache.name)
 
 
-class ChannelViewSet(viewsets.ReadOnlyModelViewSet):
+class SearchViewSet(viewsets.ViewSet):
+	"""Typo-tolerant search across videos, tags, speakers and channels: /api/search/?q=...&similarity=0.4"""
+	permission_classes = [permissions.IsAuthenticated]
+
+	def list(self, request: Request):
+		text = (request.query_params.get('q') or request.query_params.get('text') or '').strip()
+		if not text:
+			return Response({"error": "Missing q"}, status=400)
+		threshold = parse_similarity(request.query_params.get('similarity'))
+		try:
+			limit = min(50, max(1, int(request.query_params.get('limit', 10))))
+		except ValueError:
+			limit = 10
+		with similarity_threshold(threshold):
+			videos = (
+				fuzzy_search(Video.objects.select_related("channel").prefetch_related("tags", "speakers"), text)
+				.order_by('-search_rank', '-id')[:limit]
+			)
+			return Response({
+				"videos": VideoSerializer(videos, many=True, context={"request": request}).data,
+				"tags": fuzzy_names(Tag, text, limit),
+				"speakers": fuzzy_names(Speaker, text, limit),
+				"channels": fuzzy_names(Channel, text, limit),
+			})
+
+
+class ChannelViewSet(ConditionalCatalogMixin, viewsets.ReadOnlyModelViewSet):
 	queryset = Channel.objects.all()
 	serializer_class = ChannelSerializer
 	permission_classes = [permissions.IsAuthenticated]
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(ConditionalCatalogMixin, viewsets.ReadOnlyModelViewSet):
 	queryset = Tag.objects.all()
 	serializer_class = TagSerializer
 	permission_classes = [permissions.IsAuthenticated]
 
 
-class SpeakerViewSet(viewsets.ReadOnlyModelViewSet):
+class SpeakerViewSet(ConditionalCatalogMixin, viewsets.ReadOnlyModelViewSet):
 	queryset = Speaker.objects.all()
 	serializer_class = SpeakerSerializer
 	permission_classes = [permissions.IsAuthenticated]
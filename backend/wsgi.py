@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_wsgi_application()
+
+# The WSGI server does not run the system checks; refuse to start a worker
+# that could not spool watch-time heartbeats.
+from backend.journal.checks import raise_for_spool_dir  # noqa: E402
+
+raise_for_spool_dir()